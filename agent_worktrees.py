@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Per-agent git worktrees
+Each agent works in its own worktree of the workspace repository: one shared
+object store, but a separate index, branch (agent/<window name>) and set of
+files, so parallel builds, test runs and commits no longer collide on one
+checkout or its index.lock. The orchestrator integrates with merge (agent
+branches into the workspace's branch, one at a time, aborting on conflicts)
+and hands the result back to agents with sync.
+
+  agent_worktrees.py create            # a worktree for every agent of the team spec
+  agent_worktrees.py list              # branch, ahead/behind and uncommitted files per agent
+  agent_worktrees.py merge --all       # integrate every agent branch
+  agent_worktrees.py sync lead         # merge the integrated branch into lead's worktree
+"""
+
+import os
+import sys
+import fcntl
+import argparse
+import subprocess
+from typing import List, Dict, Optional
+from dataclasses import dataclass
+from contextlib import contextmanager
+from pathlib import Path
+
+BRANCH_PREFIX = "agent/"
+
+
+@dataclass
+class Worktree:
+    name: str
+    path: str
+    branch: str
+    head: str
+    ahead: int = 0  # commits not merged into the base branch yet
+    behind: int = 0  # base branch commits the agent doesn't have
+    dirty: int = 0  # uncommitted and untracked files
+
+
+@dataclass
+class MergeResult:
+    name: str
+    branch: str
+    merged: bool
+    commits: int
+    message: str
+    conflicts: Optional[List[str]] = None
+
+
+class WorktreeManager:
+    """Agent worktrees of one repository, created and merged under a repository-wide lock"""
+
+    def __init__(self, repo: Path, root: Optional[Path] = None, base: Optional[str] = None):
+        self.repo = Path(repo).resolve()
+        self.root = Path(root).resolve() if root else self.repo.parent / "worktrees"
+        self._base = base
+
+    def git(self, *args: str, cwd: Optional[Path] = None, check: bool = True) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", "-C", str(cwd or self.repo), *args], capture_output=True, text=True, check=check)
+
+    @contextmanager
+    def _locked(self):
+        common_dir = self.git("rev-parse", "--git-common-dir").stdout.strip()
+        fd = os.open(self.repo / common_dir / "agent-worktrees.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    @property
+    def base(self) -> str:
+        """Integration branch: the branch checked out in the workspace itself"""
+        if self._base is None:
+            self._base = self.git("symbolic-ref", "--short", "HEAD").stdout.strip()
+        return self._base
+
+    def path_for(self, name: str) -> Path:
+        return self.root / name
+
+    def branch_for(self, name: str) -> str:
+        return BRANCH_PREFIX + name
+
+    def ensure_repo(self) -> bool:
+        """Make the workspace a repository of its own with a first commit, so agents have something to branch from"""
+        self.repo.mkdir(parents=True, exist_ok=True)
+        try:
+            # The workspace may sit inside another checkout; that one is not the agents' repository
+            toplevel = self.git("rev-parse", "--show-toplevel", check=False).stdout.strip()
+            if not toplevel or Path(toplevel).resolve() != self.repo:
+                self.git("init", "-q")
+            if self.git("rev-parse", "--verify", "-q", "HEAD", check=False).returncode != 0:
+                self.git("commit", "-q", "--allow-empty", "-m", "Initial commit")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error preparing workspace repository: {e.stderr.strip() or e}")
+            return False
+
+    def add(self, name: str) -> Optional[Path]:
+        """Worktree for an agent on its own branch (created from the base branch the first time)"""
+        path = self.path_for(name)
+        branch = self.branch_for(name)
+        if (path / ".git").exists():
+            return path
+        try:
+            with self._locked():
+                # Drop registrations of worktree directories that were deleted
+                self.git("worktree", "prune")
+                if self.git("rev-parse", "--verify", "-q", f"refs/heads/{branch}", check=False).returncode == 0:
+                    self.git("worktree", "add", "-q", str(path), branch)
+                else:
+                    self.git("worktree", "add", "-q", "-b", branch, str(path), self.base)
+            return path
+        except subprocess.CalledProcessError as e:
+            print(f"Error creating worktree for {name}: {e.stderr.strip() or e}")
+            return None
+
+    def remove(self, name: str, force: bool = False, delete_branch: bool = False) -> bool:
+        try:
+            with self._locked():
+                self.git("worktree", "remove", *(["--force"] if force else []), str(self.path_for(name)))
+                if delete_branch:
+                    self.git("branch", "-D" if force else "-d", self.branch_for(name))
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error removing worktree for {name}: {e.stderr.strip() or e}")
+            return False
+
+    def _counts(self, branch: str) -> List[int]:
+        result = self.git("rev-list", "--left-right", "--count", f"{branch}...{self.base}", check=False)
+        counts = result.stdout.split()
+        return [int(c) for c in counts] if result.returncode == 0 and len(counts) == 2 else [0, 0]
+
+    def list(self, status: bool = True) -> List[Worktree]:
+        """Agent worktrees from one `git worktree list`; status adds ahead/behind and dirty counts"""
+        result = self.git("worktree", "list", "--porcelain", check=False)
+        worktrees = []
+        entry: Dict[str, str] = {}
+        for line in result.stdout.split('\n') + [""]:
+            if line:
+                key, _, value = line.partition(' ')
+                entry[key] = value
+                continue
+            branch = entry.get("branch", "").replace("refs/heads/", "", 1)
+            if branch.startswith(BRANCH_PREFIX):
+                worktrees.append(Worktree(branch[len(BRANCH_PREFIX):], entry["worktree"], branch,
+                                          entry.get("HEAD", "")[:12]))
+            entry = {}
+        if status:
+            for worktree in worktrees:
+                worktree.ahead, worktree.behind = self._counts(worktree.branch)
+                changes = self.git("status", "--porcelain", cwd=Path(worktree.path), check=False).stdout
+                worktree.dirty = len(changes.splitlines())
+        return worktrees
+
+    def _conflicts(self, cwd: Path) -> List[str]:
+        return self.git("diff", "--name-only", "--diff-filter=U", cwd=cwd, check=False).stdout.split()
+
+    def merge(self, name: str) -> MergeResult:
+        """Merge an agent's committed work into the base branch; a conflicting merge is aborted"""
+        branch = self.branch_for(name)
+        with self._locked():
+            commits = self._counts(branch)[0]
+            if not commits:
+                return MergeResult(name, branch, True, 0, "up to date")
+            try:
+                self.git("merge", "--no-ff", "--no-edit", "-m", f"Merge {branch} into {self.base}", branch)
+                return MergeResult(name, branch, True, commits, f"merged {commits} commit(s)")
+            except subprocess.CalledProcessError as e:
+                conflicts = self._conflicts(self.repo)
+                self.git("merge", "--abort", check=False)
+                reason = "conflicts" if conflicts else (e.stderr.strip() or e.stdout.strip()).split('\n')[0]
+                return MergeResult(name, branch, False, commits, reason, conflicts)
+
+    def sync(self, name: str) -> MergeResult:
+        """Merge the base branch into an agent's worktree so it builds on the integrated code"""
+        branch = self.branch_for(name)
+        path = self.path_for(name)
+        with self._locked():
+            behind = self._counts(branch)[1]
+            if not behind:
+                return MergeResult(name, branch, True, 0, "up to date")
+            try:
+                self.git("merge", "--no-edit", "-m", f"Merge {self.base} into {branch}", self.base, cwd=path)
+                return MergeResult(name, branch, True, behind, f"took {behind} commit(s) from {self.base}")
+            except subprocess.CalledProcessError as e:
+                conflicts = self._conflicts(path)
+                self.git("merge", "--abort", cwd=path, check=False)
+                reason = "conflicts" if conflicts else (e.stderr.strip() or e.stdout.strip()).split('\n')[0]
+                return MergeResult(name, branch, False, behind, reason, conflicts)
+
+
+def print_result(result: MergeResult):
+    print(f"{'✓' if result.merged else '✗'} {result.branch:<28} {result.message}")
+    for path in result.conflicts or []:
+        print(f"    conflict: {path}")
+
+
+def main():
+    from team_spec import TeamSpec, DEFAULT_SPEC
+
+    parser = argparse.ArgumentParser(description="Per-agent git worktrees of the team's workspace")
+    parser.add_argument("--spec", type=Path, help=f"Team spec (default: $TEAM_SPEC or {DEFAULT_SPEC.relative_to(Path(__file__).parent)})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("create", help="Create a worktree for every agent of the team")
+    sub.add_parser("list", help="Agent worktrees with ahead/behind and uncommitted files")
+    for command, text in (("merge", "Merge agent branches into the workspace branch"),
+                          ("sync", "Merge the workspace branch into agent worktrees")):
+        command_parser = sub.add_parser(command, help=text)
+        command_parser.add_argument("names", nargs="*", help="Agent window names (e.g. lead tester-03)")
+        command_parser.add_argument("--all", action="store_true", help="Every agent worktree")
+    remove_parser = sub.add_parser("remove", help="Remove an agent's worktree")
+    remove_parser.add_argument("name")
+    remove_parser.add_argument("--force", action="store_true", help="Even with uncommitted changes")
+    remove_parser.add_argument("--delete-branch", action="store_true", help="Delete the agent branch too")
+
+    args = parser.parse_args()
+    team = TeamSpec.load(args.spec)
+    manager = team.worktree_manager()
+
+    if args.command == "create":
+        if not manager.ensure_repo():
+            sys.exit(1)
+        slots = [slot for slot in team.slots() if slot.worktree]
+        if not slots:
+            print("The team spec has no \"worktrees\" directory, so agents share the workspace")
+        ok = True
+        for slot in slots:
+            path = manager.add(slot.window_name)
+            ok = ok and path is not None
+            print(f"  {'✓' if path else '✗'} {manager.branch_for(slot.window_name):<28} {slot.worktree}")
+        sys.exit(0 if ok else 1)
+    elif args.command == "list":
+        worktrees = manager.list()
+        if not worktrees:
+            print("No agent worktrees")
+            return
+        print(f"{'BRANCH':<28} {'HEAD':<12} {'AHEAD':>5} {'BEHIND':>6} {'DIRTY':>5}  PATH")
+        for worktree in worktrees:
+            print(f"{worktree.branch:<28} {worktree.head:<12} {worktree.ahead:>5} {worktree.behind:>6} "
+                  f"{worktree.dirty:>5}  {worktree.path}")
+    elif args.command in ("merge", "sync"):
+        if not args.all and not args.names:
+            parser.error(f"name agents to {args.command}, or use --all")
+        names = [worktree.name for worktree in manager.list(status=False)] if args.all else args.names
+        if not names:
+            print("No agent worktrees")
+            return
+        results = [getattr(manager, args.command)(name) for name in names]
+        for result in results:
+            print_result(result)
+        sys.exit(0 if all(result.merged for result in results) else 1)
+    elif args.command == "remove":
+        sys.exit(0 if manager.remove(args.name, args.force, args.delete_branch) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,10 @@ from datetime import datetime
 from typing import Dict, List, Optional
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from supervisor import BriefingStore, Briefing
+from tmux_utils import tmux_socket_args
+
 class FastAPIBuilderLauncher:
     """Optimized launcher with faster Claude initialization"""
     
@@ -21,6 +25,8 @@ class FastAPIBuilderLauncher:
         self.workspace_dir = self.base_dir / "workspace"
         self.prompts_dir = self.base_dir / "prompts"
         self.project_config = {}
+        # Optional dedicated tmux server: TMUX_SOCKET is a socket name (-L) or path (-S)
+        self.tmux = ["tmux"] + tmux_socket_args(os.environ.get("TMUX_SOCKET", ""))
         
         # Colors for terminal output
         self.GREEN = '\033[0;32m'
@@ -30,10 +36,16 @@ class FastAPIBuilderLauncher:
         self.MAGENTA = '\033[0;35m'
         self.NC = '\033[0m'  # No Color
         
+    def save_briefing(self, window_num: int, agent_name: str, prompt_content: str):
+        """Cache the briefing so supervisor.py can re-brief the agent after a restart"""
+        BriefingStore().save(Briefing(target=f"{self.session_name}:{window_num}", agent_name=agent_name,
+                                      briefing=prompt_content, cwd=str(self.workspace_dir)))
+
     def launch_claude_in_window_fast(self, window_num: int, agent_name: str, prompt_content: str):
         """Optimized Claude launch - much faster"""
         
         print(f"  🚀 Starting {agent_name}...", end="", flush=True)
+        self.save_briefing(window_num, agent_name, prompt_content)
         
         # Step 1: Setup directory and start Claude (combined)
         setup_commands = [
@@ -43,7 +55,7 @@ class FastAPIBuilderLauncher:
         ]
         
         for cmd in setup_commands:
-            subprocess.run(["tmux", "send-keys", "-t", f"{self.session_name}:{window_num}", 
+            subprocess.run([*self.tmux, "send-keys", "-t", f"{self.session_name}:{window_num}", 
                            cmd, "Enter"])
             time.sleep(0.3)  # Reduced wait time
         
@@ -59,7 +71,7 @@ class FastAPIBuilderLauncher:
         
         # Use printf to handle multi-line content properly
         tmux_cmd = [
-            "tmux", "send-keys", "-t", f"{self.session_name}:{window_num}",
+            *self.tmux, "send-keys", "-t", f"{self.session_name}:{window_num}",
             f"printf '%s\\n' '{escaped_prompt}'", "Enter"
         ]
         
@@ -68,7 +80,7 @@ class FastAPIBuilderLauncher:
             time.sleep(0.5)  # Small wait for prompt to register
             
             # Send Enter to submit the prompt
-            subprocess.run(["tmux", "send-keys", "-t", f"{self.session_name}:{window_num}", 
+            subprocess.run([*self.tmux, "send-keys", "-t", f"{self.session_name}:{window_num}", 
                            "Enter"])
             
         except Exception as e:
@@ -86,12 +98,12 @@ class FastAPIBuilderLauncher:
         for i in range(0, len(lines), chunk_size):
             chunk = '\n'.join(lines[i:i+chunk_size])
             if chunk.strip():
-                subprocess.run(["tmux", "send-keys", "-t", 
+                subprocess.run([*self.tmux, "send-keys", "-t", 
                               f"{self.session_name}:{window_num}", 
                               chunk])
                 time.sleep(0.2)  # Minimal wait between chunks
         
-        subprocess.run(["tmux", "send-keys", "-t", 
+        subprocess.run([*self.tmux, "send-keys", "-t", 
                        f"{self.session_name}:{window_num}", "Enter"])
                        
     def launch_claude_in_window_parallel(self, agents_to_launch):
@@ -13,15 +13,22 @@ from datetime import datetime
 from typing import Dict, List, Optional
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from team_spec import TeamSpec, AgentSlot
+from supervisor import BriefingStore, Briefing
+
 class APIBuilderLauncher:
     """Intelligent launcher for API Builder with automated agent initialization"""
     
     def __init__(self):
-        self.session_name = "api_builder"
+        # Roles, windows, prompts and tmux server(s) come from the team spec ($TEAM_SPEC or team.json)
+        self.team = TeamSpec.load()
+        self.session_name = self.team.session
         self.base_dir = Path(__file__).parent
-        self.workspace_dir = self.base_dir / "workspace"
-        self.prompts_dir = self.base_dir / "prompts"
+        self.workspace_dir = self.team.workspace_dir
+        self.prompts_dir = self.team.prompts_dir
         self.project_config = {}
+        self.orchestrator = self.team.orchestrator()
         
         # Colors for terminal output
         self.GREEN = '\033[0;32m'
@@ -187,62 +194,48 @@ Test Coverage Target: {self.project_config['test_coverage_target']}%
         print(f"{self.GREEN}✅ Configuration saved to project_config.json{self.NC}")
         
     def kill_existing_session(self):
-        """Kill existing tmux session if it exists"""
-        subprocess.run(["tmux", "kill-session", "-t", self.session_name], 
-                      stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        """Kill the team's existing tmux sessions"""
+        self.team.kill(self.orchestrator)
         
     def create_tmux_session(self):
-        """Create the tmux session with all windows"""
+        """Create the team's tmux sessions and windows"""
         print(f"\n{self.YELLOW}🚀 Creating tmux session...{self.NC}")
         
         # Kill existing session
         self.kill_existing_session()
         
-        # Create new session
-        subprocess.run(["tmux", "new-session", "-d", "-s", self.session_name, 
-                       "-n", "orchestrator", "-c", str(self.workspace_dir)])
-        
-        # Agent configurations (including DevOps)
-        agents = [
-            ("lead", "Lead Developer"),
-            ("fastapi", "FastAPI Developer"),
-            ("mcp", "MCP Server Dev"),
-            ("make", "Make Builder"),
-            ("docs", "Documentation"),
-            ("tester", "E2E Tester"),
-            ("jupyter", "Jupyter Dev"),
-            ("devops", "DevOps Engineer")
-        ]
-        
-        # Create windows for each agent
-        for i, (name, title) in enumerate(agents, 1):
-            subprocess.run(["tmux", "new-window", "-t", f"{self.session_name}:{i}", 
-                          "-n", name, "-c", str(self.workspace_dir)])
-            print(f"  Created window {i}: {title}")
+        # Large teams are split across sessions; each window gets its role's directory and scrollback size
+        self.team.create(self.orchestrator, lambda slot, created: print(
+            f"  Created window {slot.target}: {slot.title}" if created else
+            f"  {self.RED}Could not create window {slot.target}: {slot.title}{self.NC}"))
             
         print(f"{self.GREEN}✅ Tmux session created{self.NC}")
         
-    def launch_claude_in_window(self, window_num: int, agent_name: str, prompt_content: str):
+    def save_briefing(self, slot: AgentSlot, prompt_content: str):
+        """Cache the briefing so supervisor.py can re-brief the agent after a restart"""
+        BriefingStore().save(Briefing(target=slot.target, agent_name=slot.title, briefing=prompt_content,
+                                      command=slot.command, cwd=slot.cwd))
+
+    def launch_claude_in_window(self, slot: AgentSlot, prompt_content: str):
         """Launch Claude in a specific window with optimized fast prompt sending"""
         
-        print(f"  🚀 Starting {agent_name}...", end="", flush=True)
+        print(f"  🚀 Starting {slot.title}...", end="", flush=True)
+        self.save_briefing(slot, prompt_content)
         
         # Step 1: Setup directory and clear screen (combined for speed)
         setup_commands = [
-            f"cd {self.workspace_dir}",
+            f"cd {slot.cwd}",
             "clear"
         ]
         
         for cmd in setup_commands:
-            subprocess.run(["tmux", "send-keys", "-t", f"{self.session_name}:{window_num}", 
-                           cmd, "Enter"])
+            subprocess.run(self.orchestrator.tmux("send-keys", "-t", slot.target, cmd, "Enter"))
             time.sleep(0.2)  # Reduced wait time
         
         print(f" initializing...", end="", flush=True)
         
         # Step 2: Start Claude
-        subprocess.run(["tmux", "send-keys", "-t", f"{self.session_name}:{window_num}", 
-                       "claude", "Enter"])
+        subprocess.run(self.orchestrator.tmux("send-keys", "-t", slot.target, slot.command, "Enter"))
         time.sleep(1.5)  # Reduced Claude startup wait
         
         print(f" briefing...", end="", flush=True)
@@ -264,7 +257,7 @@ Test Coverage Target: {self.project_config['test_coverage_target']}%
                 os.chmod(str(fast_script_path), 0o755)
                 # Send entire prompt as one message
                 result = subprocess.run(["bash", str(fast_script_path), 
-                                       f"{self.session_name}:{window_num}", 
+                                       slot.target, 
                                        prompt_content],
                                        capture_output=True,
                                        text=True,
@@ -275,16 +268,16 @@ Test Coverage Target: {self.project_config['test_coverage_target']}%
                     
             else:
                 # Fallback to chunked sending if fast script not available
-                self.send_prompt_chunked(window_num, prompt_content)
+                self.send_prompt_chunked(slot.target, prompt_content)
                 
         except Exception as e:
             print(f" {self.YELLOW}(using fallback){self.NC}", end="", flush=True)
             # Fallback to chunked sending
-            self.send_prompt_chunked(window_num, prompt_content)
+            self.send_prompt_chunked(slot.target, prompt_content)
         
         print(f" {self.GREEN}✅ Ready!{self.NC}")
     
-    def send_prompt_chunked(self, window_num: int, prompt_content: str):
+    def send_prompt_chunked(self, target: str, prompt_content: str):
         """Fallback chunked sending if fast method fails - optimized to only sleep once at the end"""
         lines = prompt_content.split('\n')
         chunk_size = 100  # Larger chunks since we're not sleeping between them
@@ -294,16 +287,13 @@ Test Coverage Target: {self.project_config['test_coverage_target']}%
             chunk = '\n'.join(lines[i:i+chunk_size])
             if chunk.strip():
                 # Send just the text, no Enter
-                subprocess.run(["tmux", "send-keys", "-t", 
-                              f"{self.session_name}:{window_num}", 
-                              chunk])
+                subprocess.run(self.orchestrator.tmux("send-keys", "-t", target, chunk))
         
         # Single sleep at the end to let all chunks register
         time.sleep(0.5)
         
         # Send ONE Enter at the very end to execute everything
-        subprocess.run(["tmux", "send-keys", "-t", 
-                       f"{self.session_name}:{window_num}", "Enter"])
+        subprocess.run(self.orchestrator.tmux("send-keys", "-t", target, "Enter"))
     
     def create_fast_send_script(self):
         """Create an optimized send script that doesn't use sleep"""
@@ -355,17 +345,7 @@ echo "Message sent to $WINDOW"
             print(f" {self.YELLOW}(not found, using defaults){self.NC}")
         
         # Read base prompts and customize them
-        agents = [
-            (0, "orchestrator", "Orchestrator"),
-            (1, "lead", "Lead Developer"),
-            (2, "fastapi", "FastAPI Developer"),
-            (3, "mcp", "MCP Server Developer"),
-            (4, "make", "Make Command Builder"),
-            (5, "docs", "Documentation Developer"),
-            (6, "tester", "E2E Tester"),
-            (7, "jupyter", "Jupyter Developer"),
-            (8, "devops", "DevOps Engineer")
-        ]
+        agents = self.team.slots()
         
         print(f"\n{self.YELLOW}Starting agent initialization sequence...{self.NC}")
         
@@ -403,23 +383,21 @@ echo "Message sent to $WINDOW"
         
         start_time = time.time()
         
-        for idx, (window_num, prompt_file, agent_name) in enumerate(agents, 1):
-            print(f"\n{self.MAGENTA}[Agent {idx}/{total_agents}]{self.NC} {agent_name}")
+        for idx, slot in enumerate(agents, 1):
+            print(f"\n{self.MAGENTA}[Agent {idx}/{total_agents}]{self.NC} {slot.title}")
             print(f"{'─' * 60}")
             
-            # Read base prompt
-            prompt_path = self.prompts_dir / f"prompt_{prompt_file}.md"
-            enhanced_prompt_path = self.prompts_dir / f"enhanced_prompt_{prompt_file}.md"
+            # Read base prompt (enhanced prompt if available)
+            base_prompt = self.team.base_prompt(slot)
             
-            # Use enhanced prompt if available
-            if enhanced_prompt_path.exists():
-                with open(enhanced_prompt_path, 'r') as f:
-                    base_prompt = f.read()
-            elif prompt_path.exists():
-                with open(prompt_path, 'r') as f:
-                    base_prompt = f.read()
+            # Agents with a worktree commit on their own branch; the orchestrator integrates
+            if slot.worktree:
+                workspace_note = (f"You work in your own git worktree at {slot.worktree} on branch "
+                                  f"agent/{slot.window_name}. Build, test and commit there; the orchestrator "
+                                  f"merges agent branches (agent_worktrees.py merge) and syncs the integrated "
+                                  f"code back to you.")
             else:
-                base_prompt = f"You are the {agent_name} agent."
+                workspace_note = f"You work in {slot.cwd}."
             
             # Customize prompt with project context and standards
             customized_prompt = f"""
@@ -446,6 +424,9 @@ Based on the project configuration above, your specific focus areas are:
 ## GITHUB REPOSITORY
 {'Repository Name: ' + repo_name if repo_name else 'No GitHub repository requested'}
 
+## YOUR WORKSPACE
+{workspace_note}
+
 ## CRITICAL REMINDERS
 1. FIRST: Read AGENT_STANDARDS.md completely
 2. Use Python 3.12 ONLY (not 3.13)
@@ -460,7 +441,7 @@ Please acknowledge that you understand your role, the project requirements, and
 """
             
             # Launch Claude with customized prompt
-            self.launch_claude_in_window(window_num, agent_name, customized_prompt)
+            self.launch_claude_in_window(slot, customized_prompt)
             
             # Show progress and time remaining
             remaining = total_agents - idx
@@ -493,26 +474,23 @@ Please acknowledge that you understand your role, the project requirements, and
         print(f"🎉 API Builder Team is Ready!")
         print(f"{'='*70}{self.NC}\n")
         
-        print(f"{self.GREEN}All 8 agents have been launched with customized prompts based on:{self.NC}")
+        print(f"{self.GREEN}All {len(self.team.slots())} agents have been launched with customized prompts based on:{self.NC}")
         print(f"  • Project: {self.project_config['name']}")
         print(f"  • API Type: {self.project_config['api_type']}")
         print(f"  • Database: {self.project_config['database']}")
         print(f"  • Features: {', '.join(self.project_config['features'])}")
         
         print(f"\n{self.YELLOW}To monitor your team:{self.NC}")
-        print(f"  1. Attach to session: {self.CYAN}tmux attach -t {self.session_name}{self.NC}")
-        print(f"  2. Switch windows: {self.CYAN}Ctrl+B then [0-7]{self.NC}")
+        print(f"  1. Attach to session: {self.CYAN}{' '.join(self.orchestrator.tmux('attach', '-t', self.session_name))}{self.NC}")
+        print(f"  2. Switch windows: {self.CYAN}Ctrl+B then a window number (Ctrl+B then ( or ) for the next session){self.NC}")
         print(f"  3. Detach: {self.CYAN}Ctrl+B then D{self.NC}")
         
         print(f"\n{self.YELLOW}Window Layout:{self.NC}")
-        print("  0: Orchestrator (coordinating all agents)")
-        print("  1: Lead Developer (managing team)")
-        print("  2: FastAPI Developer (building API)")
-        print("  3: MCP Server Developer (Claude tools)")
-        print("  4: Make Command Builder (automation)")
-        print("  5: Documentation Developer (docs)")
-        print("  6: E2E Tester (testing)")
-        print("  7: Jupyter Developer (notebooks)")
+        for session, slots in self.team.by_session().items():
+            if len(self.team.sessions()) > 1:
+                print(f"  {session}:")
+            for slot in slots:
+                print(f"  {slot.window_index}: {slot.title}" + (f" ({slot.description})" if slot.description else ""))
         
         print(f"\n{self.MAGENTA}The agents are now working autonomously on your project!{self.NC}")
         print(f"{self.MAGENTA}They will commit code every 30 minutes and coordinate tasks.{self.NC}")
@@ -530,7 +508,7 @@ Please acknowledge that you understand your role, the project requirements, and
             # Ask if user wants to attach immediately
             attach = self.get_user_input("\nAttach to session now? (y/n)", "y")
             if attach.lower() == 'y':
-                os.system(f"tmux attach -t {self.session_name}")
+                subprocess.run(self.orchestrator.tmux("attach", "-t", self.session_name))
                 
         except KeyboardInterrupt:
             print(f"\n{self.RED}Launcher cancelled by user{self.NC}")
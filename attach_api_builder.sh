@@ -1,28 +1,33 @@
 #!/bin/bash
 # Quick attach to API builder session
+# Sessions and windows come from the team spec (api_builder/team.json or $TEAM_SPEC)
 
-SESSION="api_builder"
+DIR="$(cd "$(dirname "$0")" && pwd)"
+SESSIONS=($(python3 "$DIR/team_spec.py" sessions))
+SESSION="${SESSIONS[0]:-api_builder}"
 
-if tmux has-session -t $SESSION 2>/dev/null; then
+# TMUX_SOCKET selects a dedicated tmux server (socket name, or a path containing /)
+TMUX_CMD=(tmux)
+case "$TMUX_SOCKET" in
+    "") ;;
+    */*) TMUX_CMD=(tmux -S "$TMUX_SOCKET") ;;
+    *) TMUX_CMD=(tmux -L "$TMUX_SOCKET") ;;
+esac
+
+if "${TMUX_CMD[@]}" has-session -t $SESSION 2>/dev/null; then
     echo "Attaching to $SESSION..."
     echo ""
     echo "Tmux Commands:"
     echo "  Ctrl+B then D     - Detach from session"
-    echo "  Ctrl+B then [0-7] - Switch to window"
+    echo "  Ctrl+B then [0-9] - Switch to window"
+    echo "  Ctrl+B then ( )   - Previous/next session"
     echo "  Ctrl+B then c     - Create new window"
     echo "  Ctrl+B then ,     - Rename current window"
     echo ""
     echo "Windows:"
-    echo "  0: Orchestrator"
-    echo "  1: Lead Developer"
-    echo "  2: FastAPI Developer"
-    echo "  3: MCP Server Developer"
-    echo "  4: Make Command Builder"
-    echo "  5: Documentation Developer"
-    echo "  6: E2E Tester"
-    echo "  7: Jupyter Developer"
+    python3 "$DIR/team_spec.py" show
     echo ""
-    tmux attach -t $SESSION
+    "${TMUX_CMD[@]}" attach -t $SESSION
 else
     echo "Session $SESSION not found. Run setup_api_builder.sh first."
 fi
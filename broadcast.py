@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Broadcast one message to many agent windows
+Selects windows by session, window name glob, role (window name substring)
+and agent state, then delivers with a shared paste buffer: one tmux call
+pastes into every window and one more submits, so telling 50 agents costs
+about the same as telling one.
+
+  broadcast.py "Stop and commit your work"
+  broadcast.py --session api_builder --role dev --state idle "New standard: ..."
+"""
+
+import sys
+import time
+import argparse
+
+from tmux_shards import make_orchestrator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send one message to every matching agent window")
+    parser.add_argument("message", nargs="*")
+    parser.add_argument("--session", help="Only windows in this session")
+    parser.add_argument("--name", help="Window name glob (e.g. 'dev-*')")
+    parser.add_argument("--role", help="Window name contains this (case-insensitive)")
+    parser.add_argument("--state", action="append", help="Only agents in this state (repeatable): busy, idle, "
+                                                         "awaiting_input, errored, exited")
+    parser.add_argument("--exclude", action="append", help="Skip this session:window or window name (repeatable)")
+    parser.add_argument("--no-submit", action="store_true", help="Paste without pressing Enter")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the windows that would receive it")
+    parser.add_argument("--shards", type=int, default=0, help="Broadcast across N sharded tmux servers")
+    args = parser.parse_args()
+
+    if not args.message and not args.dry_run:
+        parser.error("a message is required")
+    orchestrator = make_orchestrator(args.shards)
+    message = ' '.join(args.message)
+    if args.dry_run:
+        for pane in orchestrator.select_windows(args.session, args.name, args.role, args.state, args.exclude):
+            print(f"{pane.target:<18} {pane.window_name}")
+        return
+
+    started = time.perf_counter()
+    sent = orchestrator.broadcast(message, args.session, args.name, args.role, args.state, args.exclude,
+                                  submit=not args.no_submit)
+    elapsed = time.perf_counter() - started
+    for target, ok in sent.items():
+        print(f"{'✓' if ok else '✗'} {target}")
+    if not sent:
+        print("No windows matched")
+        sys.exit(1)
+    print(f"Broadcast to {sum(sent.values())}/{len(sent)} windows in {elapsed:.2f}s")
+    if not all(sent.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
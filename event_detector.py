@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Pane output event detector
+Runs one compiled multi-pattern regex per agent role over only the new lines of
+each pane and emits typed events (test_failure, traceback, merge_conflict,
+permission_prompt, waiting_for_input, ...) with pane and line context, so the
+orchestrator reacts to events instead of reading raw snapshots.
+
+Rule sets are configurable per role (window name) with a JSON file:
+  {"rules": [{"event": "deploy_failed", "pattern": "rollout .* failed",
+              "severity": "error", "roles": ["devops"]}],
+   "disable": {"orchestrator": ["waiting_for_input"]}}
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from typing import List, Dict, Optional, Iterable, Tuple
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+
+from note_store import append_line
+from tmux_utils import TmuxOrchestrator, TmuxPane, ScrollbackReader
+
+DEFAULT_LOG_DIR = Path(__file__).parent / "registry" / "logs" / "events"
+
+
+@dataclass
+class Rule:
+    event: str
+    pattern: str
+    severity: str = "warning"  # info, warning, error, attention
+    roles: List[str] = field(default_factory=list)  # window name substrings; empty = every role
+    ignore_case: bool = True
+
+    def applies_to(self, role: str) -> bool:
+        role = role.lower()
+        return not self.roles or any(r.lower() in role for r in self.roles)
+
+
+@dataclass
+class Event:
+    event: str
+    severity: str
+    target: str
+    role: str
+    line: str
+    match: str
+    ts: float
+    pane_id: str = ""
+    context: List[str] = field(default_factory=list)  # lines leading up to the match
+
+
+DEFAULT_RULES = [
+    Rule("traceback", r"Traceback \(most recent call last\)", "error"),
+    Rule("test_failure", r"^(FAILED|FAIL:|ERROR:) |\b\d+ failed\b|Tests?:\s+\d+ failed|\bAssertionError\b", "error"),
+    Rule("merge_conflict", r"CONFLICT \(|Automatic merge failed|<<<<<<< ", "error"),
+    Rule("command_not_found", r"command not found|No such file or directory", "warning"),
+    Rule("build_error", r"\berror(\[E\d+\])?: |SyntaxError:|ModuleNotFoundError:|npm ERR!", "error"),
+    Rule("git_fatal", r"^fatal: ", "error"),
+    Rule("permission_prompt", r"Do you want to (proceed|make this edit|create|run)|❯ 1\. Yes|Allow .* \?|\[y/N\]|\[Y/n\]|\(y/n\)",
+         "attention"),
+    Rule("waiting_for_input", r"waiting for (your )?input|Press Enter|Continue\?|Human:", "attention"),
+    Rule("rate_limited", r"rate limit|429 Too Many Requests|overloaded", "warning"),
+    Rule("tests_passed", r"\b\d+ passed\b(?!.*failed)|All tests passed", "info"),
+]
+
+
+class RuleSet:
+    """Rules for one role compiled into a single alternation; the matching rule is the named group"""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        parts = []
+        for i, rule in enumerate(rules):
+            re.compile(rule.pattern)  # report bad patterns against the rule, not the combined regex
+            flags = "?i:" if rule.ignore_case else "?:"
+            parts.append(f"(?P<r{i}>({flags}{rule.pattern}))")
+        self.regex = re.compile('|'.join(parts), re.MULTILINE) if parts else None
+
+    def scan(self, lines: List[str]) -> Iterable[Tuple[int, Rule, str]]:
+        """(line index, rule, matched text) for each rule that matches a line, in line order"""
+        if not self.regex or not lines:
+            return
+        text = '\n'.join(lines)
+        starts = [0]
+        for line in lines[:-1]:
+            starts.append(starts[-1] + len(line) + 1)
+        seen = set()
+        for m in self.regex.finditer(text):
+            index = bisect_right(starts, m.start()) - 1
+            rule = self.rules[int(m.lastgroup[1:])]
+            if (index, rule.event) not in seen:
+                seen.add((index, rule.event))
+                yield index, rule, m.group()
+
+
+class EventDetector:
+    """Feeds new pane lines through the role's rule set and returns typed events"""
+
+    def __init__(self, rules: Optional[List[Rule]] = None, disabled: Optional[Dict[str, List[str]]] = None,
+                 context_lines: int = 3, dedupe_seconds: float = 300, max_reported: int = 5000):
+        self.rules = list(rules if rules is not None else DEFAULT_RULES)
+        self.disabled = disabled or {}
+        self.context_lines = context_lines
+        self._rule_sets: Dict[str, RuleSet] = {}
+        self._recent: Dict[str, deque] = {}  # target -> last lines fed, for context
+        # (target, event, line) -> last seen: screen lines are seen again once they scroll into history
+        self._reported: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+        self.dedupe_seconds = dedupe_seconds
+        self.max_reported = max_reported
+
+    @classmethod
+    def from_file(cls, path: Path, **kwargs) -> "EventDetector":
+        """Default rules plus (or overridden by) the rules in a JSON config"""
+        with open(path, 'r') as f:
+            config = json.load(f)
+        custom = [Rule(**rule) for rule in config.get("rules", [])]
+        names = {rule.event for rule in custom}
+        rules = ([] if config.get("replace_defaults") else
+                 [rule for rule in DEFAULT_RULES if rule.event not in names]) + custom
+        return cls(rules, config.get("disable", {}), **kwargs)
+
+    def rule_set(self, role: str) -> RuleSet:
+        if role not in self._rule_sets:
+            disabled = {event for pattern, events in self.disabled.items()
+                        if pattern.lower() in role.lower() for event in events}
+            self._rule_sets[role] = RuleSet([r for r in self.rules
+                                             if r.applies_to(role) and r.event not in disabled])
+        return self._rule_sets[role]
+
+    def feed(self, target: str, role: str, lines: List[str], pane_id: str = "",
+             ts: Optional[float] = None) -> List[Event]:
+        ts = ts or time.time()
+        recent = self._recent.setdefault(target, deque(maxlen=self.context_lines))
+        events = []
+        for index, rule, matched in self.rule_set(role).scan(lines):
+            line = lines[index]
+            key = (target, rule.event, line)
+            last_seen = self._reported.pop(key, None)
+            self._reported[key] = ts
+            if len(self._reported) > self.max_reported:
+                self._reported.popitem(last=False)
+            if last_seen is not None and ts - last_seen < self.dedupe_seconds:
+                continue
+            before = lines[max(0, index - self.context_lines):index]
+            if len(before) < self.context_lines:
+                before = list(recent)[len(before) - self.context_lines:] + before
+            events.append(Event(rule.event, rule.severity, target, role, line, matched, ts, pane_id, before))
+        recent.extend(lines[-self.context_lines:])
+        return events
+
+    def forget(self, target: str):
+        self._recent.pop(target, None)
+
+
+class PaneEventStream:
+    """Polls the fleet and feeds each pane's new lines to a detector.
+
+    New lines are the scrollback that arrived since the last poll plus visible
+    screen lines that weren't on screen before (prompts often never scroll).
+    The screen is only captured for panes tmux reports activity for.
+    """
+
+    def __init__(self, detector: EventDetector, orchestrator: Optional[TmuxOrchestrator] = None,
+                 session_name: Optional[str] = None, log_dir: Optional[Path] = None):
+        self.detector = detector
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        self.session_name = session_name
+        self.log_dir = Path(log_dir) if log_dir else DEFAULT_LOG_DIR
+        self.reader = ScrollbackReader(self.orchestrator)
+        self._screens: Dict[str, Tuple[float, List[str]]] = {}  # pane_id -> (activity, screen lines)
+        self.lines_scanned = 0
+
+    def _new_screen_lines(self, pane: TmuxPane) -> List[str]:
+        previous = self._screens.get(pane.pane_id)
+        if previous and previous[0] == pane.last_activity:
+            return []
+        screen = [line for line in self.reader.read_screen(pane) if line.strip()]
+        self._screens[pane.pane_id] = (pane.last_activity, screen)
+        old = set(previous[1]) if previous else set()
+        return [line for line in screen if line not in old]
+
+    def poll(self) -> List[Event]:
+        events = []
+        live = set()
+        for pane in self.orchestrator.list_panes(self.session_name):
+            if not pane.agent_pane:
+                continue
+            live.add(pane.pane_id)
+            lines = self.reader.read_new_lines(pane) + self._new_screen_lines(pane)
+            self.lines_scanned += len(lines)
+            events += self.detector.feed(pane.target, pane.window_name, lines, pane.pane_id)
+        for pane_id in list(self._screens):
+            if pane_id not in live:
+                del self._screens[pane_id]
+                self.reader.forget(pane_id)
+        for event in events:
+            append_line(self.log_dir / f"{datetime.fromtimestamp(event.ts).strftime('%Y-%m-%d')}.jsonl",
+                        asdict(event))
+        return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect typed events in agent pane output")
+    parser.add_argument("--rules", type=Path, help="JSON rule config (added to / overriding the defaults)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    watch_parser = sub.add_parser("watch", help="Poll all agent panes and print events as NDJSON")
+    watch_parser.add_argument("--session", help="Only watch one session")
+    watch_parser.add_argument("--interval", type=float, default=2.0)
+    watch_parser.add_argument("--severity", nargs="*", help="Only print these severities")
+
+    scan_parser = sub.add_parser("scan", help="Scan a file (or stdin) and print events as NDJSON")
+    scan_parser.add_argument("file", nargs="?", default="-")
+    scan_parser.add_argument("--role", default="", help="Role (window name) whose rule set to use")
+
+    rules_parser = sub.add_parser("rules", help="List the rules that apply to a role")
+    rules_parser.add_argument("--role", default="")
+
+    args = parser.parse_args()
+    detector = EventDetector.from_file(args.rules) if args.rules else EventDetector()
+
+    if args.command == "watch":
+        stream = PaneEventStream(detector, session_name=args.session)
+        try:
+            while True:
+                for event in stream.poll():
+                    if not args.severity or event.severity in args.severity:
+                        print(json.dumps(asdict(event)), flush=True)
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "scan":
+        detector.dedupe_seconds = 0  # a file has no redraws: every matching line counts
+        source = sys.stdin if args.file == "-" else open(args.file, 'r', errors='replace')
+        started = time.perf_counter()
+        count = 0
+        batch: List[str] = []
+        for line in source:
+            batch.append(line.rstrip('\n'))
+            if len(batch) >= 5000:
+                for event in detector.feed(args.file, args.role, batch):
+                    print(json.dumps(asdict(event)))
+                count += len(batch)
+                batch = []
+        for event in detector.feed(args.file, args.role, batch):
+            print(json.dumps(asdict(event)))
+        count += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"Scanned {count} lines in {elapsed * 1000:.0f} ms", file=sys.stderr)
+    elif args.command == "rules":
+        for rule in detector.rule_set(args.role).rules:
+            print(f"{rule.event:<20} {rule.severity:<10} {rule.pattern}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Live fleet monitor
+top-style dashboard of every agent window: state, last output line, output
+rate and idle time. Each refresh is one batched list-panes call; states come
+from tmux_utils.AgentStateClassifier, which only captures a pane (a few lines
+up to the cursor) when tmux reports new activity.
+"""
+
+import sys
+import shutil
+import time
+import argparse
+from typing import List, Dict, Optional
+from dataclasses import dataclass
+
+from tmux_utils import TmuxOrchestrator, TmuxPane, AgentStateClassifier
+from resource_sampler import ResourceSampler
+from tmux_shards import make_orchestrator
+from team_spec import TeamSpec
+
+# Colors for terminal output
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+CYAN = '\033[0;36m'
+RED = '\033[0;31m'
+MAGENTA = '\033[0;35m'
+DIM = '\033[2m'
+NC = '\033[0m'  # No Color
+
+STATE_COLORS = {
+    "busy": GREEN,
+    "idle": DIM,
+    "awaiting_input": MAGENTA,
+    "errored": RED,
+    "exited": YELLOW,
+}
+
+
+@dataclass
+class AgentRow:
+    target: str
+    name: str
+    command: str
+    state: str = "idle"
+    confidence: float = 0.0
+    reason: str = ""
+    last_line: str = ""
+    output_rate: float = 0.0  # lines per minute, smoothed
+    idle_seconds: float = 0.0
+    last_activity: float = 0.0
+    total_lines: int = 0
+    sampled_at: float = 0.0
+    cpu_percent: float = 0.0  # agent's whole process tree
+    rss_mb: float = 0.0
+    threads: int = 0
+    processes: int = 0
+
+
+class FleetMonitor:
+    """Incrementally tracks per-agent state across refreshes"""
+
+    def __init__(self, orchestrator: Optional[TmuxOrchestrator] = None,
+                 session_name: Optional[str] = None, tail_lines: int = 6,
+                 busy_seconds: float = 15, smoothing: float = 0.5, sessions: Optional[List[str]] = None):
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        self.session_name = session_name
+        self.sessions = set(sessions) if sessions else None  # e.g. every session of a team
+        self.tail_lines = tail_lines
+        self.busy_seconds = busy_seconds
+        self.smoothing = smoothing
+        self.classifier = AgentStateClassifier(self.orchestrator, busy_seconds, tail_lines)
+        self.sampler = ResourceSampler()
+        self.rows: Dict[str, AgentRow] = {}
+        self.captures = 0  # captures issued in the last refresh
+
+    def _agent_panes(self) -> List[TmuxPane]:
+        """One pane per window: the agent pane, which is what session:window targets resolve to"""
+        return [p for p in self.orchestrator.list_panes(self.session_name)
+                if p.agent_pane and (self.sessions is None or p.session_name in self.sessions)]
+
+    def refresh(self) -> List[AgentRow]:
+        """Sample the fleet once and return rows sorted by target"""
+        now = time.time()
+        self.classifier.captures = 0
+        seen = set()
+
+        panes = self._agent_panes()
+        usage = self.sampler.sample({pane.target: pane.pane_pid for pane in panes if pane.pane_pid and not pane.dead})
+        for pane in panes:
+            target = pane.target
+            seen.add(target)
+            row = self.rows.get(target)
+            if row is None:
+                row = self.rows[target] = AgentRow(target=target, name=pane.window_name,
+                                                   command=pane.current_command)
+
+            if row.sampled_at:
+                new_lines = max(0, pane.total_lines - row.total_lines)
+                if not new_lines and pane.last_activity > row.last_activity:
+                    new_lines = 1
+                rate = new_lines * 60 / max(now - row.sampled_at, 1e-6)
+                row.output_rate = self.smoothing * rate + (1 - self.smoothing) * row.output_rate
+
+            row.name = pane.window_name
+            row.command = pane.current_command
+            row.idle_seconds = max(0.0, now - pane.last_activity)
+            row.last_activity = pane.last_activity
+            row.total_lines = pane.total_lines
+            row.sampled_at = now
+
+            agent = self.classifier.classify(pane, now)
+            row.state = agent.state
+            row.confidence = agent.confidence
+            row.reason = agent.reason
+            if agent.last_line:
+                row.last_line = agent.last_line
+
+            resources = usage.get(target)
+            row.cpu_percent = resources.cpu_percent if resources else 0.0
+            row.rss_mb = resources.rss_mb if resources else 0.0
+            row.threads = resources.threads if resources else 0
+            row.processes = resources.processes if resources else 0
+
+        for target in list(self.rows):
+            if target not in seen:
+                del self.rows[target]
+        self.classifier.retain({pane.pane_id for pane in panes}, self.session_name)
+        self.captures = self.classifier.captures
+
+        return sorted(self.rows.values(), key=lambda r: (r.target.rsplit(':', 1)[0],
+                                                          int(r.target.rsplit(':', 1)[1])))
+
+
+def format_idle(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f}m{seconds % 60:02.0f}s"
+    return f"{seconds // 3600:.0f}h{(seconds % 3600) // 60:02.0f}m"
+
+
+def format_mb(mb: float) -> str:
+    return f"{mb / 1024:.1f}G" if mb >= 1024 else f"{mb:.0f}M"
+
+
+def render(rows: List[AgentRow], width: int = 120, footer: str = "") -> str:
+    """Render the dashboard as plain text"""
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row.state] = counts.get(row.state, 0) + 1
+    summary = "  ".join(f"{STATE_COLORS.get(state, '')}{state}: {n}{NC}" for state, n in sorted(counts.items()))
+
+    out = f"{CYAN}Tmux Fleet Monitor - {time.strftime('%H:%M:%S')} - {len(rows)} agents{NC}  {summary}\n"
+    out += (f"{'TARGET':<18} {'NAME':<14} {'STATE':<14} {'CMD':<10} {'CPU%':>6} {'MEM':>7} {'PROCS':>5} "
+            f"{'LINES/MIN':>9} {'IDLE':>7}  LAST OUTPUT\n")
+    last_width = max(10, width - 99)
+    for row in rows:
+        color = STATE_COLORS.get(row.state, '')
+        out += (f"{row.target[:18]:<18} {row.name[:14]:<14} {color}{row.state:<14}{NC} "
+                f"{row.command[:10]:<10} {row.cpu_percent:>6.1f} {format_mb(row.rss_mb):>7} {row.processes:>5} "
+                f"{row.output_rate:>9.1f} {format_idle(row.idle_seconds):>7}  "
+                f"{row.last_line[:last_width]}\n")
+    if footer:
+        out += f"{DIM}{footer}{NC}\n"
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live top-style monitor for all agent windows")
+    parser.add_argument("--session", help="Only show one session (default: all sessions)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Refresh interval in seconds")
+    parser.add_argument("--once", action="store_true", help="Print one snapshot and exit")
+    parser.add_argument("--shards", type=int, default=0, help="Merge agents from N sharded tmux servers (tmux_shards.py)")
+    parser.add_argument("--team", nargs="?", const="", metavar="SPEC",
+                        help="Only the sessions of a team, on its tmux server(s) (default spec: $TEAM_SPEC or "
+                             "api_builder/team.json)")
+    args = parser.parse_args()
+
+    if args.team is not None:
+        team = TeamSpec.load(args.team or None)
+        monitor = FleetMonitor(team.orchestrator(), session_name=args.session, sessions=team.sessions())
+    else:
+        monitor = FleetMonitor(make_orchestrator(args.shards), session_name=args.session)
+    try:
+        while True:
+            started = time.process_time()
+            rows = monitor.refresh()
+            width = shutil.get_terminal_size((120, 40)).columns
+            if args.once:
+                print(render(rows, width), end="")
+                break
+            cpu_ms = (time.process_time() - started) * 1000
+            footer = (f"refresh {args.interval:g}s | {monitor.captures} captures | {cpu_ms:.1f} ms CPU "
+                      f"| /proc sample {monitor.sampler.last_duration * 1000:.1f} ms "
+                      f"| Ctrl+C to quit")
+            sys.stdout.write("\033[H\033[2J" + render(rows, width, footer))
+            sys.stdout.flush()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print()
+
+
+if __name__ == "__main__":
+    main()
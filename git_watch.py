@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Git activity watcher
+Tracks branch, head, uncommitted files and commit times of every agent
+workspace (the team's workspace and each agent worktree) without running git
+on every look. Each pass stats HEAD, the index, the branch ref, packed-refs
+and the HEAD reflog; commits are read from the new bytes of the reflog, and
+git itself only runs (`git status`, with optional locks off) when one of those
+files changed or the dirty count is older than dirty_interval, since edits to
+the working tree alone touch none of them. Results are cached in
+registry/sessions/git_activity.json, so a one-off `status` is as cheap as the
+running watcher.
+
+Metrics per workspace: commits in the last hour, commits per hour over the
+last day, minutes since the last commit and whether that exceeds the
+30-minute commit rule from AGENT_STANDARDS.md.
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+import subprocess
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+
+from note_store import atomic_write
+
+DEFAULT_CACHE = Path(__file__).parent / "registry" / "sessions" / "git_activity.json"
+COMMIT_INTERVAL_MINUTES = 30
+DIRTY_INTERVAL = 60.0
+HISTORY_SECONDS = 24 * 3600
+
+
+@dataclass
+class WorkspaceActivity:
+    name: str
+    path: str
+    branch: str = ""
+    head: str = ""
+    dirty: int = -1  # uncommitted and untracked files; -1 until first checked
+    files: int = 0  # tracked files (from the index header)
+    last_commit: float = 0.0
+    commits: List[float] = field(default_factory=list)  # commit times within HISTORY_SECONDS
+    signature: List = field(default_factory=list)  # stat of HEAD, index, branch ref, packed-refs, reflog
+    reflog_offset: int = 0
+    reflog_inode: int = 0
+    dirty_checked: float = 0.0
+    updated: float = 0.0  # last time any git state changed
+    first_seen: float = 0.0  # the commit clock of a workspace without commits starts here
+
+
+def git_dirs(path: Path) -> Optional[Tuple[Path, Path]]:
+    """(git dir, common git dir) of a checkout or worktree, read from .git without running git"""
+    dot_git = path / ".git"
+    if dot_git.is_dir():
+        return dot_git, dot_git
+    try:
+        with open(dot_git, 'r') as f:
+            text = f.read().strip()
+    except OSError:
+        return None
+    if not text.startswith("gitdir:"):
+        return None
+    git_dir = (path / text[len("gitdir:"):].strip()).resolve()
+    try:
+        with open(git_dir / "commondir", 'r') as f:
+            return git_dir, (git_dir / f.read().strip()).resolve()
+    except OSError:
+        return git_dir, git_dir
+
+
+def stat_key(path: Path) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+def read_head(git_dir: Path, common_dir: Path) -> Tuple[str, str]:
+    """(branch, commit) from HEAD and the branch ref or packed-refs; branch is empty when detached"""
+    try:
+        with open(git_dir / "HEAD", 'r') as f:
+            head = f.read().strip()
+    except OSError:
+        return "", ""
+    if not head.startswith("ref: "):
+        return "", head
+    ref = head[len("ref: "):]
+    branch = ref.replace("refs/heads/", "", 1)
+    try:
+        with open(common_dir / ref, 'r') as f:
+            return branch, f.read().strip()
+    except OSError:
+        pass
+    try:
+        with open(common_dir / "packed-refs", 'r') as f:
+            for line in f:
+                if line.rstrip('\n').endswith(f" {ref}"):
+                    return branch, line.split(' ', 1)[0]
+    except OSError:
+        pass
+    return branch, ""  # no commits yet
+
+
+def index_entries(git_dir: Path) -> int:
+    """Tracked file count from the 12-byte index header"""
+    try:
+        with open(git_dir / "index", 'rb') as f:
+            header = f.read(12)
+    except OSError:
+        return 0
+    if len(header) < 12 or header[:4] != b"DIRC":
+        return 0
+    return struct.unpack(">I", header[8:12])[0]
+
+
+def reflog_commits(lines: List[str]) -> List[float]:
+    """Commit times from reflog lines: `<old> <new> <name> <email> <time> <tz>\t<message>`"""
+    times = []
+    for line in lines:
+        entry, _, message = line.partition('\t')
+        if not message.startswith("commit"):  # commit:, commit (initial):, commit (amend):, commit (merge):
+            continue
+        try:
+            times.append(float(entry.rsplit(' ', 2)[1]))
+        except (IndexError, ValueError):
+            continue
+    return times
+
+
+class GitActivityWatcher:
+    """Incremental, stat-driven git state of several workspaces"""
+
+    def __init__(self, workspaces: Dict[str, Path], cache_path: Optional[Path] = None,
+                 dirty_interval: float = DIRTY_INTERVAL, commit_interval: float = COMMIT_INTERVAL_MINUTES):
+        self.workspaces = {name: Path(path) for name, path in workspaces.items()}
+        self.cache_path = Path(cache_path) if cache_path else DEFAULT_CACHE
+        self.dirty_interval = dirty_interval
+        self.commit_interval = commit_interval
+        self.git_calls = 0  # git processes started by the last poll
+        self.state: Dict[str, WorkspaceActivity] = self._load()
+
+    def _load(self) -> Dict[str, WorkspaceActivity]:
+        try:
+            with open(self.cache_path, 'r') as f:
+                cached = json.load(f).get("workspaces", {})
+        except (OSError, ValueError, AttributeError):
+            cached = {}
+        state = {}
+        for name, path in self.workspaces.items():
+            try:
+                activity = WorkspaceActivity(**cached[name])
+            except (KeyError, TypeError):
+                activity = None
+            # A workspace that moved is a different checkout
+            state[name] = activity if activity and activity.path == str(path) else WorkspaceActivity(name, str(path))
+        return state
+
+    def save(self):
+        atomic_write(self.cache_path, json.dumps({"saved": time.time(),
+                                                  "workspaces": {n: asdict(a) for n, a in self.state.items()}}))
+
+    def _read_reflog(self, activity: WorkspaceActivity, git_dir: Path, now: float):
+        path = git_dir / "logs" / "HEAD"
+        try:
+            with open(path, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                size = os.fstat(f.fileno()).st_size
+                if inode != activity.reflog_inode or size < activity.reflog_offset:
+                    # Rewritten (reflog expire) or replaced: start over
+                    activity.reflog_offset = 0
+                    activity.commits = []
+                    activity.reflog_inode = inode
+                f.seek(activity.reflog_offset)
+                data = f.read()
+        except OSError:
+            return
+        # Only whole lines; a line being appended is read next time
+        data = data[:data.rfind(b'\n') + 1]
+        activity.reflog_offset += len(data)
+        times = reflog_commits(data.decode(errors="replace").splitlines())
+        if times:
+            activity.last_commit = max(activity.last_commit, max(times))
+        activity.commits = [t for t in activity.commits + times if t >= now - HISTORY_SECONDS]
+
+    def _count_dirty(self, path: Path) -> int:
+        self.git_calls += 1
+        # No optional locks: a status check must never take index.lock from under an agent
+        result = subprocess.run(["git", "--no-optional-locks", "-C", str(path), "status", "--porcelain"],
+                                capture_output=True, text=True)
+        return len(result.stdout.splitlines()) if result.returncode == 0 else -1
+
+    def poll_one(self, activity: WorkspaceActivity, now: Optional[float] = None) -> bool:
+        """Refresh one workspace; returns True if anything changed"""
+        now = now or time.time()
+        activity.first_seen = activity.first_seen or now
+        dirs = git_dirs(Path(activity.path))
+        if dirs is None:
+            changed = activity.signature != []
+            activity.signature, activity.branch, activity.head, activity.dirty = [], "", "", -1
+            return changed
+        git_dir, common_dir = dirs
+        ref_path = common_dir / "refs" / "heads" / activity.branch if activity.branch else git_dir / "HEAD"
+        signature = [stat_key(git_dir / "HEAD"), stat_key(git_dir / "index"), stat_key(ref_path),
+                     stat_key(common_dir / "packed-refs"), stat_key(git_dir / "logs" / "HEAD")]
+        changed = signature != activity.signature
+        if changed:
+            activity.branch, activity.head = read_head(git_dir, common_dir)
+            activity.files = index_entries(git_dir)
+            self._read_reflog(activity, git_dir, now)
+            # The branch may have changed, and with it the ref to watch
+            ref_path = common_dir / "refs" / "heads" / activity.branch if activity.branch else git_dir / "HEAD"
+            signature[2] = stat_key(ref_path)
+            activity.signature = signature
+            activity.updated = now
+        if changed or now - activity.dirty_checked >= self.dirty_interval:
+            dirty = self._count_dirty(Path(activity.path))
+            activity.dirty_checked = now
+            if dirty != activity.dirty:
+                activity.dirty = dirty
+                activity.updated = now
+                changed = True
+        return changed
+
+    def poll(self, now: Optional[float] = None) -> List[WorkspaceActivity]:
+        now = now or time.time()
+        self.git_calls = 0
+        if any([self.poll_one(activity, now) for activity in self.state.values()]) or self.git_calls:
+            self.save()
+        return list(self.state.values())
+
+    def metrics(self, activity: WorkspaceActivity, now: Optional[float] = None) -> Dict:
+        """Cached per-workspace metrics"""
+        now = now or time.time()
+        recent = [t for t in activity.commits if t >= now - HISTORY_SECONDS]
+        since = (now - activity.last_commit) / 60 if activity.last_commit else None
+        waiting = (now - (activity.last_commit or activity.first_seen)) / 60
+        hourly = {}
+        for t in recent:
+            hour = datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:00')
+            hourly[hour] = hourly.get(hour, 0) + 1
+        return {
+            "name": activity.name,
+            "path": activity.path,
+            "branch": activity.branch,
+            "head": activity.head[:12],
+            "dirty": activity.dirty,
+            "files": activity.files,
+            "last_commit": activity.last_commit or None,
+            "minutes_since_commit": round(since, 1) if since is not None else None,
+            "commits_last_hour": sum(1 for t in recent if t >= now - 3600),
+            "commits_per_hour": round(len(recent) / (HISTORY_SECONDS / 3600), 2),
+            "hourly": hourly,
+            "overdue": bool(activity.branch or activity.head) and waiting > self.commit_interval,
+        }
+
+    def run(self, interval: float = 5.0):
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+
+def team_workspaces(spec: Optional[Path] = None) -> Dict[str, Path]:
+    """The team's workspace plus one entry per agent worktree"""
+    from team_spec import TeamSpec
+
+    team = TeamSpec.load(spec)
+    workspaces = {"workspace": team.workspace_dir}
+    for slot in team.slots():
+        if slot.worktree:
+            workspaces[slot.window_name] = Path(slot.worktree)
+    return workspaces
+
+
+def format_minutes(minutes: Optional[float]) -> str:
+    if minutes is None:
+        return "never"
+    if minutes < 60:
+        return f"{minutes:.0f}m"
+    return f"{minutes / 60:.1f}h"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Commits, branch heads and dirty state of every agent workspace")
+    parser.add_argument("--spec", type=Path, help="Team spec whose workspace and worktrees to watch "
+                                                  "(default: $TEAM_SPEC or api_builder/team.json)")
+    parser.add_argument("--repo", action="append", help="Watch this checkout instead (NAME=PATH or PATH, repeatable)")
+    parser.add_argument("--cache", type=Path, help=f"Cache file (default: {DEFAULT_CACHE.relative_to(Path(__file__).parent)})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    status_parser = sub.add_parser("status", help="Print the current state of every workspace")
+    status_parser.add_argument("--json", action="store_true", help="Metrics as JSON")
+    watch_parser = sub.add_parser("watch", help="Keep the cache current")
+    watch_parser.add_argument("--interval", type=float, default=5.0, help="Seconds between passes")
+
+    args = parser.parse_args()
+    if args.repo:
+        workspaces = {}
+        for repo in args.repo:
+            name, _, path = repo.rpartition('=')
+            workspaces[name or Path(path).resolve().name] = Path(path).resolve()
+    else:
+        try:
+            workspaces = team_workspaces(args.spec)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error loading team spec: {e}")
+            sys.exit(1)
+    watcher = GitActivityWatcher(workspaces, args.cache)
+
+    if args.command == "watch":
+        try:
+            watcher.run(args.interval)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    started = time.perf_counter()
+    activities = watcher.poll()
+    elapsed = time.perf_counter() - started
+    metrics = [watcher.metrics(activity) for activity in activities]
+    if args.json:
+        print(json.dumps(metrics, indent=2))
+        return
+    print(f"{'WORKSPACE':<16} {'BRANCH':<22} {'HEAD':<12} {'FILES':>6} {'DIRTY':>5} {'LAST':>6} {'1H':>3} {'/H':>5}")
+    for m in metrics:
+        if not m["head"] and not m["branch"]:
+            print(f"{m['name']:<16} {'(not a git checkout)':<22}")
+            continue
+        flag = "  overdue" if m["overdue"] else ""
+        dirty = "?" if m["dirty"] < 0 else m["dirty"]
+        print(f"{m['name']:<16} {m['branch'][:22]:<22} {m['head']:<12} {m['files']:>6} {dirty:>5} "
+              f"{format_minutes(m['minutes_since_commit']):>6} {m['commits_last_hour']:>3} "
+              f"{m['commits_per_hour']:>5}{flag}")
+    print(f"{len(metrics)} workspace(s), {watcher.git_calls} git call(s), {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
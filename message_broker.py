@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Agent mailboxes
+Per-agent mailboxes so agents message each other without typing into each
+other's panes. Messages are appended to registry/mailboxes/<agent>/messages.jsonl
+and acknowledged in acks.jsonl, so nothing is lost while the recipient is busy
+or the broker is down. The broker (registry/sessions/broker.sock) adds blocking
+reads and can paste waiting messages into an agent's pane once the agent sits
+idle at its prompt.
+
+Agents use the CLI:
+  message_broker.py send api_builder:1 "Schema is merged, please rebase"
+  message_broker.py read --ack        # own mailbox, found from $TMUX_PANE
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import fcntl
+import socket
+import argparse
+import subprocess
+import threading
+from contextlib import contextmanager
+from socketserver import ThreadingMixIn, UnixStreamServer, StreamRequestHandler
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from note_store import atomic_write, append_line
+from send_queue import SendQueue
+from tmux_utils import TmuxOrchestrator
+
+DEFAULT_ROOT = Path(__file__).parent / "registry" / "mailboxes"
+DEFAULT_SOCKET = Path(__file__).parent / "registry" / "sessions" / "broker.sock"
+COMPACT_AFTER = 200  # acknowledged messages before a mailbox is rewritten
+INJECT_ATTEMPTS = 3  # failed or refused pastes before a message is left for the agent to read
+
+
+@dataclass
+class Message:
+    id: str
+    sender: str
+    recipient: str
+    body: str
+    sent: float
+    reply_to: Optional[str] = None
+
+
+def new_message_id() -> str:
+    """Time-ordered, collision-free message ID"""
+    return f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+class Mailbox:
+    """One agent's queue: append-only message and ack logs, written under an flock"""
+
+    def __init__(self, root: Path, address: str):
+        self.address = address
+        self.directory = Path(root) / quote(address, safe='')
+        self.messages_path = self.directory / "messages.jsonl"
+        self.acks_path = self.directory / "acks.jsonl"
+        self.archive_path = self.directory / "archive.jsonl"
+
+    @contextmanager
+    def _locked(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.directory / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def put(self, message: Message):
+        with self._locked():
+            append_line(self.messages_path, asdict(message))
+
+    def ack(self, ids: List[str], how: str = "read"):
+        now = time.time()
+        with self._locked():
+            for message_id in ids:
+                append_line(self.acks_path, {"id": message_id, "how": how, "time": now})
+
+    def version(self) -> Tuple[int, int]:
+        """Changes whenever a message or ack is written (both files only grow between compactions)"""
+        sizes = []
+        for path in (self.messages_path, self.acks_path):
+            try:
+                sizes.append(path.stat().st_size)
+            except OSError:
+                sizes.append(0)
+        return sizes[0], sizes[1]
+
+    @staticmethod
+    def _records(path: Path) -> List[Dict]:
+        try:
+            with open(path, 'r') as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # a line still being written
+        return records
+
+    def acked(self) -> set:
+        return {record.get("id") for record in self._records(self.acks_path)}
+
+    def pending(self) -> List[Message]:
+        acked = self.acked()
+        return [Message(**record) for record in self._records(self.messages_path) if record.get("id") not in acked]
+
+    def compact(self) -> int:
+        """Move acknowledged messages to archive.jsonl; returns how many were moved"""
+        with self._locked():
+            acked = self.acked()
+            records = self._records(self.messages_path)
+            done = [record for record in records if record.get("id") in acked]
+            if not done:
+                return 0
+            for record in done:
+                append_line(self.archive_path, record)
+            atomic_write(self.messages_path, ''.join(json.dumps(record, separators=(',', ':')) + '\n'
+                                                     for record in records if record.get("id") not in acked))
+            self.acks_path.unlink(missing_ok=True)
+            return len(done)
+
+
+def mailbox_addresses(root: Optional[Path] = None) -> List[str]:
+    root = Path(root) if root else DEFAULT_ROOT
+    return sorted(unquote(path.name) for path in root.iterdir() if path.is_dir()) if root.exists() else []
+
+
+class MessageBroker:
+    """Serves every mailbox from one process: blocking reads and idle-only pane injection"""
+
+    def __init__(self, root: Optional[Path] = None, orchestrator: Optional[TmuxOrchestrator] = None):
+        self.root = Path(root) if root else DEFAULT_ROOT
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        self.sender = SendQueue(self.orchestrator)
+        self.mailboxes: Dict[str, Mailbox] = {}
+        self._cache: Dict[str, Tuple[Tuple[int, int], List[Message]]] = {}  # address -> (version, pending)
+        self._acked_since_compact: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.counters = {"sent": 0, "acked": 0, "injected": 0, "held": 0}
+        self.inject_attempts: Dict[str, int] = {}  # message id -> failed pastes
+        self._stop = threading.Event()
+
+    def mailbox(self, address: str) -> Mailbox:
+        if address not in self.mailboxes:
+            self.mailboxes[address] = Mailbox(self.root, address)
+        return self.mailboxes[address]
+
+    def pending(self, address: str) -> List[Message]:
+        """Unacknowledged messages, re-read only when the mailbox files changed (any writer)"""
+        mailbox = self.mailbox(address)
+        version = mailbox.version()
+        cached = self._cache.get(address)
+        if cached is None or cached[0] != version:
+            cached = self._cache[address] = (version, mailbox.pending())
+        return cached[1]
+
+    def send(self, sender: str, recipient: str, body: str, reply_to: Optional[str] = None) -> Message:
+        message = Message(new_message_id(), sender, recipient, body, time.time(), reply_to)
+        with self.changed:
+            self.mailbox(recipient).put(message)
+            self.counters["sent"] += 1
+            self.changed.notify_all()
+        return message
+
+    def read(self, address: str, wait: float = 0) -> List[Message]:
+        """Pending messages; with wait, block up to that many seconds for the first one"""
+        deadline = time.time() + wait
+        with self.changed:
+            messages = self.pending(address)
+            while not messages and time.time() < deadline:
+                # Wake up at least every second: messages may also be written straight to disk
+                self.changed.wait(min(1.0, deadline - time.time()))
+                messages = self.pending(address)
+            return list(messages)
+
+    def ack(self, address: str, ids: List[str], how: str = "read") -> int:
+        with self.changed:
+            mailbox = self.mailbox(address)
+            pending = {message.id for message in self.pending(address)}
+            ids = [message_id for message_id in ids if message_id in pending]
+            if ids:
+                mailbox.ack(ids, how)
+                self.counters["acked"] += len(ids)
+                self._acked_since_compact[address] = self._acked_since_compact.get(address, 0) + len(ids)
+                if self._acked_since_compact[address] >= COMPACT_AFTER:
+                    mailbox.compact()
+                    self._acked_since_compact[address] = 0
+            return len(ids)
+
+    def status(self) -> Dict:
+        with self.lock:
+            boxes = {address: len(self.pending(address)) for address in mailbox_addresses(self.root)}
+        return {"mailboxes": boxes, **self.counters}
+
+    def handle(self, request: Dict) -> Dict:
+        op = request.get("op")
+        if op == "send":
+            message = self.send(request["sender"], request["recipient"], request["body"], request.get("reply_to"))
+            return {"ok": True, "id": message.id}
+        if op == "read":
+            messages = self.read(request["address"], min(float(request.get("wait", 0)), 300))
+            return {"ok": True, "messages": [asdict(message) for message in messages]}
+        if op == "ack":
+            return {"ok": True, "acked": self.ack(request["address"], request["ids"], request.get("how", "read"))}
+        if op == "status":
+            return {"ok": True, **self.status()}
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    def inject_idle(self) -> int:
+        """Paste waiting messages into agents idle at their prompt; returns agents reached.
+
+        A message whose paste is refused (send policy, full send queue) or never
+        confirmed is tried INJECT_ATTEMPTS times, then stays in the mailbox for
+        the agent to read instead of being retried every pass.
+        """
+        with self.lock:
+            pending = {address: list(self.pending(address)) for address in mailbox_addresses(self.root)}
+        ids = {message.id for messages in pending.values() for message in messages}
+        self.inject_attempts = {i: n for i, n in self.inject_attempts.items() if i in ids}  # forget read messages
+        waiting = {address: [message for message in messages if self.inject_attempts.get(message.id, 0) < INJECT_ATTEMPTS]
+                   for address, messages in pending.items()}
+        waiting = {address: messages for address, messages in waiting.items() if messages}
+        if not waiting:
+            return 0
+        reached = 0
+        for pane in self.orchestrator.list_panes():
+            messages = waiting.get(pane.target)
+            if not pane.agent_pane or not messages:
+                continue
+            state = self.orchestrator.state_classifier.classify(pane)
+            if state.state != "idle" or not state.at_prompt:
+                continue  # never interrupt a turn or a question the agent is asking
+            record = self.sender.send(pane.target, format_messages(messages), sender="broker", force=True)
+            if record and record.confirmed:
+                self.ack(pane.target, [message.id for message in messages], how="injected")
+                with self.lock:
+                    self.counters["injected"] += len(messages)
+                reached += 1
+                continue
+            for message in messages:
+                self.inject_attempts[message.id] = self.inject_attempts.get(message.id, 0) + 1
+                if self.inject_attempts[message.id] == INJECT_ATTEMPTS:
+                    print(f"Not injecting {message.id} into {pane.target} after {INJECT_ATTEMPTS} attempts: "
+                          f"left in its mailbox")
+                    with self.lock:
+                        self.counters["held"] += 1
+        return reached
+
+    def run_injector(self, interval: float = 5.0):
+        while not self._stop.wait(interval):
+            self.inject_idle()
+
+    def stop(self):
+        self._stop.set()
+
+
+def format_messages(messages: List[Message]) -> str:
+    text = f"📬 {len(messages)} new message{'s' if len(messages) != 1 else ''} in your mailbox:\n"
+    for message in messages:
+        text += (f"\n--- From {message.sender} at {datetime.fromtimestamp(message.sent).strftime('%H:%M:%S')} "
+                 f"(id {message.id}) ---\n{message.body}\n")
+    script = Path(__file__).resolve()
+    return text + f"\nReply with: python3 {script} send <agent> \"your reply\""
+
+
+class BrokerHandler(StreamRequestHandler):
+    """Newline-delimited JSON requests and responses; a connection may carry many requests"""
+    broker: MessageBroker = None
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.broker.handle(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                response = {"ok": False, "error": f"Bad request: {e}"}
+            try:
+                self.wfile.write((json.dumps(response) + "\n").encode())
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+
+class BrokerServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(broker: MessageBroker, socket_path: Optional[Path] = None) -> BrokerServer:
+    socket_path = Path(socket_path or DEFAULT_SOCKET)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    socket_path.unlink(missing_ok=True)
+    handler = type("BoundBrokerHandler", (BrokerHandler,), {"broker": broker})
+    server = BrokerServer(str(socket_path), handler)
+    os.chmod(socket_path, 0o600)
+    return server
+
+
+class BrokerClient:
+    """Talks to a running broker; raises OSError when none is listening"""
+
+    def __init__(self, socket_path: Optional[Path] = None, timeout: float = 30):
+        self.socket_path = str(socket_path or DEFAULT_SOCKET)
+        self.timeout = timeout
+        self.sock: Optional[socket.socket] = None
+        self.reader = None
+
+    def request(self, **payload) -> Dict:
+        if self.sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self.sock = sock
+            self.reader = sock.makefile('rb')
+        self.sock.settimeout(self.timeout + float(payload.get("wait", 0)))
+        self.sock.sendall((json.dumps(payload) + "\n").encode())
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionResetError("Broker closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        if self.sock:
+            self.reader.close()
+            self.sock.close()
+            self.sock = None
+
+
+def own_address(orchestrator: Optional[TmuxOrchestrator] = None) -> Optional[str]:
+    """session:window of the pane this process runs in"""
+    pane = os.environ.get("TMUX_PANE")
+    if not pane:
+        return None
+    orchestrator = orchestrator or TmuxOrchestrator()
+    result = subprocess.run(orchestrator.tmux("display-message", "-p", "-t", pane, "#{session_name}:#{window_index}"),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def resolve_address(name: str, orchestrator: Optional[TmuxOrchestrator] = None) -> str:
+    """session:window targets are used as is; a window name must match exactly one window"""
+    if ':' in name:
+        return name
+    matches = (orchestrator or TmuxOrchestrator()).find_window_by_name(name)
+    if len(matches) != 1:
+        raise ValueError(f"'{name}' matches {len(matches)} windows; use session:window")
+    return f"{matches[0][0]}:{matches[0][1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent mailboxes: send, read and acknowledge messages")
+    parser.add_argument("--socket", type=Path, help=f"Broker socket (default: {DEFAULT_SOCKET})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="Run the broker")
+    serve_parser.add_argument("--inject", action="store_true", help="Paste waiting messages into idle agents")
+    serve_parser.add_argument("--interval", type=float, default=5.0, help="Seconds between idle checks")
+
+    send_parser = sub.add_parser("send", help="Send a message to an agent (session:window or window name)")
+    send_parser.add_argument("to")
+    send_parser.add_argument("message", nargs="+")
+    send_parser.add_argument("--from", dest="sender", help="Sender (default: this pane's session:window)")
+    send_parser.add_argument("--reply-to", help="ID of the message this answers")
+
+    read_parser = sub.add_parser("read", help="Print pending messages")
+    read_parser.add_argument("--as", dest="address", help="Mailbox (default: this pane's session:window)")
+    read_parser.add_argument("--wait", type=float, default=0, help="Block up to this many seconds for a message")
+    read_parser.add_argument("--ack", action="store_true", help="Acknowledge what was printed")
+    read_parser.add_argument("--json", action="store_true", help="Print messages as NDJSON")
+
+    ack_parser = sub.add_parser("ack", help="Acknowledge messages by ID")
+    ack_parser.add_argument("ids", nargs="+")
+    ack_parser.add_argument("--as", dest="address", help="Mailbox (default: this pane's session:window)")
+
+    sub.add_parser("status", help="Pending messages per mailbox")
+
+    args = parser.parse_args()
+    client = BrokerClient(args.socket)
+
+    if args.command == "serve":
+        broker = MessageBroker()
+        server = make_server(broker, args.socket)
+        if args.inject:
+            threading.Thread(target=broker.run_injector, args=(args.interval,), daemon=True).start()
+        print(f"Message broker listening on {args.socket or DEFAULT_SOCKET} "
+              f"({'injecting into idle agents' if args.inject else 'no pane injection'})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            broker.stop()
+            server.server_close()
+            Path(args.socket or DEFAULT_SOCKET).unlink(missing_ok=True)
+        return
+
+    try:
+        if args.command == "send":
+            recipient = resolve_address(args.to)
+            sender = args.sender or own_address() or "orchestrator"
+            body = ' '.join(args.message)
+            try:
+                message_id = client.request(op="send", sender=sender, recipient=recipient, body=body,
+                                            reply_to=args.reply_to)["id"]
+            except OSError:
+                # No broker: queue on disk, it is picked up when the recipient reads
+                message = Message(new_message_id(), sender, recipient, body, time.time(), args.reply_to)
+                Mailbox(DEFAULT_ROOT, recipient).put(message)
+                message_id = message.id
+            print(f"Queued {message_id} for {recipient}")
+        elif args.command in ("read", "ack"):
+            address = args.address or own_address()
+            if not address:
+                print("Not inside a tmux pane: pass --as session:window")
+                sys.exit(1)
+            if args.command == "ack":
+                ids = args.ids
+                messages = []
+            else:
+                try:
+                    messages = [Message(**m) for m in client.request(op="read", address=address,
+                                                                     wait=args.wait)["messages"]]
+                except OSError:
+                    messages = Mailbox(DEFAULT_ROOT, address).pending()
+                for message in messages:
+                    if args.json:
+                        print(json.dumps(asdict(message)))
+                    else:
+                        print(f"--- {message.id} from {message.sender} at "
+                              f"{datetime.fromtimestamp(message.sent).strftime('%Y-%m-%d %H:%M:%S')} ---\n"
+                              f"{message.body}\n")
+                if not messages and not args.json:
+                    print("No new messages")
+                ids = [message.id for message in messages] if args.ack else []
+            if ids:
+                try:
+                    client.request(op="ack", address=address, ids=ids)
+                except OSError:
+                    Mailbox(DEFAULT_ROOT, address).ack(ids)
+                if args.command == "ack":
+                    print(f"Acknowledged {len(ids)} messages")
+        elif args.command == "status":
+            try:
+                status = client.request(op="status")
+            except OSError:
+                status = {"mailboxes": {a: len(Mailbox(DEFAULT_ROOT, a).pending()) for a in mailbox_addresses()}}
+                print("(broker not running)")
+            for address, count in status["mailboxes"].items():
+                print(f"{address:<24} {count:>5} pending")
+            if "sent" in status:
+                print(f"sent {status['sent']}, acked {status['acked']}, injected {status['injected']}, "
+                      f"held {status.get('held', 0)} since the broker started")
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Check-in note store
+Keeps one note file per (target, job ID) under registry/notes/checkins so that
+concurrent schedulers never overwrite each other's notes
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from typing import List, Dict, Optional, Iterator
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+DEFAULT_ROOT = Path(__file__).parent / "registry" / "notes" / "checkins"
+
+
+def atomic_write(path: Path, data: str):
+    """Write a file via temp file + rename so readers never see partial content"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.parent / f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def append_line(path: Path, record: Dict):
+    """Append one JSON line with a single O_APPEND write (safe across processes)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def read_reverse(path: Path, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Lines of a file from the last to the first, read backwards in blocks"""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        partial = b''
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + partial).split(b'\n')
+            partial = lines.pop(0)  # may continue in the previous block
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if partial:
+            yield partial
+
+
+@dataclass
+class CheckinNote:
+    target: str
+    job_id: str
+    note: str
+    created: float
+    minutes: Optional[float] = None
+    due: Optional[float] = None
+
+
+class NoteStore:
+    """Per-target check-in notes keyed by job ID with an append-only history index"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else DEFAULT_ROOT
+
+    def target_dir(self, target: str) -> Path:
+        """Directory holding all notes for one target (session:window)"""
+        return self.root / quote(target, safe='')
+
+    def note_path(self, target: str, job_id: str) -> Path:
+        """Path of the human-readable note for a job"""
+        return self.target_dir(target) / f"{job_id}.txt"
+
+    def meta_path(self, target: str, job_id: str) -> Path:
+        return self.target_dir(target) / f"{job_id}.json"
+
+    def index_path(self, target: str) -> Path:
+        return self.target_dir(target) / "index.jsonl"
+
+    def new_job_id(self) -> str:
+        """Time-ordered, collision-free job ID"""
+        return f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    def put(self, target: str, note: str, minutes: Optional[float] = None,
+            job_id: Optional[str] = None) -> CheckinNote:
+        """Store a note for a target and record it in the target's history"""
+        now = time.time()
+        entry = CheckinNote(
+            target=target,
+            job_id=job_id or self.new_job_id(),
+            note=note,
+            created=now,
+            minutes=minutes,
+            due=now + minutes * 60 if minutes is not None else None
+        )
+
+        text = f"=== Next Check Note ({datetime.fromtimestamp(now).strftime('%a %b %d %H:%M:%S %Y')}) ===\n"
+        if minutes is not None:
+            text += f"Scheduled for: {minutes:g} minutes\n"
+        text += f"\n{note}\n"
+
+        atomic_write(self.note_path(target, entry.job_id), text)
+        atomic_write(self.meta_path(target, entry.job_id), json.dumps(asdict(entry), indent=2))
+        append_line(self.index_path(target), {"event": "scheduled", "job_id": entry.job_id,
+                                              "time": now, "due": entry.due})
+        return entry
+
+    def get(self, target: str, job_id: str) -> Optional[CheckinNote]:
+        """Look up one note directly by target and job ID"""
+        try:
+            with open(self.meta_path(target, job_id), 'r') as f:
+                return CheckinNote(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def mark_delivered(self, target: str, job_id: str, coalesced_into: Optional[str] = None):
+        """Record that a note has been delivered to its target"""
+        record = {"event": "delivered", "job_id": job_id, "time": time.time()}
+        if coalesced_into:
+            record["coalesced_into"] = coalesced_into
+        append_line(self.index_path(target), record)
+
+    def discard(self, target: str, job_id: str, reason: str = ""):
+        """Record that a note will never be delivered (e.g. a merged note whose delivery failed)"""
+        append_line(self.index_path(target), {"event": "discarded", "job_id": job_id,
+                                              "time": time.time(), "reason": reason})
+
+    def pending(self, target: str, due_before: Optional[float] = None,
+                window: int = 500) -> List[CheckinNote]:
+        """Scheduled but undelivered notes for a target (within the last `window` index events)"""
+        scheduled: Dict[str, Dict] = {}
+        for event in self.history(target, window):
+            if event.get("event") == "scheduled":
+                scheduled[event["job_id"]] = event
+            elif event.get("event") in ("delivered", "discarded"):
+                scheduled.pop(event["job_id"], None)
+        notes = []
+        for job_id, event in scheduled.items():
+            if due_before is not None and (event.get("due") or 0) > due_before:
+                continue
+            entry = self.get(target, job_id)
+            if entry:
+                notes.append(entry)
+        return sorted(notes, key=lambda n: n.created)
+
+    def state(self, target: str, job_id: str) -> Optional[str]:
+        """Latest index event of one job (scheduled, delivered or discarded), reading back only as far as it"""
+        for event in self._events_reversed(target):
+            if event.get("job_id") == job_id:
+                return event.get("event")
+        return None
+
+    def _events_reversed(self, target: str) -> Iterator[Dict]:
+        """Index events newest first, reading only as much of the index as is consumed"""
+        try:
+            for line in read_reverse(self.index_path(target)):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        except OSError:
+            return
+
+    def history(self, target: str, limit: Optional[int] = None) -> List[Dict]:
+        """Index events for a target, oldest first"""
+        events = []
+        for event in self._events_reversed(target):
+            events.append(event)
+            if limit and len(events) >= limit:
+                break
+        return events[::-1]
+
+    def latest(self, target: str) -> Optional[CheckinNote]:
+        """Most recently scheduled note for a target"""
+        for event in self._events_reversed(target):
+            if event.get("event") == "scheduled":
+                return self.get(target, event["job_id"])
+        return None
+
+    def targets(self) -> List[str]:
+        """All targets that have notes"""
+        if not self.root.exists():
+            return []
+        return sorted(unquote(p.name) for p in self.root.iterdir() if p.is_dir())
+
+    def deliver(self, target: str, job_id: str) -> bool:
+        """Type the check-in prompt for a job into its target window (through its send queue)"""
+        from send_queue import SendQueue
+
+        path = self.note_path(target, job_id)
+        if not path.exists():
+            print(f"No note {job_id} for {target}")
+            return False
+
+        record = SendQueue().send(target, f"Time for orchestrator check! cat {path}", sender="scheduler", force=True)
+        if record is None or not record.confirmed:
+            return False
+        self.mark_delivered(target, job_id)
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-target check-in note store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    put_parser = sub.add_parser("put", help="Store a note and print its job ID")
+    put_parser.add_argument("target")
+    put_parser.add_argument("note")
+    put_parser.add_argument("--minutes", type=float)
+
+    path_parser = sub.add_parser("path", help="Print the note file path for a job")
+    path_parser.add_argument("target")
+    path_parser.add_argument("job_id")
+
+    show_parser = sub.add_parser("show", help="Print a note (latest if no job ID)")
+    show_parser.add_argument("target")
+    show_parser.add_argument("job_id", nargs="?")
+
+    history_parser = sub.add_parser("history", help="Show scheduling history for a target")
+    history_parser.add_argument("target")
+    history_parser.add_argument("--limit", type=int, default=20)
+
+    deliver_parser = sub.add_parser("deliver", help="Deliver a scheduled note to its target")
+    deliver_parser.add_argument("target")
+    deliver_parser.add_argument("job_id")
+
+    args = parser.parse_args()
+    store = NoteStore()
+
+    if args.command == "put":
+        print(store.put(args.target, args.note, args.minutes).job_id)
+    elif args.command == "path":
+        print(store.note_path(args.target, args.job_id))
+    elif args.command == "show":
+        entry = store.get(args.target, args.job_id) if args.job_id else store.latest(args.target)
+        if not entry:
+            print(f"No note found for {args.target}")
+            sys.exit(1)
+        print(store.note_path(entry.target, entry.job_id).read_text(), end="")
+    elif args.command == "history":
+        for event in store.history(args.target, args.limit):
+            stamp = datetime.fromtimestamp(event["time"]).isoformat(timespec="seconds")
+            reason = f"  ({event['reason']})" if event.get("reason") else ""
+            print(f"{stamp}  {event['event']:<10} {event['job_id']}{reason}")
+    elif args.command == "deliver":
+        sys.exit(0 if store.deliver(args.target, args.job_id) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Agent output search
+SQLite FTS5 index over the transcript archive (registry/logs/transcripts),
+stored in registry/search/output.db. Syncing is incremental: closed segments
+are indexed once and the open segment is followed by byte offset, so each sync
+only reads lines that arrived since the previous one.
+"""
+
+import re
+import gzip
+import time
+import sqlite3
+import argparse
+from typing import List, Dict, Optional, Iterator, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from transcript_archiver import DEFAULT_ROOT as ARCHIVE_ROOT, TranscriptArchive, parse_time
+
+DEFAULT_DB = Path(__file__).parent / "registry" / "search" / "output.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    window INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    ts REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lines_ts ON lines(ts);
+CREATE INDEX IF NOT EXISTS lines_agent ON lines(session, window, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+    text, content='lines', content_rowid='id', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+    INSERT INTO lines_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS lines_ad AFTER DELETE ON lines BEGIN
+    INSERT INTO lines_fts(lines_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TABLE IF NOT EXISTS indexed_segments (
+    directory TEXT NOT NULL,
+    file TEXT NOT NULL,
+    PRIMARY KEY (directory, file)
+);
+CREATE TABLE IF NOT EXISTS open_segments (
+    directory TEXT PRIMARY KEY,
+    start REAL NOT NULL,
+    offset INTEGER NOT NULL
+);
+"""
+
+
+@dataclass
+class SearchHit:
+    id: int
+    session: str
+    window: int
+    role: str
+    ts: float
+    text: str
+    context_before: Optional[List[str]] = None
+    context_after: Optional[List[str]] = None
+
+    @property
+    def target(self) -> str:
+        return f"{self.session}:{self.window}"
+
+
+def _parse_lines(data: bytes) -> Iterator[Tuple[float, str]]:
+    for raw in data.decode('utf-8', errors='replace').split('\n'):
+        stamp, sep, line = raw.partition('\t')
+        if not sep:
+            continue
+        try:
+            yield float(stamp), line
+        except ValueError:
+            continue
+
+
+def _first_timestamp(path: Path) -> Optional[float]:
+    try:
+        with open(path, 'rb') as f:
+            return float(f.readline().split(b'\t', 1)[0])
+    except (OSError, ValueError):
+        return None
+
+
+def _quote_terms(query: str) -> str:
+    """Turn free text into an FTS5 query that matches all words literally"""
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+class SearchIndex:
+    """Incrementally synced full-text index of archived agent output"""
+
+    def __init__(self, db_path: Optional[Path] = None, archive_root: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_DB
+        self.archive_root = Path(archive_root) if archive_root else ARCHIVE_ROOT
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _insert(self, session_name: str, window: int, role: str, rows: Iterator[Tuple[float, str]]) -> int:
+        cursor = self.conn.executemany(
+            "INSERT INTO lines(session, window, role, ts, text) VALUES (?, ?, ?, ?, ?)",
+            ((session_name, window, role, ts, line) for ts, line in rows if line.strip()))
+        return cursor.rowcount
+
+    def sync_archive(self, directory: Path) -> int:
+        """Index whatever is new in one pane's archive; returns the number of lines added"""
+        session_name, window = directory.parent.name, directory.name
+        if not window.isdigit():
+            return 0
+        key = str(directory.relative_to(self.archive_root))
+        archive = TranscriptArchive(directory, 0, 0)
+        role = archive.name()
+        added = 0
+
+        done = {row[0] for row in self.conn.execute(
+            "SELECT file FROM indexed_segments WHERE directory = ?", (key,))}
+        open_row = self.conn.execute(
+            "SELECT start, offset FROM open_segments WHERE directory = ?", (key,)).fetchone()
+
+        for segment in archive.segments():
+            if segment.file in done:
+                continue
+            try:
+                with gzip.open(directory / segment.file, 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                print(f"Error reading {directory / segment.file}: {e}")
+                continue
+            # A closed segment is the former open segment, part of which may already be indexed
+            if open_row and open_row[0] == segment.start:
+                data = data[open_row[1]:]
+                open_row = None
+                self.conn.execute("DELETE FROM open_segments WHERE directory = ?", (key,))
+            added += self._insert(session_name, int(window), role, _parse_lines(data))
+            self.conn.execute("INSERT INTO indexed_segments(directory, file) VALUES (?, ?)", (key, segment.file))
+
+        start = _first_timestamp(archive.current_path)
+        if start is not None:
+            offset = open_row[1] if open_row and open_row[0] == start else 0
+            with open(archive.current_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            complete = data.rfind(b'\n') + 1  # the archiver may be mid-write
+            if complete:
+                added += self._insert(session_name, int(window), role, _parse_lines(data[:complete]))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO open_segments(directory, start, offset) VALUES (?, ?, ?)",
+                    (key, start, offset + complete))
+        return added
+
+    def sync(self) -> int:
+        """Index new output from every archived agent"""
+        added = 0
+        with self.conn:
+            for directory in sorted(p for p in self.archive_root.glob("*/*") if p.is_dir()):
+                added += self.sync_archive(directory)
+        return added
+
+    def search(self, query: str, session_name: Optional[str] = None, window: Optional[int] = None,
+               role: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+               limit: int = 50, context: int = 0) -> List[SearchHit]:
+        """Newest matches first. The query is FTS5 syntax; plain text that isn't valid FTS5 is matched literally.
+
+        Raises ValueError for a query with nothing to search for (empty or only punctuation).
+        """
+        if not re.search(r'\w', query):
+            raise ValueError(f"nothing to search for in {query!r}: give at least one word")
+        filters, params = [], []
+        if session_name:
+            filters.append("lines.session = ?")
+            params.append(session_name)
+        if window is not None:
+            filters.append("lines.window = ?")
+            params.append(window)
+        if role:
+            filters.append("lines.role LIKE ?")
+            params.append(f"%{role}%")
+        if since is not None:
+            filters.append("lines.ts >= ?")
+            params.append(since)
+        if until is not None:
+            filters.append("lines.ts <= ?")
+            params.append(until)
+        where = ''.join(f" AND {f}" for f in filters)
+        sql = (f"SELECT lines.id, lines.session, lines.window, lines.role, lines.ts, lines.text "
+               f"FROM lines_fts JOIN lines ON lines.id = lines_fts.rowid "
+               f"WHERE lines_fts MATCH ?{where} ORDER BY lines.ts DESC, lines.id DESC LIMIT ?")
+        try:
+            rows = self.conn.execute(sql, [query] + params + [limit]).fetchall()
+        except sqlite3.OperationalError:
+            try:
+                rows = self.conn.execute(sql, [_quote_terms(query)] + params + [limit]).fetchall()
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"invalid query {query!r}: {e}") from e
+
+        hits = [SearchHit(*row) for row in rows]
+        if context:
+            for hit in hits:
+                hit.context_before = self._neighbours(hit, context, before=True)
+                hit.context_after = self._neighbours(hit, context, before=False)
+        return hits
+
+    def _neighbours(self, hit: SearchHit, count: int, before: bool) -> List[str]:
+        op, order = ("<", "DESC") if before else (">", "ASC")
+        rows = self.conn.execute(
+            f"SELECT text FROM lines WHERE session = ? AND window = ? AND id {op} ? ORDER BY id {order} LIMIT ?",
+            (hit.session, hit.window, hit.id, count)).fetchall()
+        lines = [row[0] for row in rows]
+        return lines[::-1] if before else lines
+
+    def prune(self, older_than: float) -> int:
+        """Drop indexed lines older than a timestamp"""
+        with self.conn:
+            return self.conn.execute("DELETE FROM lines WHERE ts < ?", (older_than,)).rowcount
+
+    def stats(self) -> Dict:
+        rows = self.conn.execute(
+            "SELECT session, window, role, COUNT(*), MIN(ts), MAX(ts) FROM lines "
+            "GROUP BY session, window ORDER BY session, window").fetchall()
+        return {
+            "db_path": str(self.db_path),
+            "db_bytes": self.db_path.stat().st_size if self.db_path.exists() else 0,
+            "lines": sum(row[3] for row in rows),
+            "agents": [{"target": f"{s}:{w}", "role": r, "lines": n, "first": first, "last": last}
+                       for s, w, r, n, first, last in rows]
+        }
+
+
+def format_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over archived agent output")
+    parser.add_argument("--db", type=Path, help=f"Index database (default: {DEFAULT_DB})")
+    parser.add_argument("--archive", type=Path, help=f"Transcript archive (default: {ARCHIVE_ROOT})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    search_parser = sub.add_parser("search", help="Search agent output")
+    search_parser.add_argument("query", help="Words, \"a phrase\", or FTS5 syntax (error AND NOT warning)")
+    search_parser.add_argument("--session")
+    search_parser.add_argument("--window", type=int)
+    search_parser.add_argument("--role", help="Substring of the window name, e.g. manager")
+    search_parser.add_argument("--since", help="Unix time, ISO time or age (30m, 2h, 7d)")
+    search_parser.add_argument("--until", help="Unix time, ISO time or age")
+    search_parser.add_argument("--limit", type=int, default=50)
+    search_parser.add_argument("-C", "--context", type=int, default=0, help="Lines of context around hits")
+    search_parser.add_argument("--no-sync", action="store_true", help="Don't index new output first")
+
+    sub.add_parser("sync", help="Index new archived output once")
+
+    run_parser = sub.add_parser("run", help="Keep the index in sync")
+    run_parser.add_argument("--interval", type=float, default=10.0)
+
+    prune_parser = sub.add_parser("prune", help="Drop indexed lines older than an age")
+    prune_parser.add_argument("older_than", help="Age (e.g. 30d) or timestamp")
+
+    sub.add_parser("stats", help="Show indexed agents and index size")
+
+    args = parser.parse_args()
+
+    try:
+        index = SearchIndex(args.db, args.archive)
+    except sqlite3.OperationalError as e:
+        print(f"Error opening search index: {e}")
+        return
+
+    try:
+        if args.command == "search":
+            if not args.no_sync:
+                index.sync()
+            started = time.perf_counter()
+            try:
+                hits = index.search(args.query, args.session, args.window, args.role,
+                                    parse_time(args.since) if args.since else None,
+                                    parse_time(args.until) if args.until else None,
+                                    args.limit, args.context)
+            except ValueError as e:
+                search_parser.error(str(e))
+            elapsed = (time.perf_counter() - started) * 1000
+            for hit in hits:
+                for line in hit.context_before or []:
+                    print(f"{'':<19}  {hit.target:<18}   {line}")
+                print(f"{format_time(hit.ts)}  {hit.target:<18} {hit.role[:14]:<14} {hit.text}")
+                for line in hit.context_after or []:
+                    print(f"{'':<19}  {hit.target:<18}   {line}")
+                if args.context:
+                    print("--")
+            print(f"{len(hits)} hits in {elapsed:.1f} ms")
+        elif args.command == "sync":
+            print(f"Indexed {index.sync()} new lines")
+        elif args.command == "run":
+            print(f"Indexing {index.archive_root} into {index.db_path} every {args.interval:g}s (Ctrl+C to stop)")
+            try:
+                while True:
+                    index.sync()
+                    time.sleep(args.interval)
+            except KeyboardInterrupt:
+                pass
+        elif args.command == "prune":
+            print(f"Removed {index.prune(parse_time(args.older_than))} lines")
+        elif args.command == "stats":
+            stats = index.stats()
+            print(f"{stats['lines']} lines, {stats['db_bytes'] / 1024 / 1024:.1f} MB ({stats['db_path']})")
+            for agent in stats["agents"]:
+                print(f"  {agent['target']:<18} {agent['role'][:14]:<14} {agent['lines']:>9} lines  "
+                      f"{format_time(agent['first'])} .. {format_time(agent['last'])}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
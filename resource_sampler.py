@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Per-agent process resource accounting
+Samples CPU%, RSS, threads and child processes of each agent's process tree
+(rooted at the tmux pane_pid) from /proc in one pass. Parent links are cached
+between samples: /proc is listed every time, but only new processes and the
+agents' own trees are read, not every process on the box.
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field
+
+PROC_ROOT = "/proc"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass
+class ProcessUsage:
+    root_pid: int
+    cpu_percent: float = 0.0  # summed over the tree; 100 = one full core
+    rss_mb: float = 0.0
+    threads: int = 0
+    processes: int = 0  # descendants of the pane's root process
+    commands: List[str] = field(default_factory=list)  # heaviest descendants by RSS
+
+
+def read_stat(pid: int, proc_root: str = PROC_ROOT) -> Optional[Tuple[str, int, int, int, int, int]]:
+    """(command, ppid, CPU ticks, threads, start time in ticks, RSS pages) from /proc/<pid>/stat"""
+    try:
+        fd = os.open(f"{proc_root}/{pid}/stat", os.O_RDONLY)  # plain read: no file object per process
+    except OSError:
+        return None
+    try:
+        data = os.read(fd, 4096)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    # The command name is in parentheses and may itself contain spaces or parentheses
+    close = data.rfind(b')')
+    fields = data[close + 2:].split()
+    try:
+        return (data[data.find(b'(') + 1:close].decode(errors='replace'), int(fields[1]),
+                int(fields[11]) + int(fields[12]), int(fields[17]), int(fields[19]), int(fields[21]))
+    except (IndexError, ValueError):
+        return None
+
+
+class ResourceSampler:
+    """Samples process trees by root PID, keeping CPU deltas between calls"""
+
+    def __init__(self, proc_root: str = PROC_ROOT, top_commands: int = 3):
+        self.proc_root = proc_root
+        self.top_commands = top_commands
+        self._parents: Dict[int, Tuple[int, int]] = {}  # pid -> (ppid, start time) of every process seen
+        self._ticks: Dict[Tuple[int, int], int] = {}  # (pid, start time) -> CPU ticks at the last sample
+        self._sampled_at = 0.0
+        self.last_duration = 0.0  # seconds the last sample took
+
+    def _uptime_ticks(self) -> float:
+        try:
+            with open(f"{self.proc_root}/uptime", 'r') as f:
+                return float(f.read().split()[0]) * CLOCK_TICKS
+        except (OSError, ValueError, IndexError):
+            return 0.0
+
+    def _refresh_parents(self) -> Dict[int, List[int]]:
+        """Children of every process, reading /proc/<pid>/stat only for processes not seen before"""
+        try:
+            pids = {int(name) for name in os.listdir(self.proc_root) if name.isdigit()}
+        except OSError:
+            return {}
+        for pid in self._parents.keys() - pids:
+            del self._parents[pid]
+        for pid in pids - self._parents.keys():
+            stat = read_stat(pid, self.proc_root)
+            if stat:
+                self._parents[pid] = (stat[1], stat[4])
+        children: Dict[int, List[int]] = {}
+        for pid, (ppid, _) in self._parents.items():
+            children.setdefault(ppid, []).append(pid)
+        return children
+
+    def sample(self, roots: Dict[str, int]) -> Dict[str, ProcessUsage]:
+        """Usage of each tree, keyed like roots (e.g. target -> pane_pid)"""
+        started = time.perf_counter()
+        now = time.time()
+        uptime = self._uptime_ticks()
+        elapsed_ticks = (now - self._sampled_at) * CLOCK_TICKS if self._sampled_at else 0.0
+        children = self._refresh_parents()
+        ticks: Dict[Tuple[int, int], int] = {}
+        usage = {}
+
+        for key, root in roots.items():
+            result = ProcessUsage(root)
+            heaviest: List[Tuple[int, str]] = []
+            stack = [(root, 0)]
+            while stack:
+                pid, parent = stack.pop()
+                stat = read_stat(pid, self.proc_root)
+                if stat is None:
+                    continue
+                command, ppid, cpu, threads, start, rss = stat
+                if pid != root:
+                    # Reparented (its parent exited) or the PID was reused since it was cached
+                    self._parents[pid] = (ppid, start)
+                    if ppid != parent:
+                        continue
+                previous = self._ticks.get((pid, start))
+                ticks[(pid, start)] = cpu
+                if previous is not None and elapsed_ticks:
+                    result.cpu_percent += max(0, cpu - previous) * 100 / elapsed_ticks
+                elif uptime > start:
+                    result.cpu_percent += cpu * 100 / (uptime - start)  # first sight: lifetime average
+                result.rss_mb += rss * PAGE_SIZE / (1024 * 1024)
+                result.threads += threads
+                if pid != root:
+                    result.processes += 1
+                    heaviest.append((rss, command))
+                stack.extend((child, pid) for child in children.get(pid, ()))
+            seen = []
+            for _, command in sorted(heaviest, reverse=True):
+                if command not in seen:
+                    seen.append(command)
+            result.commands = seen[:self.top_commands]
+            result.cpu_percent = round(result.cpu_percent, 1)
+            result.rss_mb = round(result.rss_mb, 1)
+            usage[key] = result
+
+        self._ticks = ticks
+        self._sampled_at = now
+        self.last_duration = time.perf_counter() - started
+        return usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU, memory and process usage of agent panes")
+    parser.add_argument("--session", help="Only one session (default: all sessions)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between samples")
+    parser.add_argument("--once", action="store_true", help="Print one sample (lifetime CPU averages) and exit")
+    args = parser.parse_args()
+
+    from tmux_utils import TmuxOrchestrator
+    orchestrator = TmuxOrchestrator()
+    try:
+        while True:
+            usage = orchestrator.get_resource_usage(args.session)
+            sampler = orchestrator.resource_sampler
+            print(f"{'TARGET':<18} {'CPU%':>6} {'RSS MB':>8} {'THREADS':>7} {'PROCS':>5}  TOP PROCESSES")
+            for target, u in sorted(usage.items()):
+                print(f"{target[:18]:<18} {u.cpu_percent:>6.1f} {u.rss_mb:>8.1f} {u.threads:>7} {u.processes:>5}  "
+                      f"{', '.join(u.commands)}")
+            print(f"({len(usage)} agents sampled in {sampler.last_duration * 1000:.1f} ms)", file=sys.stderr)
+            if args.once:
+                break
+            time.sleep(args.interval)
+            print()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
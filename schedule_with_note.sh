@@ -1,18 +1,30 @@
 #!/bin/bash
 # Dynamic scheduler with note for next check
-# Usage: ./schedule_with_note.sh <minutes> "<note>" [target_window]
+# Usage: ./schedule_with_note.sh <minutes> "<note>" [target_window] [jitter_seconds]
+#
+# Each scheduled check-in gets its own note in registry/notes/checkins/<target>/<job_id>.txt,
+# so concurrent schedules for different (or the same) targets never clobber each other.
+# Delivery goes through scheduler.py, which caps concurrent deliveries fleet-wide
+# (CHECKIN_MAX_CONCURRENT, default 3) and merges notes due for the same target.
 
 MINUTES=${1:-3}
 NOTE=${2:-"Standard check-in"}
 TARGET=${3:-"tmux-orc:0"}
+JITTER=${4:-${CHECKIN_JITTER:-0}}
 
-# Create a note file for the next check
-echo "=== Next Check Note ($(date)) ===" > /Users/petermager/Downloads/code/Tmux-Orchestrator/next_check_note.txt
-echo "Scheduled for: $MINUTES minutes" >> /Users/petermager/Downloads/code/Tmux-Orchestrator/next_check_note.txt
-echo "" >> /Users/petermager/Downloads/code/Tmux-Orchestrator/next_check_note.txt
-echo "$NOTE" >> /Users/petermager/Downloads/code/Tmux-Orchestrator/next_check_note.txt
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+NOTE_STORE="$SCRIPT_DIR/note_store.py"
+SCHEDULER="$SCRIPT_DIR/scheduler.py"
+
+# Store the note for this job (atomic write-rename, keyed by target and job ID)
+JOB_ID=$(python3 "$NOTE_STORE" put "$TARGET" "$NOTE" --minutes "$MINUTES") || {
+    echo "Failed to store check-in note"
+    exit 1
+}
+NOTE_FILE=$(python3 "$NOTE_STORE" path "$TARGET" "$JOB_ID")
 
 echo "Scheduling check in $MINUTES minutes with note: $NOTE"
+echo "Note stored at: $NOTE_FILE (job $JOB_ID)"
 
 # Calculate the exact time when the check will run
 CURRENT_TIME=$(date +"%H:%M:%S")
@@ -21,10 +33,16 @@ RUN_TIME=$(date -v +${MINUTES}M +"%H:%M:%S" 2>/dev/null || date -d "+${MINUTES}
 # Use nohup to completely detach the sleep process
 # Use bc for floating point calculation
 SECONDS=$(echo "$MINUTES * 60" | bc)
-nohup bash -c "sleep $SECONDS && tmux send-keys -t $TARGET 'Time for orchestrator check! cat /Users/petermager/Downloads/code/Tmux-Orchestrator/next_check_note.txt' && sleep 1 && tmux send-keys -t $TARGET Enter" > /dev/null 2>&1 &
+# Random offset within the jitter window so agents scheduled together don't wake together
+if [ "$JITTER" -gt 0 ] 2>/dev/null; then
+    OFFSET=$((RANDOM % (JITTER + 1)))
+    SECONDS=$(echo "$SECONDS + $OFFSET" | bc)
+    echo "Jitter: +${OFFSET}s (window ${JITTER}s)"
+fi
+nohup bash -c "sleep $SECONDS && python3 '$SCHEDULER' deliver '$TARGET' '$JOB_ID'" > /dev/null 2>&1 &
 
 # Get the PID of the background process
 SCHEDULE_PID=$!
 
 echo "Scheduled successfully - process detached (PID: $SCHEDULE_PID)"
-echo "SCHEDULED TO RUN AT: $RUN_TIME (in $MINUTES minutes from $CURRENT_TIME)"
\ No newline at end of file
+echo "SCHEDULED TO RUN AT: $RUN_TIME (in $MINUTES minutes from $CURRENT_TIME)"
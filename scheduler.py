@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Adaptive check-in scheduler
+Picks the next check-in interval for an agent from its observed activity
+(output rate, idle time, errors, input prompts) and keeps a daily report
+of every check-in it schedules. Deliveries are jittered, limited to a fixed
+number of concurrent slots and coalesced per target.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import random
+import shlex
+import argparse
+import subprocess
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+
+from note_store import NoteStore, atomic_write, append_line
+from tmux_utils import TmuxOrchestrator, PaneActivity, ERROR_PATTERN, WAITING_PATTERN
+
+BASE_DIR = Path(__file__).parent
+REPORT_DIR = BASE_DIR / "registry" / "logs" / "checkins"
+
+
+@dataclass
+class CheckinDecision:
+    target: str
+    requested_minutes: float
+    minutes: float
+    reason: str
+    idle_seconds: float = 0.0
+    output_rate: float = 0.0
+    quiet_streak: int = 0
+
+
+class DeliverySlots:
+    """Fleet-wide cap on concurrent check-in deliveries using flock'd slot files"""
+
+    def __init__(self, lock_dir: Path, max_concurrent: int = 3, max_wait: float = 300):
+        self.lock_dir = Path(lock_dir)
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_wait = max_wait
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """Block (with jittered backoff) until a slot is free or max_wait expires"""
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        deadline = time.time() + self.max_wait
+        backoff = 0.2
+        while True:
+            for slot in random.sample(range(self.max_concurrent), self.max_concurrent):
+                fd = os.open(self.lock_dir / f"slot-{slot}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    self._fd = fd
+                    return True
+                except BlockingIOError:
+                    os.close(fd)
+            if time.time() >= deadline:
+                return False
+            time.sleep(backoff + random.uniform(0, backoff))
+            backoff = min(backoff * 2, 5)
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise TimeoutError("No delivery slot became free")
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CheckinDispatcher:
+    """Delivers due check-ins, merging every pending note for the same target into one message"""
+
+    def __init__(self, store: Optional[NoteStore] = None, max_concurrent: int = 3,
+                 coalesce_window: float = 60, retry_delay: float = 60, max_attempts: int = 5):
+        self.store = store or NoteStore()
+        self.slots = DeliverySlots(self.store.root / ".slots", max_concurrent)
+        self.coalesce_window = coalesce_window
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+
+    def _target_lock(self, target: str) -> int:
+        lock_path = self.store.target_dir(target) / ".deliver.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def reschedule(self, target: str, job_id: str, attempt: int = 1) -> float:
+        """Retry a job later in a detached process (same mechanism as schedule_with_note.sh),
+        backing off exponentially with the number of attempts made"""
+        backoff = self.retry_delay * 2 ** (attempt - 1)
+        delay = round(backoff + random.uniform(0, backoff), 1)
+        command = f"sleep {delay} && python3 {shlex.quote(str(Path(__file__).resolve()))} deliver " \
+                  f"{shlex.quote(target)} {shlex.quote(job_id)} --max-concurrent {self.slots.max_concurrent} " \
+                  f"--attempt {attempt + 1}"
+        subprocess.Popen(["bash", "-c", command], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+        return delay
+
+    def deliver(self, target: str, job_id: str, attempt: int = 1) -> bool:
+        """Deliver a job, coalescing it with any other due notes for the target.
+
+        A failed delivery (no free slot, agent pane gone, send refused or not
+        confirmed) is retried later; after max_attempts the note is discarded
+        with the reason, so it shows in the note history rather than vanishing.
+        """
+        fd = self._target_lock(target)
+        try:
+            pending = self.store.pending(target, due_before=time.time() + self.coalesce_window)
+            if job_id not in {note.job_id for note in pending}:
+                if self.store.state(target, job_id) != "scheduled":
+                    # Already delivered as part of an earlier coalesced message
+                    return True
+                # Still undelivered, but older than the index window pending() scans
+                note = self.store.get(target, job_id)
+                if note is None:
+                    self.store.discard(target, job_id, reason="note missing")
+                    print(f"No note {job_id} for {target}")
+                    return False
+                pending = sorted(pending + [note], key=lambda n: n.created)
+
+            if len(pending) == 1:
+                deliver_id = job_id
+            else:
+                merged = "\n\n".join(
+                    f"--- Note {i} (scheduled {datetime.fromtimestamp(note.created).strftime('%H:%M:%S')}) ---\n{note.note}"
+                    for i, note in enumerate(pending, 1))
+                deliver_id = self.store.put(target, f"{len(pending)} check-in notes were due:\n\n{merged}",
+                                            job_id=f"{job_id}-merged").job_id
+
+            error = "not delivered"
+            try:
+                with self.slots:
+                    delivered = self.store.deliver(target, deliver_id)
+            except TimeoutError as e:
+                error = str(e)
+                delivered = False
+            if not delivered:
+                if deliver_id != job_id:
+                    # The originals stay pending; drop the merged copy so a retry doesn't merge it again
+                    self.store.discard(target, deliver_id, reason="delivery failed")
+                if attempt < self.max_attempts:
+                    delay = self.reschedule(target, job_id, attempt)
+                    print(f"Error delivering check-in to {target}: {error} (retrying in {delay:g}s)")
+                else:
+                    self.store.discard(target, job_id, reason=f"delivery failed after {attempt} attempts")
+                    print(f"Error delivering check-in to {target}: {error} (gave up after {attempt} attempts)")
+                return False
+            for note in pending:
+                if note.job_id != deliver_id:
+                    self.store.mark_delivered(target, note.job_id, coalesced_into=deliver_id)
+            return True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+class AdaptiveScheduler:
+    """Lengthens check-in intervals for quiet agents and shortens them for agents that need attention"""
+
+    def __init__(self, min_minutes: float = 5, max_minutes: float = 120,
+                 orchestrator: Optional[TmuxOrchestrator] = None,
+                 store: Optional[NoteStore] = None, report_dir: Optional[Path] = None):
+        if min_minutes > max_minutes:
+            raise ValueError("min_minutes must not exceed max_minutes")
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        self.store = store or NoteStore()
+        self.report_dir = Path(report_dir) if report_dir else REPORT_DIR
+        self.scan_lines = 20
+
+    def _state_path(self, target: str) -> Path:
+        return self.store.target_dir(target) / "activity.json"
+
+    def load_state(self, target: str) -> Tuple[Optional[PaneActivity], int]:
+        """Previous activity sample and quiet streak for a target"""
+        try:
+            with open(self._state_path(target), 'r') as f:
+                state = json.load(f)
+            return PaneActivity(**state["sample"]), state.get("quiet_streak", 0)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, 0
+
+    def save_state(self, target: str, sample: PaneActivity, quiet_streak: int):
+        atomic_write(self._state_path(target),
+                     json.dumps({"sample": asdict(sample), "quiet_streak": quiet_streak}))
+
+    def clamp(self, minutes: float) -> float:
+        return round(min(self.max_minutes, max(self.min_minutes, minutes)), 2)
+
+    def decide(self, target: str, base_minutes: float, persist: bool = True) -> CheckinDecision:
+        """Choose the next interval for a target from its current activity
+        (persist=False leaves the saved sample and quiet streak untouched, for dry runs)"""
+        session_name, _, window_index = target.rpartition(':')
+        previous, quiet_streak = self.load_state(target)
+        activity = self.orchestrator.get_window_activity(session_name, window_index, previous)
+        if activity is None:
+            return CheckinDecision(target, base_minutes, self.clamp(base_minutes), "no activity data")
+
+        tail = self.orchestrator.capture_window_content(session_name, window_index, self.scan_lines)
+        decision = CheckinDecision(target, base_minutes, base_minutes, "",
+                                   idle_seconds=round(activity.idle_seconds, 1),
+                                   output_rate=round(activity.output_rate, 2))
+
+        if WAITING_PATTERN.search(tail):
+            quiet_streak = 0
+            decision.minutes = self.min_minutes
+            decision.reason = "awaiting input"
+        elif (previous is None or activity.output_rate > 0) and ERROR_PATTERN.search(tail):
+            # Only fresh failures count: an old traceback still on screen shouldn't keep halving the interval
+            quiet_streak = 0
+            decision.minutes = base_minutes / 2
+            decision.reason = "errors in output"
+        elif previous and activity.output_rate == 0 and activity.idle_seconds >= base_minutes * 60:
+            # Nothing happened over a whole interval: back off exponentially
+            quiet_streak += 1
+            decision.minutes = base_minutes * (2 ** quiet_streak)
+            decision.reason = f"quiet for {quiet_streak} interval(s)"
+        else:
+            quiet_streak = 0
+            decision.reason = "active" if previous else "first sample"
+
+        decision.minutes = self.clamp(decision.minutes)
+        decision.quiet_streak = quiet_streak
+        if persist:
+            self.save_state(target, activity, quiet_streak)
+        return decision
+
+    def record(self, decision: CheckinDecision, job_id: str):
+        """Append a scheduled check-in to today's report"""
+        entry = asdict(decision)
+        entry.update({"job_id": job_id, "time": time.time()})
+        append_line(self.report_dir / f"{datetime.now().strftime('%Y-%m-%d')}.jsonl", entry)
+
+    def schedule(self, target: str, note: str, base_minutes: float,
+                 jitter_seconds: int = 0) -> Optional[CheckinDecision]:
+        """Decide the interval and hand the check-in to schedule_with_note.sh"""
+        decision = self.decide(target, base_minutes)
+        cmd = ["bash", str(BASE_DIR / "schedule_with_note.sh"), f"{decision.minutes:g}",
+               f"{note}\n\n(adaptive interval: {decision.reason})", target, str(jitter_seconds)]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"Error scheduling check-in: {e.stderr or e}")
+            return None
+        job_id = ""
+        match = re.search(r"\(job ([^)]+)\)", result.stdout)
+        if match:
+            job_id = match.group(1)
+        self.record(decision, job_id)
+        return decision
+
+    def report(self, day: Optional[str] = None) -> List[Dict]:
+        """All check-ins scheduled on a day (YYYY-MM-DD, default today)"""
+        day = day or datetime.now().strftime('%Y-%m-%d')
+        try:
+            with open(self.report_dir / f"{day}.jsonl", 'r') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except OSError:
+            return []
+
+
+def format_report(entries: List[Dict], day: str) -> str:
+    """Per-target summary of a day's check-ins"""
+    report = f"Check-in Report - {day}\n"
+    report += "=" * 50 + "\n"
+    if not entries:
+        return report + "No check-ins scheduled\n"
+
+    by_target: Dict[str, List[Dict]] = {}
+    for entry in entries:
+        by_target.setdefault(entry["target"], []).append(entry)
+
+    for target, items in sorted(by_target.items()):
+        intervals = [item["minutes"] for item in items]
+        report += f"{target}: {len(items)} check-ins, avg interval {sum(intervals) / len(intervals):.1f} min "
+        report += f"(min {min(intervals):g}, max {max(intervals):g})\n"
+        for item in items:
+            stamp = datetime.fromtimestamp(item["time"]).strftime('%H:%M:%S')
+            report += f"    {stamp}  {item['minutes']:>6g} min  {item['reason']}\n"
+    report += f"\nTotal: {len(entries)} check-ins across {len(by_target)} targets\n"
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive check-in scheduler")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    schedule_parser = sub.add_parser("schedule", help="Schedule a check-in with an adaptive interval")
+    schedule_parser.add_argument("minutes", type=float, help="Base interval in minutes")
+    schedule_parser.add_argument("note")
+    schedule_parser.add_argument("target", nargs="?", default="tmux-orc:0")
+    schedule_parser.add_argument("--min", dest="min_minutes", type=float, default=5)
+    schedule_parser.add_argument("--max", dest="max_minutes", type=float, default=120)
+    schedule_parser.add_argument("--jitter", type=int, default=0,
+                                 help="Spread delivery randomly over this many seconds")
+    schedule_parser.add_argument("--dry-run", action="store_true", help="Only print the decision")
+
+    deliver_parser = sub.add_parser("deliver", help="Deliver a due check-in (used by schedule_with_note.sh)")
+    deliver_parser.add_argument("target")
+    deliver_parser.add_argument("job_id")
+    deliver_parser.add_argument("--max-concurrent", type=int,
+                                default=int(os.environ.get("CHECKIN_MAX_CONCURRENT", "3")))
+    deliver_parser.add_argument("--attempt", type=int, default=1, help="Attempt number (set by retries)")
+
+    report_parser = sub.add_parser("report", help="Show the check-in report for a day")
+    report_parser.add_argument("--date", help="YYYY-MM-DD (default: today)")
+    report_parser.add_argument("--json", action="store_true")
+
+    args = parser.parse_args()
+
+    if args.command == "schedule":
+        scheduler = AdaptiveScheduler(args.min_minutes, args.max_minutes)
+        if args.dry_run:
+            decision = scheduler.decide(args.target, args.minutes, persist=False)
+        else:
+            decision = scheduler.schedule(args.target, args.note, args.minutes, args.jitter)
+        if not decision:
+            sys.exit(1)
+        print(f"Next check-in for {decision.target} in {decision.minutes:g} minutes "
+              f"(requested {decision.requested_minutes:g}): {decision.reason}")
+    elif args.command == "deliver":
+        dispatcher = CheckinDispatcher(max_concurrent=args.max_concurrent)
+        sys.exit(0 if dispatcher.deliver(args.target, args.job_id, args.attempt) else 1)
+    elif args.command == "report":
+        day = args.date or datetime.now().strftime('%Y-%m-%d')
+        entries = AdaptiveScheduler().report(day)
+        if args.json:
+            print(json.dumps(entries, indent=2))
+        else:
+            print(format_report(entries, day), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
- #!/bin/bash
+#!/bin/bash
 
 # Send message to Claude agent in tmux window
 # Usage: send-claude-message.sh <session:window> <message>
+#
+# Goes through the window's send queue (send_queue.py), so it holds the same
+# per-target delivery lock as the scheduler, the broker and other senders and
+# never interleaves keystrokes with them. The message is typed right away
+# (--force) and only reported sent once the pane shows it.
 
 if [ $# -lt 2 ]; then
     echo "Usage: $0 <session:window> <message>"
@@ -13,13 +18,14 @@ WINDOW="$1"
 shift  # Remove first argument, rest is the message
 MESSAGE="$*"
 
-# Send the message
-tmux send-keys -t "$WINDOW" "$MESSAGE"
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 
-# Wait 0.5 seconds for UI to register
-sleep 0.5
-
-# Send Enter to submit
-tmux send-keys -t "$WINDOW" Enter
+OUTPUT=$(python3 "$SCRIPT_DIR/send_queue.py" send --force --from "${SENDER:-send-claude-message}" "$WINDOW" "$MESSAGE")
+STATUS=$?
+[ -n "$OUTPUT" ] && echo "$OUTPUT"
+if [ $STATUS -ne 0 ] || [[ "$OUTPUT" != Delivered* ]]; then
+    echo "Message not delivered to $WINDOW"
+    exit 1
+fi
 
-echo "Message sent to $WINDOW: $MESSAGE"
\ No newline at end of file
+echo "Message sent to $WINDOW: $MESSAGE"
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Send policy
+Decides without prompting whether the orchestrator may type something into a
+window: first matching allow/deny rule, then dangerous keys and commands
+(C-c, rm -rf, tmux kill-server, ...), then a per-target rate limit. Every
+decision is appended to registry/logs/sends/<date>.jsonl. A check takes a few
+microseconds, so safety mode stays on for headless automation.
+
+Rules come from send_policy.json next to this file (or $SEND_POLICY):
+  {"default": "allow",
+   "rules": [{"action": "deny", "targets": ["prod:*"], "reason": "production session"},
+             {"action": "allow", "targets": ["scratch:*"], "dangerous": true}],
+   "dangerous": ["terraform destroy"],
+   "rate_limit": {"per_minute": 30, "burst": 10},
+   "rate_limits": {"api_builder:0": {"per_minute": 120, "burst": 30}}}
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fnmatch
+import argparse
+from typing import List, Dict, Optional
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+
+from note_store import append_line
+
+DEFAULT_PATH = Path(__file__).parent / "send_policy.json"
+DEFAULT_AUDIT_DIR = Path(__file__).parent / "registry" / "logs" / "sends"
+
+# tmux key names that interrupt, suspend or end whatever runs in the pane
+DANGEROUS_KEYS = r"\A\s*(C-[cdz\\]|\^[CDZ]|C-M-c)\s*\Z"
+DANGEROUS_PATTERNS = [
+    DANGEROUS_KEYS,
+    r"\brm\s+(-[a-zA-Z]*[rRf][a-zA-Z]*\s+)+",
+    r"\btmux\b.*\bkill-(server|session)\b|^\s*kill-(server|session)\b",
+    r"\bgit\s+push\b.*\s(--force|-f)\b",
+    r"\bgit\s+(reset\s+--hard|clean\s+-[a-zA-Z]*f)",
+    r"(^|[;&|]\s*)(sudo\s+)?(mkfs(\.\w+)?\s|(shutdown|reboot|halt|poweroff)(\s+(-\S+|now)|\s*$))",
+    r"\bdd\s+if=",
+    r"\bchmod\s+-R\s+777\b",
+    r"(?i:\bDROP\s+(TABLE|DATABASE|SCHEMA)\b)",
+    r":\(\)\s*\{\s*:\|:&\s*\};:",
+]
+
+
+@dataclass
+class PolicyRule:
+    action: str  # allow or deny
+    targets: List[str] = field(default_factory=lambda: ["*"])  # session:window globs
+    pattern: str = ""  # regex the text must match; empty matches anything
+    dangerous: bool = False  # an allow rule that also lets dangerous keys and commands through
+    reason: str = ""
+
+    def applies_to(self, target: str) -> bool:
+        return any(fnmatch.fnmatchcase(target, t) for t in self.targets)
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    reason: str
+    rule: int = -1  # index of the deciding rule, -1 for defaults, dangerous checks and rate limits
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst: float):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class SendPolicy:
+    """Allow/deny rules, dangerous input detection and per-target rate limits, checked without blocking.
+
+    Rate limits are per process: each orchestrator, scheduler or broker has its own budget.
+    """
+
+    def __init__(self, rules: Optional[List[PolicyRule]] = None, default: str = "allow",
+                 dangerous: Optional[List[str]] = None, rate_limit: Optional[Dict] = None,
+                 rate_limits: Optional[Dict[str, Dict]] = None, audit_dir: Optional[Path] = None):
+        self.rules = list(rules or [])
+        self.default = default
+        self._patterns = [re.compile(rule.pattern, re.MULTILINE) if rule.pattern else None for rule in self.rules]
+        self.dangerous_patterns = DANGEROUS_PATTERNS + list(dangerous or [])
+        self.dangerous = re.compile('|'.join(f"(?:{p})" for p in self.dangerous_patterns), re.MULTILINE)
+        self.rate_limit = rate_limit if rate_limit is not None else {"per_minute": 60, "burst": 20}
+        self.rate_limits = rate_limits or {}
+        self.audit_dir = Path(audit_dir) if audit_dir else DEFAULT_AUDIT_DIR
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._applicable: Dict[str, List[int]] = {}  # target -> indexes of the rules that apply to it
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None, **kwargs) -> "SendPolicy":
+        """Policy from a JSON file ($SEND_POLICY or send_policy.json); built-in defaults if there is none"""
+        path = Path(path or os.environ.get("SEND_POLICY") or DEFAULT_PATH)
+        if not path.exists():
+            return cls(**kwargs)
+        with open(path, 'r') as f:
+            config = json.load(f)
+        return cls([PolicyRule(**rule) for rule in config.get("rules", [])], config.get("default", "allow"),
+                   config.get("dangerous"), config.get("rate_limit"), config.get("rate_limits"), **kwargs)
+
+    def _bucket(self, target: str) -> Optional[TokenBucket]:
+        if target not in self._buckets:
+            limit = next((v for pattern, v in self.rate_limits.items() if fnmatch.fnmatchcase(target, pattern)),
+                         self.rate_limit)
+            self._buckets[target] = TokenBucket(limit["per_minute"], limit.get("burst", limit["per_minute"])) \
+                if limit else None
+        return self._buckets[target]
+
+    def evaluate(self, target: str, text: str) -> Decision:
+        if target not in self._applicable:
+            self._applicable[target] = [i for i, rule in enumerate(self.rules) if rule.applies_to(target)]
+        allow_dangerous = False
+        decided = None
+        for i in self._applicable[target]:
+            pattern = self._patterns[i]
+            if pattern is None or pattern.search(text):
+                rule = self.rules[i]
+                if rule.action == "deny":
+                    return Decision(False, rule.reason or f"denied by rule {i}", i)
+                allow_dangerous = rule.dangerous
+                decided = i
+                break
+        if not allow_dangerous:
+            match = self.dangerous.search(text)
+            if match:
+                return Decision(False, f"dangerous input: {match.group().strip()[:40]}")
+        if decided is None and self.default == "deny":
+            return Decision(False, "no rule allows this target")
+        bucket = self._bucket(target)
+        if bucket and not bucket.take():
+            return Decision(False, f"rate limited ({bucket.rate * 60:g}/min)")
+        if decided is None:
+            return Decision(True, "default")
+        return Decision(True, self.rules[decided].reason or f"allowed by rule {decided}", decided)
+
+    def check(self, target: str, text: str, audit: bool = True) -> Decision:
+        """Evaluate a send and record it in the audit log"""
+        decision = self.evaluate(target, text)
+        if audit:
+            now = time.time()
+            append_line(self.audit_dir / f"{datetime.fromtimestamp(now).strftime('%Y-%m-%d')}.jsonl",
+                        {"ts": now, "target": target, "allowed": decision.allowed, "reason": decision.reason,
+                         "rule": decision.rule, "text": text[:200], "pid": os.getpid()})
+        return decision
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check sends against the send policy and read the audit log")
+    parser.add_argument("--policy", type=Path, help=f"Policy file (default: $SEND_POLICY or {DEFAULT_PATH.name})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    check_parser = sub.add_parser("check", help="Would this text be sent to this target?")
+    check_parser.add_argument("target")
+    check_parser.add_argument("text")
+
+    audit_parser = sub.add_parser("audit", help="Show the audit log")
+    audit_parser.add_argument("--date", default=datetime.now().strftime('%Y-%m-%d'), help="YYYY-MM-DD")
+    audit_parser.add_argument("--denied", action="store_true", help="Only denied sends")
+    audit_parser.add_argument("--target", help="Only this target")
+
+    sub.add_parser("show", help="Print the effective rules")
+
+    args = parser.parse_args()
+    policy = SendPolicy.load(args.policy)
+
+    if args.command == "check":
+        started = time.perf_counter()
+        decision = policy.evaluate(args.target, args.text)
+        elapsed = time.perf_counter() - started
+        print(f"{'ALLOW' if decision.allowed else 'DENY'}: {decision.reason} ({elapsed * 1e6:.0f} µs)")
+        sys.exit(0 if decision.allowed else 1)
+    elif args.command == "audit":
+        path = policy.audit_dir / f"{args.date}.jsonl"
+        try:
+            with open(path, 'r') as f:
+                lines = f.readlines()
+        except OSError:
+            print(f"No sends recorded on {args.date}")
+            return
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if (args.denied and entry["allowed"]) or (args.target and entry["target"] != args.target):
+                continue
+            stamp = datetime.fromtimestamp(entry["ts"]).strftime('%H:%M:%S')
+            print(f"{stamp} {'ALLOW' if entry['allowed'] else 'DENY ':<5} {entry['target']:<18} "
+                  f"{entry['reason'][:30]:<30} {entry['text'][:60]!r}")
+    elif args.command == "show":
+        print(f"default: {policy.default}")
+        for i, rule in enumerate(policy.rules):
+            print(f"{i:>3} {json.dumps(asdict(rule))}")
+        print(f"rate limit: {policy.rate_limit or 'none'}; per target: {policy.rate_limits or 'none'}")
+        for pattern in policy.dangerous_patterns:
+            print(f"dangerous: {pattern}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Per-target delivery queue
+Every message for an agent window goes through its queue under
+registry/sessions/sendq/<target>/, so concurrent producers (the scheduler,
+the broker, people at the Makefile) never interleave keystrokes in one pane.
+Messages queued while the agent is busy are coalesced into one delivery once
+it is idle; a full queue refuses new messages instead of piling them up.
+A delivery counts only once the pane shows the message echoed and submitted,
+and is retried otherwise. Each delivery is logged to deliveries.jsonl, which
+the per-target latency stats are computed from.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import fcntl
+import argparse
+import subprocess
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from note_store import atomic_write, append_line
+from tmux_utils import TmuxOrchestrator, TmuxPane
+
+DEFAULT_ROOT = Path(__file__).parent / "registry" / "sessions" / "sendq"
+MAX_PENDING = 20  # queued messages per target before producers are turned away
+DELIVERABLE_STATES = ("idle", "errored")  # never type into a turn, a question or a bare shell
+PASTE_MARKER = "[Pasted text"  # how the Claude TUI echoes a long paste
+PROBE_CHARS = 30
+STATS_WINDOW = 500  # most recent deliveries the stats are computed over
+
+
+@dataclass
+class QueuedSend:
+    id: str
+    target: str
+    text: str
+    queued: float
+    sender: str = ""
+
+
+@dataclass
+class DeliveryRecord:
+    target: str
+    ids: List[str]
+    queued: float  # when the oldest message in the delivery was queued
+    sent: float = 0.0  # first attempt
+    finished: float = 0.0
+    attempts: int = 0
+    confirmed: bool = False
+    state: str = ""  # agent state when delivery started
+    latency_ms: float = 0.0  # oldest queued -> confirmed
+    send_ms: float = 0.0  # first attempt -> confirmed
+    texts: List[str] = field(default_factory=list)  # kept only for failed deliveries
+
+
+class TargetQueue:
+    """Pending messages of one target in queue.jsonl, changed under an flock"""
+
+    def __init__(self, root: Path, target: str):
+        self.target = target
+        self.directory = Path(root) / quote(target, safe='')
+        self.queue_path = self.directory / "queue.jsonl"
+        self.log_path = self.directory / "deliveries.jsonl"
+
+    def _flock(self, name: str, blocking: bool = True) -> Optional[int]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.directory / name, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    @staticmethod
+    def _unlock(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    @contextmanager
+    def _locked(self):
+        fd = self._flock(".lock")
+        try:
+            yield
+        finally:
+            self._unlock(fd)
+
+    @contextmanager
+    def delivering(self, blocking: bool = True):
+        """Exclusive right to type into the target; yields False if another process holds it (non-blocking)"""
+        fd = self._flock(".deliver.lock", blocking)
+        try:
+            yield fd is not None
+        finally:
+            if fd is not None:
+                self._unlock(fd)
+
+    @staticmethod
+    def _records(path: Path) -> List[Dict]:
+        try:
+            with open(path, 'r') as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+    def pending(self) -> List[QueuedSend]:
+        return [QueuedSend(**record) for record in self._records(self.queue_path)]
+
+    def put(self, item: QueuedSend, max_pending: int) -> bool:
+        """Queue a message unless the target already has max_pending waiting"""
+        with self._locked():
+            if len(self._records(self.queue_path)) >= max_pending:
+                return False
+            append_line(self.queue_path, asdict(item))
+            return True
+
+    def remove(self, ids: List[str]):
+        with self._locked():
+            records = self._records(self.queue_path)
+            atomic_write(self.queue_path, ''.join(json.dumps(record, separators=(',', ':')) + '\n'
+                                                  for record in records if record.get("id") not in ids))
+
+    def log(self, record: DeliveryRecord):
+        append_line(self.log_path, asdict(record))
+
+    def deliveries(self, limit: int = STATS_WINDOW) -> List[Dict]:
+        return self._records(self.log_path)[-limit:]
+
+    def delivery_of(self, message_id: str) -> Optional[DeliveryRecord]:
+        for record in reversed(self.deliveries()):
+            if message_id in record.get("ids", []):
+                return DeliveryRecord(**record)
+        return None
+
+
+def queue_targets(root: Optional[Path] = None) -> List[str]:
+    root = Path(root) if root else DEFAULT_ROOT
+    return sorted(unquote(path.name) for path in root.iterdir() if path.is_dir()) if root.exists() else []
+
+
+def merge_messages(items: List[QueuedSend]) -> str:
+    """One message for everything that queued up while the agent was busy"""
+    if len(items) == 1:
+        return items[0].text
+    parts = [f"--- Message {i} (queued {datetime.fromtimestamp(item.queued).strftime('%H:%M:%S')}"
+             f"{' from ' + item.sender if item.sender else ''}) ---\n{item.text}"
+             for i, item in enumerate(items, 1)]
+    return f"{len(items)} messages arrived while you were busy:\n\n" + "\n\n".join(parts)
+
+
+def probe_lines(text: str) -> Tuple[str, str]:
+    """Short snippets of the first and last line to look for in the pane"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines:
+        return "", ""
+    return lines[0][:PROBE_CHARS], lines[-1][-PROBE_CHARS:]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+
+class SendQueue:
+    """Serialized, coalescing, confirmed delivery of messages to agent windows"""
+
+    def __init__(self, orchestrator: Optional[TmuxOrchestrator] = None, root: Optional[Path] = None,
+                 max_pending: int = MAX_PENDING, confirm_timeout: float = 8, max_attempts: int = 3,
+                 retry_delay: float = 1.0):
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        self.root = Path(root) if root else DEFAULT_ROOT
+        self.max_pending = max_pending
+        self.confirm_timeout = confirm_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def queue(self, target: str) -> TargetQueue:
+        return TargetQueue(self.root, target)
+
+    def enqueue(self, target: str, text: str, sender: str = "") -> Optional[QueuedSend]:
+        """Queue a message; None when no pane answers to the target, the send policy refuses it,
+        or the target is saturated (back off and try later)"""
+        if self._pane(target) is None or not self.orchestrator.allowed(target, text):
+            return None
+        item = QueuedSend(f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}", target, text, time.time(), sender)
+        return item if self.queue(target).put(item, self.max_pending) else None
+
+    def _pane(self, target: str) -> Optional[TmuxPane]:
+        """Freshly listed pane a target reaches (window index or name, session:window.pane, %pane_id)"""
+        located = self.orchestrator.pane_map.pane(target)
+        if located is None:
+            return None
+        return next((pane for pane in self.orchestrator.list_panes(located.session_name)
+                     if pane.pane_id == located.pane_id), None)
+
+    def flush(self, target: str, force: bool = False) -> List[DeliveryRecord]:
+        """Deliver what is queued for a target if the agent can take it (always, with force).
+
+        Returns the deliveries made; nothing if the agent is busy or another
+        process is already delivering to this target (it drains the queue).
+        """
+        queue = self.queue(target)
+        delivered = []
+        with queue.delivering(blocking=force) as mine:
+            if not mine:
+                return delivered
+            while True:
+                items = queue.pending()
+                if not items:
+                    break
+                pane = self._pane(target)
+                if pane is None:
+                    break
+                state = self.orchestrator.state_classifier.classify(pane)
+                if not force and state.state not in DELIVERABLE_STATES:
+                    break  # keep queueing: everything goes in one message once it is idle
+                record = self._deliver(pane, items, state.state)
+                queue.remove(record.ids)
+                queue.log(record)
+                delivered.append(record)
+                if not record.confirmed:
+                    print(f"Error delivering to {target}: no echo after {record.attempts} attempts "
+                          f"(logged in {queue.log_path})")
+                    break
+                force = False  # anything queued meanwhile waits for the agent to finish this turn
+        return delivered
+
+    def send(self, target: str, text: str, sender: str = "", force: bool = False,
+             wait: float = 0) -> Optional[DeliveryRecord]:
+        """Queue a message and deliver it now, or within wait seconds; None while it is still queued"""
+        item = self.enqueue(target, text, sender)
+        if item is None:
+            print(f"Error sending to {target}: no such window or pane, refused by the send policy, "
+                  f"or {self.max_pending} messages already queued")
+            return None
+        return self.await_delivery(target, item.id, force, wait)
+
+    def await_delivery(self, target: str, message_id: str, force: bool = False,
+                       wait: float = 0) -> Optional[DeliveryRecord]:
+        """Flush until the delivery carrying message_id is logged or wait expires"""
+        deadline = time.time() + wait
+        while True:
+            self.flush(target, force)
+            record = self.queue(target).delivery_of(message_id)
+            if record or time.time() >= deadline:
+                return record
+            time.sleep(1)
+
+    def _position(self, pane_id: str) -> Optional[Tuple[int, int]]:
+        result = subprocess.run(self.orchestrator.tmux("display-message", "-p", "-t", pane_id,
+                                                      "#{history_size} #{cursor_y}"),
+                                capture_output=True, text=True)
+        try:
+            history, cursor = result.stdout.split()
+            return int(history), int(cursor)
+        except ValueError:
+            return None
+
+    def _scan(self, pane_id: str, start: int) -> Tuple[List[str], str]:
+        """Lines written since absolute line start (up to the cursor) and the cursor line, wraps joined"""
+        position = self._position(pane_id)
+        if position is None:
+            return [], ""
+        history, cursor = position
+        result = subprocess.run(self.orchestrator.tmux("capture-pane", "-p", "-J", "-t", pane_id,
+                                                      "-S", str(max(start - history, -history)), "-E", str(cursor)),
+                                capture_output=True, text=True)
+        lines = result.stdout.rstrip('\n').split('\n')
+        return lines[:-1], lines[-1]
+
+    def _await_echo(self, pane_id: str, start: int, first: str, last: str) -> Tuple[bool, bool]:
+        """(submitted, echoed): the message shows up in the pane and no longer sits on the input line"""
+        deadline = time.time() + self.confirm_timeout
+        echoed = False
+        while True:
+            lines, cursor_line = self._scan(pane_id, start)
+            echoed = any(first in line or PASTE_MARKER in line for line in lines + [cursor_line])
+            waiting = (last and last in cursor_line) or PASTE_MARKER in cursor_line
+            if echoed and not waiting:
+                return True, True
+            if time.time() >= deadline:
+                return False, echoed
+            time.sleep(0.25)
+
+    def _deliver(self, pane: TmuxPane, items: List[QueuedSend], state: str) -> DeliveryRecord:
+        text = merge_messages(items)
+        first, last = probe_lines(text)
+        record = DeliveryRecord(pane.target, [item.id for item in items], min(item.queued for item in items),
+                                sent=time.time(), state=state)
+        position = self._position(pane.pane_id)
+        start = position[0] + position[1] - 2 if position else 0  # the echo may redraw the input box rows
+        repaste = True
+        while record.attempts < self.max_attempts:
+            record.attempts += 1
+            if repaste:
+                ok = self.orchestrator.paste_text(pane.pane_id, text)
+            else:
+                # Text is in the input box but was not submitted: only press Enter again
+                ok = subprocess.run(self.orchestrator.tmux("send-keys", "-t", pane.pane_id, "Enter"),
+                                    capture_output=True).returncode == 0
+            if ok:
+                record.confirmed, echoed = self._await_echo(pane.pane_id, start, first, last)
+                repaste = not echoed
+                if record.confirmed:
+                    break
+            if record.attempts < self.max_attempts:
+                time.sleep(self.retry_delay * record.attempts)
+        record.finished = time.time()
+        if record.confirmed:
+            record.latency_ms = round((record.finished - record.queued) * 1000, 1)
+            record.send_ms = round((record.finished - record.sent) * 1000, 1)
+        else:
+            record.texts = [item.text for item in items]
+        return record
+
+    def stats(self, target: str) -> Dict:
+        """Delivery counts and latency percentiles over the target's recent deliveries"""
+        queue = self.queue(target)
+        records = queue.deliveries()
+        confirmed = [r for r in records if r.get("confirmed")]
+        latencies = [r["latency_ms"] for r in confirmed]
+        messages = sum(len(r["ids"]) for r in confirmed)
+        return {
+            "target": target,
+            "pending": len(queue.pending()),
+            "deliveries": len(confirmed),
+            "messages": messages,
+            "coalesced": messages - len(confirmed),
+            "failed": len(records) - len(confirmed),
+            "retries": sum(r["attempts"] - 1 for r in records),
+            "p50_ms": percentile(latencies, 0.5),
+            "p95_ms": percentile(latencies, 0.95),
+            "max_ms": max(latencies, default=0.0),
+            "send_p50_ms": percentile([r["send_ms"] for r in confirmed], 0.5),
+        }
+
+    def run(self, interval: float = 2.0):
+        """Drain every queue whose agent became idle"""
+        try:
+            while True:
+                for target in queue_targets(self.root):
+                    if self.queue(target).pending():
+                        for record in self.flush(target):
+                            print(f"{datetime.now().strftime('%H:%M:%S')} {target}: {len(record.ids)} message(s) "
+                                  f"{'delivered' if record.confirmed else 'FAILED'} "
+                                  f"after {record.attempts} attempt(s), {record.latency_ms / 1000:.1f}s queued")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queued, confirmed message delivery to agent windows")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    send_parser = sub.add_parser("send", help="Queue a message and deliver it once the agent is idle")
+    send_parser.add_argument("target", help="session:window (index or name), session:window.pane or %%pane_id")
+    send_parser.add_argument("message", nargs="+")
+    send_parser.add_argument("--from", dest="sender", default="", help="Sender shown if messages are coalesced")
+    send_parser.add_argument("--wait", type=float, default=0, help="Seconds to wait for a busy agent (default: leave queued)")
+    send_parser.add_argument("--force", action="store_true", help="Deliver now even if the agent is busy")
+
+    run_parser = sub.add_parser("run", help="Deliver queued messages as agents become idle")
+    run_parser.add_argument("--interval", type=float, default=2.0)
+
+    stats_parser = sub.add_parser("stats", help="Per-target queue depth, coalescing and latency")
+    stats_parser.add_argument("--json", action="store_true")
+
+    pending_parser = sub.add_parser("pending", help="Show messages waiting for a target")
+    pending_parser.add_argument("target")
+
+    args = parser.parse_args()
+    sender = SendQueue()
+
+    if args.command == "send":
+        item = sender.enqueue(args.target, ' '.join(args.message), args.sender)
+        if item is None:
+            print(f"Not queued for {args.target}: no such window or pane, refused by the send policy, "
+                  f"or {sender.max_pending} messages already waiting")
+            sys.exit(2)
+        record = sender.await_delivery(args.target, item.id, args.force, args.wait)
+        if record is None:
+            print(f"Queued {item.id} for {args.target} ({len(sender.queue(args.target).pending())} pending): "
+                  f"agent is busy or its window is gone; make send-queue delivers it once it is idle")
+            return
+        if not record.confirmed:
+            sys.exit(1)
+        extra = f", coalesced with {len(record.ids) - 1} other(s)" if len(record.ids) > 1 else ""
+        print(f"Delivered to {args.target} in {record.send_ms:.0f} ms "
+              f"({record.attempts} attempt{'s' if record.attempts != 1 else ''}{extra})")
+    elif args.command == "run":
+        print(f"Delivering queued messages every {args.interval:g}s (Ctrl+C to stop)")
+        sender.run(args.interval)
+    elif args.command == "stats":
+        stats = [sender.stats(target) for target in queue_targets(sender.root)]
+        if args.json:
+            print(json.dumps(stats, indent=2))
+            return
+        print(f"{'TARGET':<20} {'PEND':>4} {'SENT':>5} {'MSGS':>5} {'COAL':>4} {'FAIL':>4} {'RETRY':>5} "
+              f"{'P50 ms':>8} {'P95 ms':>8} {'MAX ms':>8} {'SEND ms':>8}")
+        for s in stats:
+            print(f"{s['target'][:20]:<20} {s['pending']:>4} {s['deliveries']:>5} {s['messages']:>5} "
+                  f"{s['coalesced']:>4} {s['failed']:>4} {s['retries']:>5} {s['p50_ms']:>8.0f} "
+                  f"{s['p95_ms']:>8.0f} {s['max_ms']:>8.0f} {s['send_p50_ms']:>8.0f}")
+    elif args.command == "pending":
+        for item in sender.queue(args.target).pending():
+            print(f"--- {item.id} queued {datetime.fromtimestamp(item.queued).strftime('%H:%M:%S')}"
+                  f"{' from ' + item.sender if item.sender else ''} ---\n{item.text}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Fleet status server
+Owns tmux polling for the whole fleet and serves the cached state as JSON over
+a Unix socket (default) or localhost HTTP, so any number of watchers cost the
+same tmux load as one.
+
+Endpoints:
+  GET /snapshot                       all agents
+  GET /tail?target=s:w&lines=50       recent output of one window (cached per activity)
+  GET /changes?since=N&timeout=25     long-poll: agents changed since version N
+                                      ("reset": true means a full snapshot: replace, don't merge)
+  GET /events                         Server-Sent Events stream of changes
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Dict, Optional, Tuple
+from dataclasses import asdict
+from urllib.parse import urlparse, parse_qs
+from pathlib import Path
+
+from fleet_monitor import FleetMonitor
+from tmux_shards import make_orchestrator
+
+DEFAULT_SOCKET = Path(__file__).parent / "registry" / "sessions" / "status.sock"
+MAX_TAIL_LINES = 500
+REMOVED_HISTORY = 1000  # versions for which closed windows are still reported as removed
+# Fields that change every tick and don't count as a change on their own
+VOLATILE_FIELDS = {"idle_seconds", "sampled_at", "output_rate", "last_activity", "confidence", "reason",
+                   "cpu_percent", "rss_mb", "threads"}
+
+
+class FleetState:
+    """Cached fleet snapshot with a version counter that bumps whenever an agent changes"""
+
+    def __init__(self, monitor: FleetMonitor, interval: float = 2.0):
+        self.monitor = monitor
+        self.interval = interval
+        self.version = 0
+        self.timestamp = 0.0
+        self.agents: Dict[str, Dict] = {}
+        self.changed_at: Dict[str, int] = {}  # target -> version it last changed in
+        self.removed: Dict[str, int] = {}  # target -> version it was closed in
+        self.removed_since = 0  # removals at or before this version have been forgotten
+        self.tails: Dict[str, Tuple[float, int, str]] = {}  # target -> (activity, lines, content)
+        self.cond = threading.Condition()
+        self._stop = threading.Event()
+
+    def poll_once(self):
+        rows = self.monitor.refresh()
+        with self.cond:
+            current = {row.target: asdict(row) for row in rows}
+            changed = []
+            for target, data in current.items():
+                previous = self.agents.get(target)
+                if previous is None or any(previous[k] != v for k, v in data.items()
+                                           if k not in VOLATILE_FIELDS):
+                    changed.append(target)
+            gone = [target for target in self.agents if target not in current]
+
+            self.agents = current
+            self.timestamp = time.time()
+            if changed or gone:
+                self.version += 1
+                for target in changed:
+                    self.changed_at[target] = self.version
+                    self.removed.pop(target, None)
+                for target in gone:
+                    self.changed_at.pop(target, None)
+                    self.tails.pop(target, None)
+                    self.removed[target] = self.version
+                if self.version - self.removed_since > REMOVED_HISTORY:
+                    self.removed_since = self.version - REMOVED_HISTORY
+                    self.removed = {t: v for t, v in self.removed.items() if v > self.removed_since}
+                self.cond.notify_all()
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error polling fleet: {e}")
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+        with self.cond:
+            self.cond.notify_all()
+
+    def snapshot(self) -> Dict:
+        with self.cond:
+            return {"version": self.version, "timestamp": self.timestamp,
+                    "agents": list(self.agents.values())}
+
+    def changes_since(self, since: int) -> Dict:
+        """Agents changed and windows closed after version since.
+
+        A since this server can't answer incrementally (from before the
+        removal history, or ahead of it after a server restart) gets the whole
+        fleet with reset set, for the client to replace its state with.
+        """
+        with self.cond:
+            if since < self.removed_since or since > self.version:
+                return {**self.snapshot(), "removed": [], "reset": True}
+            return {
+                "version": self.version,
+                "timestamp": self.timestamp,
+                "agents": [self.agents[t] for t, v in self.changed_at.items() if v > since and t in self.agents],
+                "removed": [t for t, v in self.removed.items() if v > since],
+                "reset": False
+            }
+
+    def wait_for_change(self, since: int, timeout: float) -> Dict:
+        deadline = time.time() + timeout
+        with self.cond:
+            while since == self.version and not self._stop.is_set():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+        return self.changes_since(since)
+
+    def tail(self, target: str, lines: int) -> Optional[str]:
+        """Recent output of a window; only re-captured when the window has new activity"""
+        lines = max(1, min(lines, MAX_TAIL_LINES))
+        with self.cond:
+            agent = self.agents.get(target)
+            cached = self.tails.get(target)
+        if agent is None:
+            return None
+        if cached and cached[0] == agent["last_activity"] and cached[1] >= lines:
+            return '\n'.join(cached[2].split('\n')[-lines:])
+        session_name, _, window_index = target.rpartition(':')
+        content = self.monitor.orchestrator.capture_window_content(session_name, window_index, lines).rstrip('\n')
+        with self.cond:
+            self.tails[target] = (agent["last_activity"], lines, content)
+        return content
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    state: FleetState = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/snapshot":
+                self._send_json(self.state.snapshot())
+            elif url.path == "/tail":
+                target = query.get("target", "")
+                content = self.state.tail(target, int(query.get("lines", 50)))
+                if content is None:
+                    self._send_json({"error": f"Unknown target: {target}"}, 404)
+                else:
+                    self._send_json({"target": target, "content": content})
+            elif url.path == "/changes":
+                since = int(query.get("since", 0))
+                timeout = min(float(query.get("timeout", 25)), 120)
+                self._send_json(self.state.wait_for_change(since, timeout))
+            elif url.path == "/events":
+                self._stream_events(int(query.get("since", 0)))
+            else:
+                self._send_json({"error": "Not found",
+                                 "endpoints": ["/snapshot", "/tail", "/changes", "/events"]}, 404)
+        except ValueError as e:
+            self._send_json({"error": f"Bad request: {e}"}, 400)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _stream_events(self, since: int):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = since
+        while True:
+            changes = self.state.wait_for_change(version, 15)
+            if changes["version"] != version:
+                version = changes["version"]
+                self.wfile.write(f"id: {version}\nevent: change\ndata: {json.dumps(changes)}\n\n".encode())
+            else:
+                self.wfile.write(b": keepalive\n\n")
+            self.wfile.flush()
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def make_server(state: FleetState, socket_path: Optional[Path] = None, port: Optional[int] = None):
+    handler = type("BoundStatusHandler", (StatusHandler,), {"state": state})
+    if port:
+        server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        server.daemon_threads = True
+        return server
+    socket_path = Path(socket_path or DEFAULT_SOCKET)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        socket_path.unlink()
+    server = UnixHTTPServer(str(socket_path), handler)
+    os.chmod(socket_path, 0o600)
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = 30):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def fetch(path: str, socket_path: Optional[Path] = None, port: Optional[int] = None,
+          timeout: float = 30) -> Dict:
+    """Query a running status server and return the decoded JSON"""
+    if port:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    else:
+        conn = UnixHTTPConnection(str(socket_path or DEFAULT_SOCKET), timeout=timeout)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet status server")
+    parser.add_argument("--socket", type=Path, help=f"Unix socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument("--port", type=int, help="Serve HTTP on 127.0.0.1:PORT instead of a Unix socket")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="Run the status server")
+    serve_parser.add_argument("--session", help="Only track one session")
+    serve_parser.add_argument("--interval", type=float, default=2.0, help="tmux polling interval in seconds")
+    serve_parser.add_argument("--shards", type=int, default=0, help="Merge agents from N sharded tmux servers")
+
+    get_parser = sub.add_parser("get", help="Query a running server, e.g. /snapshot or '/tail?target=api_builder:1'")
+    get_parser.add_argument("path", nargs="?", default="/snapshot")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        state = FleetState(FleetMonitor(make_orchestrator(args.shards), session_name=args.session), args.interval)
+        poller = threading.Thread(target=state.run, daemon=True)
+        poller.start()
+        server = make_server(state, args.socket, args.port)
+        where = f"http://127.0.0.1:{args.port}" if args.port else str(args.socket or DEFAULT_SOCKET)
+        print(f"Fleet status server listening on {where} (polling every {args.interval:g}s)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            state.stop()
+            server.server_close()
+            if not args.port:
+                Path(args.socket or DEFAULT_SOCKET).unlink(missing_ok=True)
+    elif args.command == "get":
+        try:
+            print(json.dumps(fetch(args.path, args.socket, args.port), indent=2))
+        except (OSError, http.client.HTTPException) as e:
+            print(f"Status server not reachable: {e}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Agent supervisor
+Watches every briefed agent window with one batched list-panes call per pass.
+When an agent's pane died, fell back to a shell, or (optionally) hung, it
+restarts the agent with bounded exponential backoff and re-delivers the
+cached briefing (registry/sessions/briefings, saved by the launchers) plus the
+agent's last check-in note. Restart counts are kept in
+registry/sessions/supervisor.json.
+"""
+
+import json
+import time
+import argparse
+import subprocess
+from typing import List, Dict, Optional
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from note_store import NoteStore, atomic_write
+from tmux_utils import TmuxOrchestrator, TmuxPane, SHELL_COMMANDS
+
+SESSIONS_DIR = Path(__file__).parent / "registry" / "sessions"
+DEFAULT_BRIEFINGS = SESSIONS_DIR / "briefings"
+DEFAULT_STATE = SESSIONS_DIR / "supervisor.json"
+
+
+@dataclass
+class Briefing:
+    target: str
+    agent_name: str
+    briefing: str
+    command: str = "claude"
+    cwd: str = ""
+    saved: float = 0.0
+
+
+@dataclass
+class RestartRecord:
+    target: str
+    restarts: int = 0
+    last_restart: float = 0.0
+    last_reason: str = ""
+    backoff: float = 0.0  # seconds to wait before the next restart
+    healthy_since: float = 0.0
+    history: List[Dict] = field(default_factory=list)
+
+
+class BriefingStore:
+    """Last briefing each agent was launched with, keyed by session:window target"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else DEFAULT_BRIEFINGS
+
+    def path(self, target: str) -> Path:
+        return self.root / f"{quote(target, safe='')}.json"
+
+    def save(self, briefing: Briefing):
+        briefing.saved = briefing.saved or time.time()
+        atomic_write(self.path(briefing.target), json.dumps(asdict(briefing), indent=2))
+
+    def get(self, target: str) -> Optional[Briefing]:
+        try:
+            with open(self.path(target), 'r') as f:
+                return Briefing(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def targets(self) -> List[str]:
+        return sorted(unquote(p.stem) for p in self.root.glob("*.json"))
+
+
+class Supervisor:
+    """Detects crashed or hung agents and restarts them with backoff"""
+
+    def __init__(self, orchestrator: Optional[TmuxOrchestrator] = None,
+                 briefings: Optional[BriefingStore] = None, notes: Optional[NoteStore] = None,
+                 session_name: Optional[str] = None, state_path: Optional[Path] = None,
+                 min_backoff: float = 30, max_backoff: float = 1800, stable_seconds: float = 600,
+                 hang_seconds: Optional[float] = None, startup_timeout: float = 20):
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        self.briefings = briefings or BriefingStore()
+        self.notes = notes or NoteStore()
+        self.session_name = session_name
+        self.state_path = Path(state_path) if state_path else DEFAULT_STATE
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_seconds = stable_seconds
+        self.hang_seconds = hang_seconds
+        self.startup_timeout = startup_timeout
+        self.records: Dict[str, RestartRecord] = self._load()
+
+    def _load(self) -> Dict[str, RestartRecord]:
+        try:
+            with open(self.state_path, 'r') as f:
+                return {t: RestartRecord(**r) for t, r in json.load(f).items()}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _save(self):
+        atomic_write(self.state_path, json.dumps({t: asdict(r) for t, r in self.records.items()}, indent=2))
+
+    def diagnose(self, pane: TmuxPane, briefing: Briefing) -> Optional[str]:
+        """Why an agent needs a restart, or None if it looks healthy"""
+        if pane.dead:
+            return "pane died"
+        if pane.current_command in SHELL_COMMANDS:
+            return f"agent exited to {pane.current_command}"
+        if self.hang_seconds:
+            state = self.orchestrator.state_classifier.classify(pane)
+            if state.state == "idle" and not state.at_prompt and state.idle_seconds >= self.hang_seconds:
+                return f"no output for {state.idle_seconds / 60:.0f} minutes away from a prompt"
+        return None
+
+    def check(self) -> List[str]:
+        """One supervision pass; returns the targets restarted"""
+        now = time.time()
+        briefed = set(self.briefings.targets())
+        restarted = []
+        changed = False
+        for pane in self.orchestrator.list_panes(self.session_name):
+            if not pane.agent_pane or pane.target not in briefed:
+                continue
+            briefing = self.briefings.get(pane.target)
+            if briefing is None:
+                continue
+            record = self.records.setdefault(pane.target, RestartRecord(pane.target, healthy_since=now))
+            reason = self.diagnose(pane, briefing)
+
+            if reason is None:
+                # Healthy long enough: the next failure starts from the shortest backoff again
+                if record.backoff and now - record.last_restart >= self.stable_seconds:
+                    record.backoff = 0.0
+                    record.healthy_since = now
+                    changed = True
+                continue
+            if record.backoff and now - record.last_restart < record.backoff:
+                continue  # still backing off after the previous restart
+
+            print(f"{datetime.now().strftime('%H:%M:%S')} Restarting {pane.target} ({briefing.agent_name}): {reason}")
+            ok = self.restart(pane, briefing, record.restarts + 1, reason)
+            record.restarts += 1
+            record.last_restart = now
+            record.last_reason = reason
+            record.backoff = min(self.max_backoff, record.backoff * 2 if record.backoff else self.min_backoff)
+            record.history = (record.history + [{"ts": now, "reason": reason, "ok": ok}])[-20:]
+            restarted.append(pane.target)
+            changed = True
+
+        if changed:
+            self._save()
+        return restarted
+
+    def _tmux(self, *args: str) -> bool:
+        try:
+            subprocess.run(self.orchestrator.tmux(*args), check=True, capture_output=True, text=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error running tmux {args[0]}: {e}")
+            return False
+
+    def _wait_for_command(self, pane_id: str, agent: bool) -> bool:
+        """Wait until the pane runs the agent (or is back at a shell)"""
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            result = subprocess.run(self.orchestrator.tmux("display-message", "-p", "-t", pane_id,
+                                                          "#{pane_current_command}"),
+                                    capture_output=True, text=True)
+            command = result.stdout.strip()
+            if result.returncode == 0 and (command not in SHELL_COMMANDS) == agent:
+                return True
+            time.sleep(0.5)
+        return False
+
+    def restart(self, pane: TmuxPane, briefing: Briefing, attempt: int, reason: str) -> bool:
+        """Bring the agent back in the same pane and re-brief it"""
+        pane_id = pane.pane_id
+        if pane.dead:
+            args = ["respawn-pane", "-k", "-t", pane_id] + (["-c", briefing.cwd] if briefing.cwd else [])
+            if not self._tmux(*args):
+                return False
+        elif pane.current_command not in SHELL_COMMANDS:
+            # Hung agent: interrupt it and quit back to the shell
+            for _ in range(2):
+                self._tmux("send-keys", "-t", pane_id, "C-c")
+                time.sleep(0.5)
+        if not self._wait_for_command(pane_id, agent=False):
+            print(f"  {pane.target}: no shell prompt, giving up for now")
+            return False
+
+        start = f"cd {quote_shell(briefing.cwd)} && clear && {briefing.command}" if briefing.cwd else briefing.command
+        self._tmux("send-keys", "-t", pane_id, "-l", start)
+        self._tmux("send-keys", "-t", pane_id, "Enter")
+        if not self._wait_for_command(pane_id, agent=True):
+            print(f"  {pane.target}: {briefing.command} did not start")
+            return False
+        time.sleep(2)  # let the agent draw its input box
+
+        return self.send_briefing(pane_id, self.compose_briefing(briefing, attempt, reason))
+
+    def compose_briefing(self, briefing: Briefing, attempt: int, reason: str) -> str:
+        message = briefing.briefing.strip()
+        message += (f"\n\n## SUPERVISOR RESTART NOTICE\n"
+                    f"You were restarted at {datetime.now().strftime('%Y-%m-%d %H:%M')} "
+                    f"(restart #{attempt}, reason: {reason}). Check git status and your notes "
+                    f"before continuing where you left off.")
+        note = self.notes.latest(briefing.target)
+        if note:
+            message += f"\n\n## YOUR LAST CHECK-IN NOTE\n{note.note}"
+        return message
+
+    def send_briefing(self, pane_id: str, message: str) -> bool:
+        """Paste a multi-line message as one bracketed paste, then submit it"""
+        return self.orchestrator.paste_text(pane_id, message)
+
+    def run(self, interval: float = 15):
+        try:
+            while True:
+                self.check()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+
+def quote_shell(value: str) -> str:
+    return "'" + value.replace("'", "'\\''") + "'"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restart crashed agents and re-brief them")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Supervise agents continuously")
+    run_parser.add_argument("--session", help="Only supervise one session")
+    run_parser.add_argument("--interval", type=float, default=15.0)
+    run_parser.add_argument("--min-backoff", type=float, default=30, help="Seconds before the first retry")
+    run_parser.add_argument("--max-backoff", type=float, default=1800, help="Cap on the retry delay")
+    run_parser.add_argument("--hang-minutes", type=float, help="Also restart agents silent this long away from a prompt")
+
+    sub.add_parser("status", help="Show briefed agents and restart counts")
+
+    save_parser = sub.add_parser("save-briefing", help="Cache the briefing for an agent started by hand")
+    save_parser.add_argument("target", help="session:window")
+    save_parser.add_argument("file", help="Briefing file")
+    save_parser.add_argument("--name", default="", help="Agent name")
+    save_parser.add_argument("--command", default="claude", help="Command that starts the agent")
+    save_parser.add_argument("--cwd", default="", help="Directory to start the agent in")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        supervisor = Supervisor(session_name=args.session, min_backoff=args.min_backoff,
+                                max_backoff=args.max_backoff,
+                                hang_seconds=args.hang_minutes * 60 if args.hang_minutes else None)
+        print(f"Supervising {len(supervisor.briefings.targets())} briefed agents every {args.interval:g}s "
+              f"(Ctrl+C to stop)")
+        supervisor.run(args.interval)
+    elif args.command == "status":
+        supervisor = Supervisor()
+        for target in supervisor.briefings.targets():
+            briefing = supervisor.briefings.get(target)
+            record = supervisor.records.get(target, RestartRecord(target))
+            last = (f"last {datetime.fromtimestamp(record.last_restart).strftime('%Y-%m-%d %H:%M')} "
+                    f"({record.last_reason})" if record.restarts else "never restarted")
+            print(f"{target:<18} {briefing.agent_name[:20]:<20} {record.restarts:>3} restarts  {last}")
+    elif args.command == "save-briefing":
+        with open(args.file, 'r') as f:
+            text = f.read()
+        BriefingStore().save(Briefing(args.target, args.name or args.target, text, args.command, args.cwd))
+        print(f"Saved briefing for {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Team topology spec
+One JSON file describes an agent team: roles, how many of each, prompts,
+working directories, scrollback size and which tmux server(s) to use. The
+launchers, setup and attach scripts, fleet monitor and Makefile all read it
+instead of keeping their own window lists. Windows are numbered in role order
+and a team larger than max_windows_per_session is split across sessions
+(api_builder, api_builder-2, ...) so each stays quick to list and attach to.
+
+  {"session": "api_builder", "workspace": "workspace", "prompts": "prompts",
+   "history_limit": 10000, "max_windows_per_session": 10,
+   "roles": [{"name": "orchestrator", "title": "Orchestrator", "cwd": ".."},
+             {"name": "tester", "title": "E2E Tester", "count": 40, "cwd": "workspace/tests"}]}
+
+Paths are relative to the spec file; a role without a cwd works in the workspace.
+With "worktrees": "worktrees" every agent gets its own git worktree of the
+workspace (agent_worktrees.py) and works in the matching directory of it; set
+"worktree": false on a role (e.g. the orchestrator) to keep it in place.
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+
+from tmux_utils import TmuxOrchestrator, DEFAULT_HISTORY_LIMIT
+
+DEFAULT_SPEC = Path(__file__).parent / "api_builder" / "team.json"
+MAX_WINDOWS_PER_SESSION = 10
+
+
+@dataclass
+class Role:
+    name: str
+    title: str = ""
+    prompt: str = ""  # prompt key: prompts/enhanced_prompt_<key>.md or prompts/prompt_<key>.md (default: name)
+    cwd: str = ""  # relative to the spec file (default: the workspace)
+    count: int = 1
+    session: str = ""  # pin every instance to this session instead of auto-splitting
+    history_limit: Optional[int] = None  # default: the team's
+    command: str = ""  # default: the team's
+    description: str = ""  # shown in window layouts
+    worktree: bool = True  # own git worktree when the team has a worktrees directory
+
+
+@dataclass
+class AgentSlot:
+    session: str
+    window_index: int
+    window_name: str
+    role: str
+    title: str
+    prompt: str
+    cwd: str
+    history_limit: int
+    command: str
+    description: str = ""
+    worktree: str = ""  # the agent's git worktree ("" when it works in the shared workspace)
+
+    @property
+    def target(self) -> str:
+        return f"{self.session}:{self.window_index}"
+
+
+@dataclass
+class TeamSpec:
+    session: str
+    roles: List[Role]
+    path: Optional[Path] = None
+    workspace: str = "workspace"
+    prompts: str = "prompts"
+    history_limit: int = DEFAULT_HISTORY_LIMIT
+    command: str = "claude"
+    max_windows_per_session: int = MAX_WINDOWS_PER_SESSION
+    shards: int = 0  # spread sessions over N tmux servers (tmux_shards.py); 0 uses one server
+    socket: str = ""  # the one server to use (default: $TMUX_SOCKET)
+    worktrees: str = ""  # give each agent its own git worktree of the workspace under this directory
+    _slots: Optional[List[AgentSlot]] = field(default=None, repr=False)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "TeamSpec":
+        """Spec from a JSON file ($TEAM_SPEC or api_builder/team.json)"""
+        path = Path(path or os.environ.get("TEAM_SPEC") or DEFAULT_SPEC).resolve()
+        with open(path, 'r') as f:
+            config = json.load(f)
+        roles = [Role(**role) for role in config.pop("roles", [])]
+        if os.environ.get("TMUX_HISTORY_LIMIT"):
+            config["history_limit"] = int(os.environ["TMUX_HISTORY_LIMIT"])
+        if not roles:
+            raise ValueError(f"{path}: a team needs at least one role")
+        return cls(config.pop("session", path.stem), roles, path, **config)
+
+    def _resolve(self, relative: str) -> Path:
+        base = self.path.parent if self.path else Path.cwd()
+        return (base / relative).resolve()
+
+    @property
+    def workspace_dir(self) -> Path:
+        return self._resolve(self.workspace)
+
+    @property
+    def prompts_dir(self) -> Path:
+        return self._resolve(self.prompts)
+
+    def _agent_cwd(self, role: Role, name: str) -> Tuple[str, str]:
+        """Working directory and worktree of one agent; a worktree mirrors the role's place in the workspace"""
+        cwd = self._resolve(role.cwd) if role.cwd else self.workspace_dir
+        if not (self.worktrees and role.worktree):
+            return str(cwd), ""
+        worktree = self._resolve(self.worktrees) / name
+        try:
+            return str(worktree / cwd.relative_to(self.workspace_dir)), str(worktree)
+        except ValueError:
+            return str(worktree), str(worktree)
+
+    def slots(self) -> List[AgentSlot]:
+        """Every agent window in launch order, with its session and window index"""
+        if self._slots is not None:
+            return self._slots
+        per_session = max(1, self.max_windows_per_session)
+        counts: Dict[str, int] = {}
+        auto = [self.session]
+        slots = []
+        for role in self.roles:
+            width = len(str(role.count))
+            for n in range(1, role.count + 1):
+                if role.session:
+                    session = role.session
+                else:
+                    if counts.get(auto[-1], 0) >= per_session:
+                        auto.append(f"{self.session}-{len(auto) + 1}")
+                    session = auto[-1]
+                index = counts.get(session, 0)
+                counts[session] = index + 1
+                name = role.name if role.count == 1 else f"{role.name}-{n:0{width}d}"
+                title = role.title or role.name
+                cwd, worktree = self._agent_cwd(role, name)
+                slots.append(AgentSlot(session, index, name, role.name,
+                                       title if role.count == 1 else f"{title} {n}",
+                                       role.prompt or role.name, cwd,
+                                       role.history_limit or self.history_limit, role.command or self.command,
+                                       role.description, worktree))
+        self._slots = slots
+        return slots
+
+    def sessions(self) -> List[str]:
+        seen = []
+        for slot in self.slots():
+            if slot.session not in seen:
+                seen.append(slot.session)
+        return seen
+
+    def by_session(self) -> Dict[str, List[AgentSlot]]:
+        groups: Dict[str, List[AgentSlot]] = {}
+        for slot in self.slots():
+            groups.setdefault(slot.session, []).append(slot)
+        return groups
+
+    def base_prompt(self, slot: AgentSlot) -> str:
+        """The role's prompt file (enhanced version first), or a one-line default"""
+        for name in (f"enhanced_prompt_{slot.prompt}.md", f"prompt_{slot.prompt}.md", slot.prompt):
+            path = self.prompts_dir / name
+            if path.is_file():
+                with open(path, 'r') as f:
+                    return f.read()
+        return f"You are the {slot.title} agent."
+
+    def worktree_manager(self):
+        from agent_worktrees import WorktreeManager
+        return WorktreeManager(self.workspace_dir, self._resolve(self.worktrees) if self.worktrees else None)
+
+    def orchestrator(self) -> TmuxOrchestrator:
+        from tmux_shards import make_orchestrator
+        return make_orchestrator(self.shards, self.socket or None)
+
+    def kill(self, orchestrator: TmuxOrchestrator):
+        import subprocess
+        for session in self.sessions():
+            subprocess.run(orchestrator.tmux("kill-session", "-t", session), capture_output=True)
+
+    def create(self, orchestrator: TmuxOrchestrator, on_window=None) -> bool:
+        """Create every session and window of the team (detached, agents not started)"""
+        ok = True
+        worktree_slots = [slot for slot in self.slots() if slot.worktree]
+        if worktree_slots:
+            manager = self.worktree_manager()
+            if not manager.ensure_repo():
+                return False
+            for slot in worktree_slots:
+                ok = manager.add(slot.window_name) is not None and ok
+        for session, slots in self.by_session().items():
+            for slot in slots:
+                Path(slot.cwd).mkdir(parents=True, exist_ok=True)
+                if slot.window_index == 0:
+                    # The session's scrollback size is the first window's; others override per window
+                    created = orchestrator.create_session(session, slot.window_name, slot.cwd, slot.history_limit)
+                    session_limit = slot.history_limit
+                else:
+                    created = orchestrator.create_window(
+                        session, slot.window_name, slot.cwd,
+                        slot.history_limit if slot.history_limit != session_limit else None, slot.window_index)
+                ok = ok and created
+                if on_window:
+                    on_window(slot, created)
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and create agent teams from a team spec")
+    parser.add_argument("--spec", type=Path, help=f"Team spec (default: $TEAM_SPEC or {DEFAULT_SPEC.relative_to(Path(__file__).parent)})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("show", help="Window layout of the team")
+    sub.add_parser("sessions", help="Print the team's session names, one per line")
+    windows_parser = sub.add_parser("windows", help="Tab-separated windows for shell scripts")
+    windows_parser.add_argument("--session", help="Only one session")
+    sub.add_parser("create", help="Create the team's sessions and windows without starting agents")
+    sub.add_parser("kill", help="Kill every session of the team")
+    sub.add_parser("json", help="Expanded team as JSON")
+
+    args = parser.parse_args()
+    try:
+        team = TeamSpec.load(args.spec)
+        slots = team.slots()
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Error loading team spec: {e}")
+        sys.exit(1)
+
+    if args.command == "show":
+        for session, members in team.by_session().items():
+            print(f"{session} ({len(members)} windows)")
+            for slot in members:
+                detail = f" ({slot.description})" if slot.description else ""
+                print(f"  {slot.window_index:>3}: {slot.title}{detail}")
+    elif args.command == "sessions":
+        print('\n'.join(team.sessions()))
+    elif args.command == "windows":
+        for slot in slots:
+            if not args.session or slot.session == args.session:
+                print('\t'.join([slot.session, str(slot.window_index), slot.window_name, slot.title, slot.cwd,
+                                 slot.prompt, str(slot.history_limit)]))
+    elif args.command == "create":
+        orchestrator = team.orchestrator()
+        team.kill(orchestrator)
+        ok = team.create(orchestrator, lambda slot, created: print(
+            f"  {'✓' if created else '✗'} {slot.target:<18} {slot.title}"))
+        print(f"{len(slots)} windows in {len(team.sessions())} session(s): {', '.join(team.sessions())}")
+        sys.exit(0 if ok else 1)
+    elif args.command == "kill":
+        team.kill(team.orchestrator())
+    elif args.command == "json":
+        print(json.dumps([asdict(slot) for slot in slots], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Window targets follow swaps, moves and renames instead of a cached pane"""
+
+import os
+import time
+import shutil
+import subprocess
+
+import pytest
+
+from tmux_utils import TmuxOrchestrator
+
+
+@pytest.mark.skipif(not shutil.which("tmux"), reason="needs tmux")
+def test_window_targets_follow_layout_changes():
+    server = f"panemap-test-{os.getpid()}"
+    tmux = ["tmux", "-L", server, "-f", "/dev/null"]
+    subprocess.run(tmux + ["new-session", "-d", "-s", "m9", "-n", "first", "-x", "120", "-y", "30", "bash --norc"],
+                   check=True)
+    try:
+        subprocess.run(tmux + ["new-window", "-d", "-t", "m9:1", "-n", "second", "bash --norc"], check=True)
+        orchestrator = TmuxOrchestrator(socket=server)
+        ids = {pane.window_name: pane.pane_id for pane in orchestrator.list_panes("m9")}
+
+        def reached(target: str) -> str:
+            marker = f"mark-{time.time_ns()}"
+            assert orchestrator.send_command_to_pane(target, f"echo {marker}", confirm=False)
+            for _ in range(50):
+                for name, pane_id in ids.items():
+                    if f"{marker}\n" in orchestrator.capture_pane(pane_id, 20) + "\n":
+                        return name
+                time.sleep(0.1)
+            return ""
+
+        assert reached("m9:0") == "first"
+        subprocess.run(tmux + ["swap-window", "-s", "m9:0", "-t", "m9:1"], check=True)
+        assert reached("m9:0") == "second"
+        assert orchestrator.get_pane_status("m9:0").pane_id == ids["second"]
+
+        subprocess.run(tmux + ["rename-window", "-t", "m9:0", "renamed", ";",
+                               "rename-window", "-t", "m9:1", "second"], check=True)
+        assert reached("m9:second") == "first"
+
+        subprocess.run(tmux + ["move-window", "-s", "m9:1", "-t", "m9:5"], check=True)
+        assert reached("m9:5") == "first"
+        assert not orchestrator.send_command_to_pane("m9:1", "echo nowhere", confirm=False)
+    finally:
+        subprocess.run(tmux + ["kill-server"], capture_output=True)
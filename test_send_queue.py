@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Tests for the pure helpers of the send queue"""
+
+from send_queue import QueuedSend, merge_messages, probe_lines, percentile, PROBE_CHARS
+
+
+def test_merge_messages():
+    one = QueuedSend("1", "s:1", "Run the tests", 0)
+    assert merge_messages([one]) == "Run the tests"
+
+    two = QueuedSend("2", "s:1", "Then commit", 60, sender="pm")
+    merged = merge_messages([one, two])
+    assert merged.startswith("2 messages arrived while you were busy:")
+    assert merged.index("Run the tests") < merged.index("Then commit")
+    assert "--- Message 2 (queued " in merged and " from pm) ---\nThen commit" in merged
+    assert "--- Message 1 (queued " in merged and " from " not in merged.split("--- Message 2")[0]
+
+
+def test_probe_lines():
+    assert probe_lines("") == ("", "")
+    assert probe_lines("\n   \n") == ("", "")
+    assert probe_lines("  only line  ") == ("only line", "only line")
+
+    first, last = probe_lines("x" * 50 + "A\n\nmiddle\n" + "B" + "y" * 50 + "\n")
+    assert first == "x" * PROBE_CHARS
+    assert last == "y" * PROBE_CHARS
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([42], 0.95) == 42
+    values = [float(v) for v in range(100, 0, -1)]
+    assert percentile(values, 0.5) == 51
+    assert percentile(values, 0.95) == 96
+    assert percentile(values, 1.0) == 100
+    assert percentile([1.04, 2.26], 0.99) == 2.3
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Regression cases for the error pattern behind the errored agent state and adaptive check-ins"""
+
+from tmux_utils import ERROR_PATTERN
+
+FAILURES = [
+    "Traceback (most recent call last):",
+    "FAILED tests/test_api.py::test_health - AssertionError",
+    "ERROR tests/test_db.py - ImportError",
+    "  ⎿  FAILED (failures=2)",
+    "===== 2 failed, 10 passed in 1.20s =====",
+    "===== 1 error in 0.31s =====",
+    "ValueError: invalid literal for int()",
+    "error[E0308]: mismatched types",
+    "fatal: not a git repository",
+    "bash: pytset: command not found",
+    "CONFLICT (content): Merge conflict in app.py",
+    "[ERROR] build failed",
+]
+
+PROSE = [
+    "I'll add error handling to the endpoint.",
+    "===== 0 failed, 12 passed in 0.80s =====",
+    "The request failed validation earlier but now passes.",
+    "Errors are logged to stderr.",
+    "Add an ERROR_PATTERN constant for the parser",
+    "Fixed the error: the fixture now closes the connection",
+    "No failures, no errors.",
+]
+
+
+def test_failures_match():
+    for line in FAILURES:
+        assert ERROR_PATTERN.search(line), line
+
+
+def test_prose_does_not_match():
+    for line in PROSE:
+        assert not ERROR_PATTERN.search(line), line
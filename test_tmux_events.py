@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Per-pane activity and silence events from several windows of one session at once"""
+
+import os
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tmux_utils import TmuxOrchestrator
+from tmux_events import TmuxEventListener
+
+SILENCE = 1.0
+
+
+@pytest.mark.skipif(not shutil.which("tmux"), reason="needs tmux")
+def test_simultaneous_windows():
+    server = f"events-test-{os.getpid()}"
+    tmux = ["tmux", "-L", server, "-f", "/dev/null"]
+    subprocess.run(tmux + ["new-session", "-d", "-s", "ev", "-x", "120", "-y", "30", "bash --norc"], check=True)
+    try:
+        for _ in range(2):
+            subprocess.run(tmux + ["new-window", "-d", "-t", "ev", "bash --norc"], check=True)
+        subprocess.run(tmux + ["split-window", "-d", "-t", "ev:0", "bash --norc"], check=True)
+        panes = dict(line.split() for line in subprocess.run(
+            tmux + ["list-panes", "-s", "-t", "ev", "-F", "#{window_index}.#{pane_index} #{pane_id}"],
+            capture_output=True, text=True, check=True).stdout.split('\n') if line)
+
+        root = Path(tempfile.mkdtemp())
+        listener = TmuxEventListener(TmuxOrchestrator(socket=server), root / "events.sock", root / "spool.jsonl",
+                                     silence=SILENCE, session_name="ev")
+        received = []
+
+        def collect():
+            for event in listener.events(timeout=2.5):
+                received.append((time.time(), event))
+
+        thread = threading.Thread(target=collect)
+        thread.start()
+        time.sleep(SILENCE + 0.5)  # every pane reports its initial silence
+
+        started = time.time()
+        # Windows 0 and 1 (and the split in window 0) print at the same moment; window 2 stays quiet
+        subprocess.run(tmux + ["send-keys", "-t", "ev:0.0", "echo one", "Enter", ";",
+                               "send-keys", "-t", "ev:1.0", "echo two", "Enter", ";",
+                               "send-keys", "-t", "ev:0.1", "echo split", "Enter"], check=True)
+        thread.join(timeout=15)
+        listener.close()
+    finally:
+        subprocess.run(tmux + ["kill-server"], capture_output=True)
+
+    after = [(at, event) for at, event in received if at >= started]
+    activity = [event for _, event in after if event.event == "activity"]
+    assert sorted(event.pane_id for event in activity) == sorted([panes["0.0"], panes["1.0"], panes["0.1"]])
+    assert all(event.side_pane == (event.pane_id == panes["0.1"]) for event in activity)
+    assert [event.state for event in activity if event.side_pane] == [None]
+
+    agent_states = {event.target: event.state for event in activity if not event.side_pane}
+    assert agent_states == {"ev:0": "busy", "ev:1": "busy"}
+
+    silences = [(at, event) for at, event in after if event.event == "silence"]
+    assert sorted(event.pane_id for _, event in silences) == sorted([panes["0.0"], panes["1.0"], panes["0.1"]])
+    for at, event in silences:
+        # Raised when the pane has been quiet for the silence period, not seconds later
+        assert event.ts - started < SILENCE + 0.5
+        assert at - event.ts < 0.5
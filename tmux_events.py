@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+tmux event stream
+Reports agents going idle, resuming, being renamed and exiting without
+capturing anything. The listener attaches one read-only control-mode client
+per session, so tmux streams every pane's output to it (%output): a pane's
+first output after a quiet spell is an "activity" event, and no output for
+the silence period is a "silence" event - per pane, one event per
+transition, each raised when it happens. Pane exits come from global
+pane-exited / pane-died hooks, which run `tmux_events.py emit ...` to send a
+datagram to the listener socket (registry/sessions/events.sock), or spool it
+when nobody is listening.
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import select
+import socket
+import argparse
+import subprocess
+from typing import Dict, Iterator, List, Optional
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+from note_store import append_line
+from tmux_utils import TmuxOrchestrator
+
+SESSIONS_DIR = Path(__file__).parent / "registry" / "sessions"
+DEFAULT_SOCKET = SESSIONS_DIR / "events.sock"
+DEFAULT_SPOOL = SESSIONS_DIR / "events.spool.jsonl"
+
+# What each event says about the agent
+EVENT_STATES = {
+    "silence": "idle",
+    "activity": "busy",
+    "pane-exited": "exited",
+    "pane-died": "exited",
+}
+# Control-mode notifications after which the pane map is re-read
+LAYOUT_NOTIFICATIONS = (b"%window-add", b"%window-close", b"%unlinked-window-close",
+                        b"%layout-change", b"%window-renamed", b"%sessions-changed")
+
+
+@dataclass
+class TmuxEvent:
+    event: str
+    session: str
+    window: Optional[int]
+    pane_id: str
+    window_name: str
+    ts: float
+    side_pane: bool = False  # a split, not the window's agent pane
+
+    @property
+    def target(self) -> str:
+        return f"{self.session}:{self.window}" if self.session and self.window is not None else self.pane_id
+
+    @property
+    def state(self) -> Optional[str]:
+        # A split's output or exit says nothing about the agent in its window
+        return None if self.side_pane else EVENT_STATES.get(self.event)
+
+
+def hook_command(socket_path: Optional[Path] = None) -> str:
+    """Shell command tmux hooks run (event and pane fields are appended)"""
+    command = f"{shlex.quote(sys.executable)} {shlex.quote(str(Path(__file__).resolve()))}"
+    if socket_path:
+        command += f" --socket {shlex.quote(str(Path(socket_path).resolve()))}"
+    return command + " emit"
+
+
+def emit(event: Dict, socket_path: Optional[Path] = None, spool_path: Optional[Path] = None):
+    """Send one event to the listener; spool it if no listener is running"""
+    payload = json.dumps(event, separators=(',', ':')).encode()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.sendto(payload, str(socket_path or DEFAULT_SOCKET))
+    except OSError:
+        append_line(Path(spool_path or DEFAULT_SPOOL), event)
+    finally:
+        sock.close()
+
+
+class ControlClient:
+    """Read-only control-mode client on one session; tmux writes every pane's output to it"""
+
+    def __init__(self, orchestrator: TmuxOrchestrator, session_name: str):
+        self.session_name = session_name
+        # stdin stays open: the client detaches when it is closed
+        self.proc = subprocess.Popen(orchestrator.tmux("-C", "attach-session", "-r", "-t", session_name),
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        os.set_blocking(self.proc.stdout.fileno(), False)
+        self._partial = b''
+
+    def fileno(self) -> int:
+        return self.proc.stdout.fileno()
+
+    def read(self) -> Optional[List[bytes]]:
+        """Complete notification lines available now; None once the client has exited"""
+        try:
+            data = os.read(self.fileno(), 1 << 16)
+        except BlockingIOError:
+            return []
+        if not data:
+            return None
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        return lines
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.proc.stdout.close()
+
+
+class TmuxEventListener:
+    """Follows pane output through control-mode clients and receives exit notifications from hooks"""
+
+    def __init__(self, orchestrator: Optional[TmuxOrchestrator] = None, socket_path: Optional[Path] = None,
+                 spool_path: Optional[Path] = None, silence: float = 60, session_name: Optional[str] = None):
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        self.socket_path = Path(socket_path or DEFAULT_SOCKET)
+        self.spool_path = Path(spool_path or DEFAULT_SPOOL)
+        self.silence = silence
+        self.session_name = session_name
+        self.panes: Dict[str, tuple] = {}  # pane_id -> (session, window index, window name)
+        self.side_panes = set()  # panes that aren't their window's agent pane (splits)
+        self.window_panes: Dict[str, str] = {}  # window_id -> agent pane_id
+        self.states: Dict[str, str] = {}  # target -> last known state from events
+        self.clients: Dict[str, ControlClient] = {}
+        self.last_output: Dict[str, float] = {}  # pane_id -> time of its latest output
+        self.busy: Dict[str, Optional[bool]] = {}  # pane_id -> producing output (None: not known yet)
+        self.sock: Optional[socket.socket] = None
+
+    def open(self):
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+        self._refresh_panes()
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+        self.clients.clear()
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        self.socket_path.unlink(missing_ok=True)
+
+    def _refresh_panes(self):
+        """Re-read every pane, follow sessions that appeared and forget panes that are gone"""
+        live = set()
+        for pane in self.orchestrator.list_panes(self.session_name):
+            live.add(pane.pane_id)
+            self.panes[pane.pane_id] = (pane.session_name, pane.window_index, pane.window_name)
+            if pane.agent_pane:
+                self.side_panes.discard(pane.pane_id)
+                self.window_panes[pane.window_id] = pane.pane_id
+            else:
+                self.side_panes.add(pane.pane_id)
+            if pane.pane_id not in self.last_output:
+                # Quiet since tmux last saw activity in the window: reported idle once that is silence long
+                self.last_output[pane.pane_id] = pane.last_activity or time.time()
+                self.busy[pane.pane_id] = None
+            if pane.session_name not in self.clients:
+                self.clients[pane.session_name] = ControlClient(self.orchestrator, pane.session_name)
+        # Exit hooks may still be on their way for vanished panes: keep their names, stop timing them
+        for pane_id in list(self.last_output):
+            if pane_id not in live:
+                self.last_output.pop(pane_id)
+                self.busy.pop(pane_id, None)
+
+    def _event(self, name: str, pane_id: str, ts: float) -> TmuxEvent:
+        session, window, window_name = self.panes.get(pane_id, ("", None, ""))
+        event = TmuxEvent(name, session, window, pane_id, window_name, ts, pane_id in self.side_panes)
+        if event.state:
+            self.states[event.target] = event.state
+        return event
+
+    def _resolve(self, raw: Dict) -> TmuxEvent:
+        window = raw.get("window")
+        event = TmuxEvent(raw.get("event", ""), raw.get("session", ""),
+                          int(window) if str(window).isdigit() else None,
+                          raw.get("pane_id", ""), raw.get("window_name", ""), raw.get("ts", time.time()))
+        # Pane exits only carry the pane ID: the pane is gone, so use what we knew about it
+        if not event.session and event.pane_id:
+            if event.pane_id not in self.panes:
+                self._refresh_panes()
+            event.session, event.window, event.window_name = self.panes.get(
+                event.pane_id, ("", None, event.window_name))
+        elif event.pane_id:
+            self.panes[event.pane_id] = (event.session, event.window, event.window_name)
+        event.side_pane = event.pane_id in self.side_panes
+        if event.state:
+            self.states[event.target] = event.state
+        if event.event == "pane-exited":
+            self.panes.pop(event.pane_id, None)
+            self.side_panes.discard(event.pane_id)
+            self.last_output.pop(event.pane_id, None)
+            self.busy.pop(event.pane_id, None)
+        return event
+
+    def _read_client(self, client: ControlClient) -> Iterator[TmuxEvent]:
+        """Turn a batch of control-mode notifications into activity and rename events"""
+        lines = client.read()
+        if lines is None:
+            # The session is gone (or the server): follow it again if it comes back
+            client.close()
+            self.clients.pop(client.session_name, None)
+            return
+        now = time.time()
+        active, renamed, refresh = [], [], False
+        for line in lines:
+            if line.startswith(b"%output "):
+                pane_id = line.split(b' ', 2)[1].decode()
+                if pane_id not in active:
+                    active.append(pane_id)
+            elif line.startswith(LAYOUT_NOTIFICATIONS):
+                refresh = True
+                if line.startswith(b"%window-renamed "):
+                    renamed.append(line.split(b' ', 2)[1].decode())
+        if refresh or any(pane_id not in self.panes for pane_id in active):
+            self._refresh_panes()
+        for pane_id in active:
+            self.last_output[pane_id] = now
+            if not self.busy.get(pane_id):
+                self.busy[pane_id] = True
+                yield self._event("activity", pane_id, now)
+        for window_id in renamed:
+            if window_id in self.window_panes:
+                yield self._event("window-renamed", self.window_panes[window_id], now)
+
+    def _silences(self, now: float) -> Iterator[TmuxEvent]:
+        for pane_id, last in list(self.last_output.items()):
+            if self.busy.get(pane_id) is not False and now - last >= self.silence:
+                self.busy[pane_id] = False
+                yield self._event("silence", pane_id, last + self.silence)
+
+    def _next_silence(self, now: float) -> Optional[float]:
+        """Seconds until the next pane can fall silent"""
+        deadlines = [last + self.silence for pane_id, last in self.last_output.items()
+                     if self.busy.get(pane_id) is not False]
+        return max(0.0, min(deadlines) - now) if deadlines else None
+
+    def drain_spool(self) -> Iterator[TmuxEvent]:
+        """Events emitted while no listener was running"""
+        if not self.spool_path.exists():
+            return
+        claimed = self.spool_path.with_name(f".{self.spool_path.name}.{os.getpid()}")
+        os.replace(self.spool_path, claimed)
+        with open(claimed, 'r') as f:
+            for line in f:
+                try:
+                    yield self._resolve(json.loads(line))
+                except ValueError:
+                    continue
+        claimed.unlink()
+
+    def events(self, timeout: Optional[float] = None) -> Iterator[TmuxEvent]:
+        """Block for events; stops after `timeout` seconds without one"""
+        if self.sock is None:
+            self.open()
+        yield from self.drain_spool()
+        last_event = last_refresh = time.time()
+        while True:
+            now = time.time()
+            if not self.clients and now - last_refresh >= 5:
+                # No session to follow yet: look for new ones every few seconds
+                self._refresh_panes()
+                last_refresh = now
+            for event in self._silences(now):
+                last_event = now
+                yield event
+            wait = self._next_silence(now)
+            if not self.clients:
+                wait = 5 if wait is None else min(wait, 5)
+            if timeout is not None:
+                remaining = last_event + timeout - now
+                if remaining <= 0:
+                    return
+                wait = remaining if wait is None else min(wait, remaining)
+            readable, _, _ = select.select([self.sock] + list(self.clients.values()), [], [], wait)
+            for source in readable:
+                if source is self.sock:
+                    try:
+                        batch = [self._resolve(json.loads(self.sock.recv(65536)))]
+                    except ValueError:
+                        continue
+                else:
+                    batch = list(self._read_client(source))
+                for event in batch:
+                    last_event = time.time()
+                    yield event
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-driven idle/activity/exit detection for agent panes")
+    parser.add_argument("--socket", type=Path, help=f"Listener socket (default: {DEFAULT_SOCKET})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    install_parser = sub.add_parser("install", help="Install the pane exit hooks on agent sessions")
+    install_parser.add_argument("--session", help="Only this session (default: all sessions)")
+
+    uninstall_parser = sub.add_parser("uninstall", help="Remove hooks from sessions")
+    uninstall_parser.add_argument("--session", help="Only this session (default: all sessions)")
+
+    listen_parser = sub.add_parser("listen", help="Print events as NDJSON")
+    listen_parser.add_argument("--session", help="Only follow this session (default: all sessions)")
+    listen_parser.add_argument("--silence", type=float, default=60, help="Seconds without output before a pane is idle")
+    listen_parser.add_argument("--states", action="store_true", help="Only print idle/busy/exited transitions")
+
+    emit_parser = sub.add_parser("emit", help="Called by tmux hooks")
+    emit_parser.add_argument("event")
+    emit_parser.add_argument("session")
+    emit_parser.add_argument("window")
+    emit_parser.add_argument("pane_id")
+    emit_parser.add_argument("window_name", nargs="*")
+
+    args = parser.parse_args()
+
+    if args.command == "emit":
+        emit({"event": args.event, "session": args.session, "window": args.window, "pane_id": args.pane_id,
+              "window_name": ' '.join(args.window_name), "ts": time.time()}, args.socket)
+        return
+
+    orchestrator = TmuxOrchestrator()
+    if args.command in ("install", "uninstall"):
+        sessions = [args.session] if args.session else [s.name for s in orchestrator.get_tmux_sessions()]
+        command = hook_command(args.socket)
+        for name in sessions:
+            if args.command == "install":
+                ok = orchestrator.configure_event_hooks(name, command)
+            else:
+                ok = orchestrator.clear_event_hooks(name)
+            print(f"{'✓' if ok else '✗'} {args.command}ed event hooks on {name}")
+    elif args.command == "listen":
+        listener = TmuxEventListener(orchestrator, args.socket, silence=args.silence, session_name=args.session)
+        try:
+            previous: Dict[str, str] = {}
+            for event in listener.events():
+                if args.states:
+                    if not event.state or previous.get(event.target) == event.state:
+                        continue
+                    previous[event.target] = event.state
+                print(json.dumps(dict(asdict(event), target=event.target, state=event.state)), flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+
+
+if __name__ == "__main__":
+    main()
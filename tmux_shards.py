@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Sharded tmux servers
+Spreads agent sessions across N local tmux servers (sockets orch-0 ... orch-N-1)
+so one busy or crashed tmux server only affects its own agents.
+ShardedOrchestrator is a drop-in TmuxOrchestrator: enumeration, capture and
+send fan out to every server in parallel and merge into one fleet view, and
+each session-targeted command is routed to the server that owns the session.
+Where new sessions go is recorded in registry/sessions/shards.json.
+"""
+
+import json
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable, TypeVar
+from pathlib import Path
+
+from note_store import atomic_write
+from tmux_utils import TmuxOrchestrator, TmuxSession, TmuxPane, ServerMemory, DEFAULT_HISTORY_LIMIT
+
+DEFAULT_MAP = Path(__file__).parent / "registry" / "sessions" / "shards.json"
+SOCKET_PREFIX = "orch"
+
+T = TypeVar("T")
+
+
+def shard_sockets(count: int) -> List[str]:
+    return [f"{SOCKET_PREFIX}-{i}" for i in range(count)]
+
+
+def session_of(target: str) -> str:
+    """Session part of a tmux target (session, session:window, session:window.pane)"""
+    return target.split(':', 1)[0].split('.', 1)[0]
+
+
+class ShardedOrchestrator(TmuxOrchestrator):
+    """One fleet view over several tmux servers.
+
+    Pane and window IDs are only unique per server, so panes listed here carry
+    qualified IDs (session:window.%id, session:@id) that tmux accepts as targets
+    and that route back to the right server.
+    """
+
+    def __init__(self, sockets: Optional[List[str]] = None, shards: int = 2, map_path: Optional[Path] = None):
+        super().__init__("")
+        self.sockets = list(sockets) if sockets else shard_sockets(shards)
+        self.shards = {socket: TmuxOrchestrator(socket) for socket in self.sockets}
+        self.map_path = Path(map_path) if map_path else DEFAULT_MAP
+        self.placement: Dict[str, str] = self._load()  # session -> socket
+        self.pool = ThreadPoolExecutor(max_workers=len(self.sockets), thread_name_prefix="tmux-shard")
+
+    def _load(self) -> Dict[str, str]:
+        try:
+            with open(self.map_path, 'r') as f:
+                return {session: socket for session, socket in json.load(f).items() if socket in self.sockets}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save(self):
+        atomic_write(self.map_path, json.dumps(self.placement, indent=2, sort_keys=True))
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+    def fan_out(self, fn: Callable[[TmuxOrchestrator], T], sockets: Optional[List[str]] = None) -> Dict[str, T]:
+        """Run fn against each server's orchestrator in parallel, keyed by socket"""
+        futures = {socket: self.pool.submit(fn, self.shards[socket]) for socket in (self.sockets if sockets is None else sockets)}
+        return {socket: future.result() for socket, future in futures.items()}
+
+    def session_names(self) -> Dict[str, List[str]]:
+        """Live sessions per server (a server that isn't running has none)"""
+        def names(shard: TmuxOrchestrator) -> List[str]:
+            result = subprocess.run(shard.tmux("list-sessions", "-F", "#{session_name}"),
+                                    capture_output=True, text=True)
+            return result.stdout.split() if result.returncode == 0 else []
+
+        live = self.fan_out(names)
+        for socket, sessions in live.items():
+            for session in sessions:
+                self.placement[session] = socket
+        return live
+
+    def shard_for(self, session_name: str) -> TmuxOrchestrator:
+        if session_name not in self.placement:
+            self.session_names()
+        # Unknown sessions go to the first server, which reports them missing
+        return self.shards[self.placement.get(session_name, self.sockets[0])]
+
+    def place(self, session_name: str) -> str:
+        """Socket a session lives on, choosing the least loaded server for a new one"""
+        live = self.session_names()
+        if not any(session_name in sessions for sessions in live.values()):
+            self.placement[session_name] = min(self.sockets, key=lambda socket: len(live[socket]))
+        self._save()
+        return self.placement[session_name]
+
+    def create_session(self, session_name: str, window_name: str = "", cwd: str = "",
+                       history_limit: Optional[int] = DEFAULT_HISTORY_LIMIT) -> Optional[str]:
+        """Start a detached session on the least loaded server; returns its socket"""
+        socket = self.place(session_name)
+        return socket if self.shards[socket].create_session(session_name, window_name, cwd, history_limit) else None
+
+    def tmux(self, *args: str) -> List[str]:
+        """Route a command to the server owning the first -t target"""
+        for flag, value in zip(args, args[1:]):
+            if flag == "-t" and not value.startswith('%'):
+                return self.shard_for(session_of(value)).tmux(*args)
+        return self.shards[self.sockets[0]].tmux(*args)
+
+    def list_panes(self, session_name: Optional[str] = None) -> List[TmuxPane]:
+        if session_name:
+            panes = self.shard_for(session_name).list_panes(session_name)
+        else:
+            panes = [pane for shard_panes in self.fan_out(lambda shard: shard.list_panes()).values()
+                     for pane in shard_panes]
+        for pane in panes:
+            self.placement[pane.session_name] = pane.socket
+            pane.pane_id = f"{pane.target}.{pane.pane_id}"
+            pane.window_id = f"{pane.session_name}:{pane.window_id}"
+        self.pane_map.update(panes, session_name)
+        return panes
+
+    def get_tmux_sessions(self) -> List[TmuxSession]:
+        return [session for sessions in self.fan_out(lambda shard: shard.get_tmux_sessions()).values()
+                for session in sessions]
+
+    def _by_shard(self, targets: List[str]) -> Dict[str, List[str]]:
+        groups: Dict[str, List[str]] = {}
+        for target in targets:
+            groups.setdefault(self.shard_for(session_of(target)).socket, []).append(target)
+        return groups
+
+    def capture_many(self, targets: List[str], num_lines: int = 50) -> Dict[str, str]:
+        """Capture several targets: one worker per server, servers in parallel"""
+        groups = self._by_shard(targets)
+        results = self.fan_out(lambda shard: shard.capture_many(groups[shard.socket], num_lines), list(groups))
+        return {target: text for captured in results.values() for target, text in captured.items()}
+
+    def send_many(self, messages: Dict[str, str], confirm: bool = True) -> Dict[str, bool]:
+        refused = {target for target, text in messages.items() if confirm and not self.allowed(target, text)}
+        groups = self._by_shard([target for target in messages if target not in refused])
+        results = self.fan_out(lambda shard: shard.send_many(
+            {target: messages[target] for target in groups[shard.socket]}, confirm=False), list(groups))
+        sent = {target: ok for shard_sent in results.values() for target, ok in shard_sent.items()}
+        return {target: sent.get(target, False) for target in messages}
+
+    def paste_many(self, pane_ids: List[str], text: str, submit: bool = True) -> Dict[str, bool]:
+        """Two tmux calls per server, servers in parallel"""
+        groups = self._by_shard(pane_ids)
+        results = self.fan_out(lambda shard: shard.paste_many(groups[shard.socket], text, submit), list(groups))
+        return {pane_id: ok for sent in results.values() for pane_id, ok in sent.items()}
+
+    def server_memory(self) -> Optional[ServerMemory]:
+        """Totals over every running server (pid 0: there is more than one)"""
+        servers = [memory for memory in self.fan_out(lambda shard: shard.server_memory()).values() if memory]
+        if not servers:
+            return None
+        return ServerMemory(",".join(m.socket for m in servers), 0, round(sum(m.rss_mb for m in servers), 1),
+                            sum(m.panes for m in servers), sum(m.history_lines for m in servers),
+                            sum(m.history_limit_lines for m in servers))
+
+    def configure_event_hooks(self, session_name: str, hook_command: str) -> bool:
+        return self.shard_for(session_name).configure_event_hooks(session_name, hook_command)
+
+    def clear_event_hooks(self, session_name: str) -> bool:
+        return self.shard_for(session_name).clear_event_hooks(session_name)
+
+
+def make_orchestrator(shards: int = 0, socket: Optional[str] = None) -> TmuxOrchestrator:
+    """Sharded view over N servers, or a single (default or named) server"""
+    return ShardedOrchestrator(shards=shards) if shards > 1 else TmuxOrchestrator(socket)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spread agent sessions across several tmux servers")
+    parser.add_argument("--shards", type=int, default=2, help="Number of tmux servers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    place_parser = sub.add_parser("place", help="Print the socket a session lives on (or should be created on)")
+    place_parser.add_argument("session")
+
+    new_parser = sub.add_parser("new", help="Create a detached session on the least loaded server")
+    new_parser.add_argument("session")
+    new_parser.add_argument("--name", default="", help="First window name")
+    new_parser.add_argument("--cwd", default="")
+
+    sub.add_parser("list", help="Merged view of every agent window on every server")
+
+    capture_parser = sub.add_parser("capture", help="Capture windows in parallel")
+    capture_parser.add_argument("targets", nargs="+")
+    capture_parser.add_argument("--lines", type=int, default=20)
+
+    send_parser = sub.add_parser("send", help="Send a command to windows in parallel")
+    send_parser.add_argument("message")
+    send_parser.add_argument("targets", nargs="+")
+
+    args = parser.parse_args()
+    orchestrator = ShardedOrchestrator(shards=args.shards)
+
+    if args.command == "place":
+        print(orchestrator.place(args.session))
+    elif args.command == "new":
+        socket = orchestrator.create_session(args.session, args.name, args.cwd)
+        if socket:
+            print(f"Created {args.session} on {socket} (tmux -L {socket} attach -t {args.session})")
+    elif args.command == "list":
+        for pane in orchestrator.list_panes():
+            if pane.agent_pane:
+                state = orchestrator.state_classifier.classify(pane)
+                print(f"{pane.socket:<8} {pane.target:<18} {pane.window_name[:16]:<16} "
+                      f"{state.state:<15} {state.last_line[:60]}")
+    elif args.command == "capture":
+        for target, text in orchestrator.capture_many(args.targets, args.lines).items():
+            print(f"=== {target} ===\n{text.rstrip()}\n")
+    elif args.command == "send":
+        for target, ok in orchestrator.send_many({t: args.message for t in args.targets}).items():
+            print(f"{'✓' if ok else '✗'} {target}")
+    orchestrator.close()
+
+
+if __name__ == "__main__":
+    main()
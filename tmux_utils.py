@@ -1,12 +1,58 @@
 #!/usr/bin/env python3
 
+import os
+import uuid
+import fnmatch
 import subprocess
 import json
+import re
 import time
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Callable
+from dataclasses import dataclass, asdict
 from datetime import datetime
 
+from resource_sampler import ResourceSampler, ProcessUsage, read_stat, PAGE_SIZE
+from send_policy import SendPolicy
+
+SHELL_COMMANDS = {"bash", "zsh", "sh", "fish", "dash", "ksh", "tcsh", "login"}
+
+# Failure forms only: case-sensitive and anchored to the start of a line (after any TUI gutter), so prose
+# like "error handling" or "0 failed, 12 passed" doesn't count
+ERROR_PATTERN = re.compile(
+    r"Traceback \(most recent call last\)|^[\s⎿│]*(ERROR|FAILED)\b|\bFAILED \S+::|\[(ERROR|FATAL)\]|"
+    r"\b[1-9]\d* failed\b|\b[1-9]\d* errors? in \d|\b\w*Error: |^[\s⎿│]*(error(\[\w+\])?|fatal): |"
+    r"\w+Exception: |command not found|CONFLICT \(", re.MULTILINE)
+WAITING_PATTERN = re.compile(
+    r"\(y/n\)|\[y/N\]|\[Y/n\]|Do you want to|Press Enter|waiting for (your )?input|"
+    r"❯ 1\. Yes|Continue\?", re.IGNORECASE)
+# A cursor line that is nothing but a prompt: shell ($ # %) or the agent's input box (│ > │)
+PROMPT_PATTERN = re.compile(r"^\s*[│|]?\s*[>❯›]\s*[│|]?\s*$|[$#%]\s*$")
+
+AGENT_STATES = ("busy", "idle", "awaiting_input", "errored", "exited")
+
+# Snapshot cleanup: escape sequences, box drawing, spinner/status and progress bar lines
+ANSI_PATTERN = re.compile(r"\x1b(\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(\x07|\x1b\\)|[@-Z\\-_])|[\x00-\x08\x0b-\x1f\x7f]")
+BOX_CHARS = ''.join(chr(c) for c in range(0x2500, 0x2580)) + "▐▛▜▝▘▌"
+SPINNER_PATTERN = re.compile(r"^[\u2800-\u28ff✻✽✶✳✢✦·∗*◐◓◑◒]\s+\w+…|esc to interrupt")
+PROGRESS_PATTERN = re.compile(r"[█▉▊▋▌▍▎▏▓▒░■]{4,}|\d+%\|")
+CHARS_PER_TOKEN = 4
+
+# tmux notifications turned into events: alerts and renames are session hooks; pane hooks only
+# fire reliably as global hooks (the pane's own options are gone by the time it exits)
+# Session hooks and options earlier versions of configure_event_hooks set: removed on install and uninstall
+SESSION_EVENT_HOOKS = ("alert-silence", "alert-activity", "window-renamed", "after-new-window", "after-split-window")
+SESSION_EVENT_OPTIONS = ("silence-action", "activity-action")
+PANE_EVENT_HOOKS = ("pane-exited", "pane-died")
+STATE_PRIORITY = {"errored": 100, "awaiting_input": 90, "exited": 70, "busy": 50, "idle": 10}
+# Scrollback kept per agent window; tmux's own default (2000) is short for agents, unbounded is worse
+DEFAULT_HISTORY_LIMIT = 10000
+
+PANE_FIELDS = [
+    "session_name", "window_index", "window_name", "window_active", "pane_index", "pane_id",
+    "pane_active", "pane_pid", "pane_current_command", "pane_dead", "window_activity",
+    "history_size", "history_limit", "cursor_y", "pane_height", "session_attached", "window_id"
+]
+
 @dataclass
 class TmuxWindow:
     session_name: str
@@ -20,16 +66,127 @@ class TmuxSession:
     windows: List[TmuxWindow]
     attached: bool
 
+@dataclass
+class TmuxPane:
+    session_name: str
+    window_index: int
+    window_name: str
+    window_active: bool
+    pane_index: int
+    pane_id: str
+    pane_active: bool
+    pane_pid: int
+    current_command: str
+    dead: bool
+    last_activity: float
+    history_size: int
+    history_limit: int
+    cursor_y: int
+    height: int
+    session_attached: bool = False
+    socket: str = ""  # tmux server the pane lives on ("" is the default server)
+    window_id: str = ""
+    agent_pane: bool = False  # the window's first pane, where its agent runs (other panes are splits)
+
+    @property
+    def target(self) -> str:
+        return f"{self.session_name}:{self.window_index}"
+
+    @property
+    def total_lines(self) -> int:
+        return self.history_size + self.cursor_y
+
+@dataclass
+class PaneActivity:
+    target: str
+    sampled_at: float
+    last_activity: float
+    total_lines: int
+    current_command: str
+    output_rate: float = 0.0  # lines per minute since the previous sample
+
+    @property
+    def idle_seconds(self) -> float:
+        return max(0.0, self.sampled_at - self.last_activity)
+
+@dataclass
+class AgentState:
+    target: str
+    pane_id: str
+    state: str  # one of AGENT_STATES
+    confidence: float
+    reason: str
+    command: str
+    idle_seconds: float
+    last_line: str = ""
+    since: float = 0.0  # when the agent entered this state
+    at_prompt: bool = False  # cursor sits on an empty shell or agent input prompt
+
+@dataclass
+class ServerMemory:
+    socket: str
+    pid: int
+    rss_mb: float
+    panes: int
+    history_lines: int  # lines currently held in scrollback across all panes
+    history_limit_lines: int  # what scrollback can grow to if every pane fills its history-limit
+
+def tmux_socket_args(socket: Optional[str]) -> List[str]:
+    """tmux arguments selecting a server: a socket path (-S) or socket name (-L); empty is the default server"""
+    if not socket:
+        return []
+    return ["-S", socket] if "/" in socket else ["-L", socket]
+
+def is_pane_id(target: str) -> bool:
+    """A %pane_id target, bare or qualified by its window (session:window.%id)"""
+    return target.startswith('%') or '.%' in target
+
+def mark_agent_panes(panes: List[TmuxPane]):
+    """Flag the first pane of every window as its agent pane, whichever pane has focus"""
+    first: Dict[Tuple[str, int], TmuxPane] = {}
+    for pane in panes:
+        key = (pane.session_name, pane.window_index)
+        if key not in first or pane.pane_index < first[key].pane_index:
+            first[key] = pane
+    for pane in panes:
+        pane.agent_pane = first[(pane.session_name, pane.window_index)] is pane
+
 class TmuxOrchestrator:
-    def __init__(self):
+    def __init__(self, socket: Optional[str] = None):
+        # TMUX_SOCKET picks the server for tools started with no explicit socket
+        self.socket = os.environ.get("TMUX_SOCKET", "") if socket is None else socket
+        self.tmux_command = ["tmux"] + tmux_socket_args(self.socket)
         self.safety_mode = True
         self.max_lines_capture = 1000
-        
+        self._state_classifier = None
+        self._snapshot_builder = None
+        self._resource_sampler = None
+        self._send_policy = None
+        self._pane_map = None
+
+    def tmux(self, *args: str) -> List[str]:
+        """Command line for a tmux command on this orchestrator's server"""
+        return self.tmux_command + list(args)
+
+    @property
+    def pane_map(self) -> "PaneMap":
+        if self._pane_map is None:
+            self._pane_map = PaneMap(self)
+        return self._pane_map
+
+    def resolve_pane(self, target: str) -> str:
+        """tmux target for a pane ID or pane name, or for a window's agent pane"""
+        return self.pane_map.resolve(target)
+
+    def _run_on_pane(self, target: str, build: Callable[[str], List[str]], **kwargs) -> subprocess.CompletedProcess:
+        """Run a command built for the tmux target of the target's pane"""
+        return subprocess.run(build(self.resolve_pane(target)), check=True, **kwargs)
+
     def get_tmux_sessions(self) -> List[TmuxSession]:
         """Get all tmux sessions and their windows"""
         try:
             # Get sessions
-            sessions_cmd = ["tmux", "list-sessions", "-F", "#{session_name}:#{session_attached}"]
+            sessions_cmd = self.tmux("list-sessions", "-F", "#{session_name}:#{session_attached}")
             sessions_result = subprocess.run(sessions_cmd, capture_output=True, text=True, check=True)
             
             sessions = []
@@ -39,7 +196,7 @@ class TmuxOrchestrator:
                 session_name, attached = line.split(':')
                 
                 # Get windows for this session
-                windows_cmd = ["tmux", "list-windows", "-t", session_name, "-F", "#{window_index}:#{window_name}:#{window_active}"]
+                windows_cmd = self.tmux("list-windows", "-t", session_name, "-F", "#{window_index}:#{window_name}:#{window_active}")
                 windows_result = subprocess.run(windows_cmd, capture_output=True, text=True, check=True)
                 
                 windows = []
@@ -65,24 +222,164 @@ class TmuxOrchestrator:
             print(f"Error getting tmux sessions: {e}")
             return []
     
-    def capture_window_content(self, session_name: str, window_index: int, num_lines: int = 50) -> str:
-        """Safely capture the last N lines from a tmux window"""
-        if num_lines > self.max_lines_capture:
-            num_lines = self.max_lines_capture
-            
+    def list_panes(self, session_name: Optional[str] = None) -> List[TmuxPane]:
+        """Enumerate every pane (or every pane of one session) in a single tmux call"""
+        fmt = "\t".join(f"#{{{field}}}" for field in PANE_FIELDS)
+        cmd = self.tmux("list-panes", "-F", fmt)
+        cmd += ["-s", "-t", session_name] if session_name else ["-a"]
         try:
-            cmd = ["tmux", "capture-pane", "-t", f"{session_name}:{window_index}", "-p", "-S", f"-{num_lines}"]
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"Error listing panes: {e}")
+            return []
+
+        panes = []
+        for line in result.stdout.split('\n'):
+            parts = line.split('\t')
+            if len(parts) != len(PANE_FIELDS):
+                continue
+            (session, window_index, window_name, window_active, pane_index, pane_id, pane_active,
+             pane_pid, command, dead, activity, history_size, history_limit, cursor_y, height, attached,
+             window_id) = parts
+            panes.append(TmuxPane(
+                session_name=session,
+                window_index=int(window_index),
+                window_name=window_name,
+                window_active=window_active == '1',
+                pane_index=int(pane_index),
+                pane_id=pane_id,
+                pane_active=pane_active == '1',
+                pane_pid=int(pane_pid or 0),
+                current_command=command,
+                dead=dead == '1',
+                last_activity=float(activity or 0),
+                history_size=int(history_size or 0),
+                history_limit=int(history_limit or 0),
+                cursor_y=int(cursor_y or 0),
+                height=int(height or 0),
+                session_attached=attached not in ('', '0'),
+                socket=self.socket,
+                window_id=window_id
+            ))
+        mark_agent_panes(panes)
+        self.pane_map.update(panes, session_name)
+        return panes
+
+    def _history_limit_args(self, session_name: str, history_limit: int, create: List[str]) -> List[str]:
+        """Wrap a window-creating command so the new pane gets history_limit and the session keeps its own"""
+        result = subprocess.run(self.tmux("show-options", "-t", session_name, "-v", "history-limit"),
+                                capture_output=True, text=True)
+        previous = result.stdout.strip()
+        restore = ["set-option", "-t", session_name, "history-limit", previous] if previous else \
+            ["set-option", "-u", "-t", session_name, "history-limit"]
+        return self.tmux("set-option", "-t", session_name, "history-limit", str(history_limit), ";",
+                         *create, ";", *restore)
+
+    def create_session(self, session_name: str, window_name: str = "", cwd: str = "",
+                       history_limit: Optional[int] = DEFAULT_HISTORY_LIMIT) -> bool:
+        """Create a detached session whose windows keep history_limit lines of scrollback"""
+        args = ["new-session", "-d", "-s", session_name]
+        args += (["-n", window_name] if window_name else []) + (["-c", cwd] if cwd else [])
+        if history_limit:
+            # The first pane is created with the global value, so swap it for this one command only.
+            # start-server first: on a fresh server the user's config must be loaded before it is read
+            result = subprocess.run(self.tmux("start-server", ";", "show-options", "-gv", "history-limit"),
+                                    capture_output=True, text=True)
+            previous = result.stdout.strip() if result.returncode == 0 else ""
+            if previous:
+                cmd = self.tmux("set-option", "-g", "history-limit", str(history_limit), ";", *args, ";",
+                                "set-option", "-g", "history-limit", previous, ";",
+                                "set-option", "-t", session_name, "history-limit", str(history_limit))
+            else:
+                # Nothing to restore the global value to: leave it alone and only set the session's
+                cmd = self.tmux(*args, ";", "set-option", "-t", session_name, "history-limit", str(history_limit))
+        else:
+            cmd = self.tmux(*args)
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error creating session: {e}")
+            return False
+
+    def create_window(self, session_name: str, window_name: str, cwd: str = "",
+                      history_limit: Optional[int] = None, window_index: Optional[int] = None) -> bool:
+        """Add a window; history_limit overrides the session's scrollback size for this window only"""
+        target = f"{session_name}:{window_index}" if window_index is not None else f"{session_name}:"
+        create = ["new-window", "-t", target, "-n", window_name] + (["-c", cwd] if cwd else [])
+        cmd = self._history_limit_args(session_name, history_limit, create) if history_limit else self.tmux(*create)
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error creating window: {e}")
+            return False
+
+    def clear_history(self, target: str, expected_size: Optional[int] = None) -> bool:
+        """Drop a pane's scrollback; with expected_size only if no line scrolled in since it was measured"""
+        target = self.resolve_pane(target)
+        if expected_size is None:
+            cmd = self.tmux("clear-history", "-t", target, ";", "display-message", "-p", "cleared")
+        else:
+            # Checked inside the tmux server, so no output can slip in between the check and the clear
+            cmd = self.tmux("if-shell", "-F", "-t", target, f"#{{==:#{{history_size}},{expected_size}}}",
+                            f"clear-history -t {target} ; display-message -p cleared")
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            return result.stdout.strip() == "cleared"
+        except subprocess.CalledProcessError as e:
+            print(f"Error clearing history: {e}")
+            return False
+
+    def server_memory(self) -> Optional[ServerMemory]:
+        """tmux server RSS against the scrollback it is holding"""
+        try:
+            result = subprocess.run(self.tmux("display-message", "-p", "#{pid}"), capture_output=True, text=True,
+                                    check=True)
+            pid = int(result.stdout.strip())
+        except (subprocess.CalledProcessError, ValueError) as e:
+            print(f"Error getting tmux server pid: {e}")
+            return None
+        stat = read_stat(pid)
+        panes = self.list_panes()
+        return ServerMemory(
+            socket=self.socket,
+            pid=pid,
+            rss_mb=round(stat[5] * PAGE_SIZE / (1024 * 1024), 1) if stat else 0.0,
+            panes=len(panes),
+            history_lines=sum(pane.history_size for pane in panes),
+            history_limit_lines=sum(pane.history_limit for pane in panes)
+        )
+
+    def capture_pane_range(self, target: str, start: int, end: int) -> str:
+        """Capture an exact line range of a pane (0 is the top visible line, negatives are scrollback)"""
+        try:
+            result = self._run_on_pane(target, lambda pane_id: self.tmux(
+                "capture-pane", "-t", pane_id, "-p", "-S", str(start), "-E", str(end)), capture_output=True, text=True)
+            return result.stdout
+        except subprocess.CalledProcessError as e:
+            return f"Error capturing window content: {e}"
+
+    def capture_pane(self, target: str, num_lines: int = 50) -> str:
+        """Capture the last N lines of one pane (%pane_id, session:window.pane, or a window's agent pane)"""
+        num_lines = min(num_lines, self.max_lines_capture)
+        try:
+            result = self._run_on_pane(target, lambda pane_id: self.tmux(
+                "capture-pane", "-t", pane_id, "-p", "-S", f"-{num_lines}"), capture_output=True, text=True)
             return result.stdout
         except subprocess.CalledProcessError as e:
             return f"Error capturing window content: {e}"
+
+    def capture_window_content(self, session_name: str, window_index: int, num_lines: int = 50) -> str:
+        """Safely capture the last N lines from a tmux window (its agent pane)"""
+        return self.capture_pane(f"{session_name}:{window_index}", num_lines)
     
     def get_window_info(self, session_name: str, window_index: int) -> Dict:
         """Get detailed information about a specific window"""
         try:
-            cmd = ["tmux", "display-message", "-t", f"{session_name}:{window_index}", "-p", 
-                   "#{window_name}:#{window_active}:#{window_panes}:#{window_layout}"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            result = self._run_on_pane(f"{session_name}:{window_index}", lambda pane_id: self.tmux(
+                "display-message", "-t", pane_id, "-p", "#{window_name}:#{window_active}:#{window_panes}:#{window_layout}"),
+                capture_output=True, text=True)
             
             if result.stdout.strip():
                 parts = result.stdout.strip().split(':')
@@ -95,41 +392,242 @@ class TmuxOrchestrator:
                 }
         except subprocess.CalledProcessError as e:
             return {"error": f"Could not get window info: {e}"}
-    
-    def send_keys_to_window(self, session_name: str, window_index: int, keys: str, confirm: bool = True) -> bool:
-        """Safely send keys to a tmux window with confirmation"""
-        if self.safety_mode and confirm:
-            print(f"SAFETY CHECK: About to send '{keys}' to {session_name}:{window_index}")
-            response = input("Confirm? (yes/no): ")
-            if response.lower() != 'yes':
-                print("Operation cancelled")
-                return False
-        
+
+    def get_window_activity(self, session_name: str, window_index: int,
+                            previous: Optional[PaneActivity] = None) -> Optional[PaneActivity]:
+        """Measure idle time and output rate of a window's agent pane without capturing its content"""
         try:
-            cmd = ["tmux", "send-keys", "-t", f"{session_name}:{window_index}", keys]
-            subprocess.run(cmd, check=True)
+            result = self._run_on_pane(f"{session_name}:{window_index}", lambda pane_id: self.tmux(
+                "display-message", "-t", pane_id, "-p",
+                "#{window_activity}:#{history_size}:#{cursor_y}:#{pane_current_command}"), capture_output=True, text=True)
+            last_activity, history_size, cursor_y, command = result.stdout.strip().split(':', 3)
+        except (subprocess.CalledProcessError, ValueError) as e:
+            print(f"Error getting window activity: {e}")
+            return None
+
+        activity = PaneActivity(
+            target=f"{session_name}:{window_index}",
+            sampled_at=time.time(),
+            last_activity=float(last_activity),
+            total_lines=int(history_size) + int(cursor_y),
+            current_command=command
+        )
+        if previous and activity.sampled_at > previous.sampled_at:
+            new_lines = max(0, activity.total_lines - previous.total_lines)
+            # Scrollback at its limit stops growing; fall back to "something happened"
+            if not new_lines and activity.last_activity > previous.sampled_at:
+                new_lines = 1
+            activity.output_rate = new_lines * 60 / (activity.sampled_at - previous.sampled_at)
+        return activity
+
+    @property
+    def send_policy(self) -> SendPolicy:
+        if self._send_policy is None:
+            self._send_policy = SendPolicy.load()
+        return self._send_policy
+
+    def _policy_target(self, target: str) -> str:
+        """session:window of a target, resolving bare pane IDs so policy globs apply to them"""
+        if not target.startswith('%'):
+            return target.split('.', 1)[0]
+        pane = self.pane_map.pane(target)
+        if pane:
+            return pane.target
+        result = subprocess.run(self.tmux("display-message", "-p", "-t", target, "#{session_name}:#{window_index}"),
+                                capture_output=True, text=True)
+        return result.stdout.strip() or target
+
+    def allowed(self, target: str, text: str) -> bool:
+        """Check a send against the send policy (never prompts); refusals are printed, every check is audited"""
+        if not self.safety_mode:
+            return True
+        decision = self.send_policy.check(self._policy_target(target), text)
+        if not decision.allowed:
+            print(f"SAFETY CHECK: not sending to {target}: {decision.reason}")
+        return decision.allowed
+
+    def send_keys_to_pane(self, target: str, keys: str, confirm: bool = True) -> bool:
+        """Send keys to one pane if the send policy allows it"""
+        if confirm and not self.allowed(target, keys):
+            return False
+
+        try:
+            self._run_on_pane(target, lambda pane_id: self.tmux("send-keys", "-t", pane_id, keys))
             return True
         except subprocess.CalledProcessError as e:
             print(f"Error sending keys: {e}")
             return False
-    
-    def send_command_to_window(self, session_name: str, window_index: int, command: str, confirm: bool = True) -> bool:
-        """Send a command to a window (adds Enter automatically)"""
-        # First send the command text
-        if not self.send_keys_to_window(session_name, window_index, command, confirm):
+
+    def send_command_to_pane(self, target: str, command: str, confirm: bool = True) -> bool:
+        """Send a command to one pane (adds Enter automatically)"""
+        if confirm and not self.allowed(target, command):
             return False
-        # Then send the actual Enter key (C-m)
+
+        # Text and Enter (C-m) in one tmux call, so another sender's keys cannot land in between
         try:
-            cmd = ["tmux", "send-keys", "-t", f"{session_name}:{window_index}", "C-m"]
-            subprocess.run(cmd, check=True)
+            self._run_on_pane(target, lambda pane_id: self.tmux(
+                "send-keys", "-t", pane_id, command, ";", "send-keys", "-t", pane_id, "C-m"))
             return True
         except subprocess.CalledProcessError as e:
-            print(f"Error sending Enter key: {e}")
+            print(f"Error sending command: {e}")
             return False
-    
+
+    def send_keys_to_window(self, session_name: str, window_index: int, keys: str, confirm: bool = True) -> bool:
+        """Send keys to a tmux window's agent pane if the send policy allows it"""
+        return self.send_keys_to_pane(f"{session_name}:{window_index}", keys, confirm)
+
+    def send_command_to_window(self, session_name: str, window_index: int, command: str, confirm: bool = True) -> bool:
+        """Send a command to a window's agent pane (adds Enter automatically)"""
+        return self.send_command_to_pane(f"{session_name}:{window_index}", command, confirm)
+
+    def paste_text(self, target: str, text: str, submit: bool = True) -> bool:
+        """Deliver (multi-line) text as one bracketed paste, then press Enter"""
+        buffer = f"orchestrator-{uuid.uuid4().hex[:8]}"
+        try:
+            pane_id = self.resolve_pane(target)
+            subprocess.run(self.tmux("load-buffer", "-b", buffer, "-", ";",
+                                     "paste-buffer", "-p", "-d", "-b", buffer, "-t", pane_id),
+                           input=text, text=True, check=True, capture_output=True)
+            if submit:
+                time.sleep(0.5)  # let the agent's input box take the paste before submitting
+                subprocess.run(self.tmux("send-keys", "-t", pane_id, "Enter"), check=True, capture_output=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error pasting to {target}: {e}")
+            return False
+
+    def capture_many(self, targets: List[str], num_lines: int = 50) -> Dict[str, str]:
+        """Capture the last N lines of several windows or panes, keyed by target"""
+        return {target: self.capture_pane(target, num_lines) for target in targets}
+
+    def send_many(self, messages: Dict[str, str], confirm: bool = True) -> Dict[str, bool]:
+        """Type a command into several windows or panes and press Enter (one tmux call per target)"""
+        sent = {}
+        for target, text in messages.items():
+            if confirm and not self.allowed(target, text):
+                sent[target] = False
+                continue
+            try:
+                self._run_on_pane(target, lambda pane_id: self.tmux("send-keys", "-t", pane_id, "-l", text, ";",
+                                                                    "send-keys", "-t", pane_id, "C-m"),
+                                  capture_output=True, text=True)
+                sent[target] = True
+            except subprocess.CalledProcessError as e:
+                print(f"Error sending keys to {target}: {e}")
+                sent[target] = False
+        return sent
+
+    def paste_many(self, pane_ids: List[str], text: str, submit: bool = True) -> Dict[str, bool]:
+        """Paste the same text into many panes, whatever their number in two tmux calls.
+
+        One call loads a shared buffer and chains a paste into every pane, the
+        second presses Enter everywhere after a single settle delay.
+        """
+        sent: Dict[str, bool] = {}
+        remaining = list(pane_ids)
+        while remaining:
+            buffer = f"orchestrator-{uuid.uuid4().hex[:8]}"
+            args = ["load-buffer", "-b", buffer, "-"]
+            for pane_id in remaining:
+                args += [";", "paste-buffer", "-p", "-b", buffer, "-t", pane_id]
+            result = subprocess.run(self.tmux(*args, ";", "delete-buffer", "-b", buffer),
+                                    input=text, text=True, capture_output=True)
+            if result.returncode == 0:
+                sent.update((pane_id, True) for pane_id in remaining)
+                break
+            # tmux stops a command sequence at its first error: panes before the first
+            # one that is gone got the paste, the rest are retried
+            print(f"Error broadcasting: {result.stderr.strip()}")
+            subprocess.run(self.tmux("delete-buffer", "-b", buffer), capture_output=True)
+            live = subprocess.run(self.tmux("list-panes", "-a", "-F", "#{pane_id}"), capture_output=True, text=True)
+            alive = set(live.stdout.split()) if live.returncode == 0 else set()
+            gone = next((i for i, pane_id in enumerate(remaining) if pane_id.rpartition('.')[2] not in alive), None)
+            if gone is None:
+                sent.update((pane_id, False) for pane_id in remaining)
+                break
+            sent.update((pane_id, True) for pane_id in remaining[:gone])
+            sent.update((pane_id, False) for pane_id in remaining[gone:] if pane_id.rpartition('.')[2] not in alive)
+            remaining = [pane_id for pane_id in remaining[gone:] if pane_id.rpartition('.')[2] in alive]
+
+        pasted = [pane_id for pane_id in pane_ids if sent.get(pane_id)]
+        if submit and pasted:
+            time.sleep(0.5)  # let the agents' input boxes take the paste before submitting
+            args = []
+            for pane_id in pasted:
+                args += ["send-keys", "-t", pane_id, "Enter", ";"]
+            try:
+                subprocess.run(self.tmux(*args[:-1]), check=True, capture_output=True, text=True)
+            except subprocess.CalledProcessError:
+                for pane_id in pasted:
+                    sent[pane_id] = subprocess.run(self.tmux("send-keys", "-t", pane_id, "Enter"),
+                                                   capture_output=True).returncode == 0
+        return sent
+
+    def select_windows(self, session_name: Optional[str] = None, name: Optional[str] = None,
+                       role: Optional[str] = None, states: Optional[List[str]] = None,
+                       exclude: Optional[List[str]] = None) -> List[TmuxPane]:
+        """Agent panes matching every selector given: window name glob, role (window name substring), agent state"""
+        panes = [pane for pane in self.list_panes(session_name) if pane.agent_pane and not pane.dead]
+        if name:
+            panes = [pane for pane in panes if fnmatch.fnmatch(pane.window_name.lower(), name.lower())]
+        if role:
+            panes = [pane for pane in panes if role.lower() in pane.window_name.lower()]
+        if exclude:
+            panes = [pane for pane in panes if pane.target not in exclude and pane.window_name not in exclude]
+        if states:
+            panes = [pane for pane in panes if self.state_classifier.classify(pane).state in states]
+        return panes
+
+    def broadcast(self, text: str, session_name: Optional[str] = None, name: Optional[str] = None,
+                  role: Optional[str] = None, states: Optional[List[str]] = None,
+                  exclude: Optional[List[str]] = None, submit: bool = True, confirm: bool = True) -> Dict[str, bool]:
+        """Send one message to every matching agent window, keyed by session:window"""
+        panes = self.select_windows(session_name, name, role, states, exclude)
+        if not panes:
+            return {}
+        permitted = [pane.pane_id for pane in panes if not confirm or self.allowed(pane.target, text)]
+        sent = self.paste_many(permitted, text, submit)
+        return {pane.target: sent.get(pane.pane_id, False) for pane in panes}
+
+    @property
+    def state_classifier(self) -> "AgentStateClassifier":
+        if self._state_classifier is None:
+            self._state_classifier = AgentStateClassifier(self)
+        return self._state_classifier
+
+    def get_agent_states(self, session_name: Optional[str] = None) -> Dict[str, AgentState]:
+        """Classify every agent window (busy / idle / awaiting_input / errored / exited), keyed by target"""
+        return {state.target: state for state in self.state_classifier.classify_all(session_name)}
+
+    def get_pane_states(self, session_name: Optional[str] = None) -> Dict[str, AgentState]:
+        """Classify every pane, split panes included, keyed by pane ID"""
+        now = time.time()
+        return {pane.pane_id: self.state_classifier.classify(pane, now) for pane in self.list_panes(session_name)}
+
+    def get_pane_status(self, target: str) -> Optional[AgentState]:
+        """State of one pane (%pane_id, session:window.pane, or a window's agent pane)"""
+        cached = self.pane_map.pane(target)
+        if cached is None:
+            return None
+        pane = next((p for p in self.list_panes(cached.session_name) if p.pane_id == cached.pane_id), None)
+        return self.state_classifier.classify(pane) if pane else None
+
+    @property
+    def resource_sampler(self) -> ResourceSampler:
+        if self._resource_sampler is None:
+            self._resource_sampler = ResourceSampler()
+        return self._resource_sampler
+
+    def get_resource_usage(self, session_name: Optional[str] = None) -> Dict[str, ProcessUsage]:
+        """CPU%, RSS, threads and child processes of every agent window's process tree, keyed by target"""
+        panes = [pane for pane in self.list_panes(session_name) if pane.agent_pane and not pane.dead]
+        return self.resource_sampler.sample({pane.target: pane.pane_pid for pane in panes if pane.pane_pid})
+
     def get_all_windows_status(self) -> Dict:
         """Get status of all windows across all sessions"""
         sessions = self.get_tmux_sessions()
+        states = self.get_agent_states()
+        usage = self.get_resource_usage()
         status = {
             "timestamp": datetime.now().isoformat(),
             "sessions": []
@@ -150,12 +648,73 @@ class TmuxOrchestrator:
                     "active": window.active,
                     "info": window_info
                 }
+                state = states.get(f"{session.name}:{window.window_index}")
+                if state:
+                    window_data["state"] = asdict(state)
+                resources = usage.get(f"{session.name}:{window.window_index}")
+                if resources:
+                    window_data["resources"] = asdict(resources)
                 session_data["windows"].append(window_data)
             
             status["sessions"].append(session_data)
         
         return status
     
+    def configure_event_hooks(self, session_name: str, hook_command: str) -> bool:
+        """Have tmux report agent panes exiting (pane-exited, pane-died).
+
+        hook_command is a shell command; each notification runs it with the event
+        name, two empty fields (session and window), the pane ID and an empty window
+        name appended. Idle and busy transitions don't come from hooks: tmux_events.py
+        follows each pane's output over control mode. tmux alerts are raised per
+        session and suppressed while one is pending, and re-arming them from hooks
+        reset every window's silence timer, so they lost and misattributed transitions.
+        """
+        def hook(event: str, fields: str) -> str:
+            command = f"{hook_command} {event} {fields}"
+            escaped = command.replace('\\', '\\\\').replace('"', '\\"').replace('$', '\\$')
+            return f'run-shell -b "{escaped}"'
+
+        commands = self._event_hook_cleanup(session_name)
+        try:
+            existing = subprocess.run(self.tmux("show-hooks", "-gw"), capture_output=True, text=True, check=True).stdout
+            for event in PANE_EVENT_HOOKS:
+                command = hook(event, "'' '' #{hook_pane} ''")
+                if hook_command not in '\n'.join(l for l in existing.split('\n') if l.startswith(event)):
+                    commands.append(["set-hook", "-g", "-a", event, command])
+
+            args = self.tmux()
+            for command in commands:
+                args += command + [";"]
+            subprocess.run(args[:-1], check=True, capture_output=True, text=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error configuring event hooks: {e} {e.stderr or ''}".strip())
+            return False
+
+    def _event_hook_cleanup(self, session_name: str) -> List[List[str]]:
+        """Commands undoing the alert hooks and window monitoring of earlier installs"""
+        commands = [["set-hook", "-u", "-t", session_name, event] for event in SESSION_EVENT_HOOKS]
+        commands += [["set-option", "-u", "-t", session_name, option] for option in SESSION_EVENT_OPTIONS]
+        for pane in self.list_panes(session_name):
+            if pane.agent_pane:
+                target = f"{session_name}:{pane.window_index}"
+                commands += [["set-option", "-w", "-u", "-t", target, "monitor-silence"],
+                             ["set-option", "-w", "-u", "-t", target, "monitor-activity"]]
+        return commands
+
+    def clear_event_hooks(self, session_name: str) -> bool:
+        """Undo configure_event_hooks for one session (global pane hooks stay for other sessions)"""
+        args = self.tmux()
+        for command in self._event_hook_cleanup(session_name):
+            args += command + [";"]
+        try:
+            subprocess.run(args[:-1], check=True, capture_output=True, text=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error clearing event hooks: {e}")
+            return False
+
     def find_window_by_name(self, window_name: str) -> List[Tuple[str, int]]:
         """Find windows by name across all sessions"""
         sessions = self.get_tmux_sessions()
@@ -168,35 +727,394 @@ class TmuxOrchestrator:
         
         return matches
     
-    def create_monitoring_snapshot(self) -> str:
-        """Create a comprehensive snapshot for Claude analysis"""
-        status = self.get_all_windows_status()
-        
-        # Format for Claude consumption
-        snapshot = f"Tmux Monitoring Snapshot - {status['timestamp']}\n"
-        snapshot += "=" * 50 + "\n\n"
-        
-        for session in status['sessions']:
-            snapshot += f"Session: {session['name']} ({'ATTACHED' if session['attached'] else 'DETACHED'})\n"
-            snapshot += "-" * 30 + "\n"
-            
-            for window in session['windows']:
-                snapshot += f"  Window {window['index']}: {window['name']}"
-                if window['active']:
-                    snapshot += " (ACTIVE)"
-                snapshot += "\n"
-                
-                if 'content' in window['info']:
-                    # Get last 10 lines for overview
-                    content_lines = window['info']['content'].split('\n')
-                    recent_lines = content_lines[-10:] if len(content_lines) > 10 else content_lines
-                    snapshot += "    Recent output:\n"
-                    for line in recent_lines:
-                        if line.strip():
-                            snapshot += f"    | {line}\n"
-                snapshot += "\n"
-        
-        return snapshot
+    def create_monitoring_snapshot(self, max_chars: int = 6000, max_tokens: Optional[int] = None,
+                                   session_name: Optional[str] = None) -> str:
+        """Create a compact snapshot for Claude analysis within a character (or token) budget"""
+        if self._snapshot_builder is None:
+            self._snapshot_builder = SnapshotBuilder(self)
+        if max_tokens:
+            max_chars = max_tokens * CHARS_PER_TOKEN
+        return self._snapshot_builder.build(max_chars, session_name)
+
+class PaneMap:
+    """Pane metadata by stable %pane_id, and the tmux targets that reach a window's agent pane.
+
+    tmux never reuses a pane ID while its server runs, so a cached ID is either
+    right or gone. Window names aren't stable: swap-window, move-window,
+    renumber-windows and renames change which window session:window means, so
+    window targets are left for tmux to resolve when each command runs. They
+    are pointed at the window's first pane (the agent pane), so commands can't
+    land on a split pane that happens to have focus. The metadata is rebuilt
+    from every list_panes() call (monitors make one per pass anyway).
+    """
+
+    def __init__(self, orchestrator: TmuxOrchestrator):
+        self.orchestrator = orchestrator
+        self._panes: Dict[str, TmuxPane] = {}  # pane_id -> pane as last enumerated
+        self.refreshed = 0.0
+
+    def update(self, panes: List[TmuxPane], session_name: Optional[str] = None):
+        """Replace the entries of every session (or of one) with freshly enumerated panes"""
+        if session_name is None:
+            self._panes.clear()
+        else:
+            for pane_id in [i for i, pane in self._panes.items() if pane.session_name == session_name]:
+                del self._panes[pane_id]
+        for pane in panes:
+            self._panes[pane.pane_id] = pane
+        self.refreshed = time.time()
+
+    def refresh(self):
+        self.orchestrator.list_panes()
+
+    def base_index(self) -> int:
+        """Index of a window's first pane (pane-base-index; tmux renumbers panes from it on close)"""
+        if not self.refreshed:
+            self.refresh()
+        return min((pane.pane_index for pane in self._panes.values() if pane.agent_pane), default=0)
+
+    def resolve(self, target: str) -> str:
+        """Target for a pane ID, @window_id, session:window[.pane] or session:window_name.
+
+        Pane targets are returned as given; window targets get the agent pane's
+        index, so tmux picks whichever window has that index or name right now.
+        """
+        window = target.partition(':')[2] if ':' in target else target if target.startswith('@') else ''
+        if is_pane_id(target) or not window or '.' in window:
+            return target
+        return f"{target}.{self.base_index()}"
+
+    def pane(self, target: str) -> Optional[TmuxPane]:
+        """The pane a target reaches right now, with its metadata as of the last enumeration"""
+        if is_pane_id(target):
+            pane_ids = [target]
+        else:
+            # list-panes, unlike display-message, fails rather than falling back to the current window.
+            # Sharded orchestrators list panes under qualified IDs (session:window.%id)
+            window = self.resolve(target)
+            result = subprocess.run(self.orchestrator.tmux(
+                "list-panes", "-t", window, "-f", f"#{{==:#{{pane_index}},{window.rpartition('.')[2]}}}",
+                "-F", "#{pane_id} #{session_name}:#{window_index}.#{pane_id}"), capture_output=True, text=True)
+            pane_ids = result.stdout.split() if result.returncode == 0 else []
+        if pane_ids and not any(pane_id in self._panes for pane_id in pane_ids):
+            self.refresh()
+        return next((self._panes[pane_id] for pane_id in pane_ids if pane_id in self._panes), None)
+
+    def window_id(self, target: str) -> Optional[str]:
+        pane = self.pane(target)
+        return pane.window_id if pane else None
+
+class ScrollbackReader:
+    """Returns only the lines that scrolled into a pane's history since the previous read.
+
+    Scrollback lines never change once written, so unlike the visible screen
+    they can be read incrementally without seeing redraws twice. While history
+    is below its limit the new lines are counted exactly from history_size;
+    once the limit is reached the last few lines read are used as an anchor.
+    """
+
+    def __init__(self, orchestrator: TmuxOrchestrator, anchor_lines: int = 5,
+                 max_lines: int = 2000, backfill: bool = False):
+        self.orchestrator = orchestrator
+        self.anchor_lines = anchor_lines
+        self.max_lines = max_lines
+        self.backfill = backfill
+        # pane_id -> (history_size, last_activity, read time, anchor lines)
+        self._state: Dict[str, Tuple[int, float, float, List[str]]] = {}
+
+    def forget(self, pane_id: str):
+        self._state.pop(pane_id, None)
+
+    def cleared(self, pane_id: str):
+        """The pane's history was cleared after the last read: lines from now on are all new"""
+        state = self._state.get(pane_id)
+        if state:
+            self._state[pane_id] = (0, state[1], state[2], [])
+
+    def _capture_history(self, pane: TmuxPane, count: int) -> List[str]:
+        if count <= 0:
+            return []
+        content = self.orchestrator.capture_pane_range(pane.pane_id, -count, -1)
+        lines = content.split('\n')
+        if content.endswith('\n'):
+            lines = lines[:-1]
+        return [line.rstrip() for line in lines]
+
+    def _after_anchor(self, lines: List[str], anchor: List[str]) -> List[str]:
+        size = len(anchor)
+        for end in range(len(lines), size - 1, -1):
+            if lines[end - size:end] == anchor:
+                return lines[end:]
+        return lines
+
+    def read_new_lines(self, pane: TmuxPane) -> List[str]:
+        """New scrollback lines of a pane (from a batched list_panes() call)"""
+        now = time.time()
+        state = self._state.get(pane.pane_id)
+        if state is None:
+            count = min(pane.history_size, self.max_lines if self.backfill else self.anchor_lines)
+            lines = self._capture_history(pane, count) if count else []
+            self._state[pane.pane_id] = (pane.history_size, pane.last_activity, now, lines[-self.anchor_lines:])
+            return lines if self.backfill else []
+
+        history_size, last_activity, read_at, anchor = state
+        grown = pane.history_size - history_size
+        # tmux drops the oldest 10% of history when it hits history-limit, so
+        # near the limit history_size no longer tells how many lines arrived
+        near_limit = pane.history_limit and max(pane.history_size, history_size) >= pane.history_limit * 0.85
+        # window_activity has one-second resolution: re-check anything active since the last read
+        active = grown != 0 or pane.last_activity != last_activity or pane.last_activity >= read_at - 1
+
+        trimmed = pane.history_limit and pane.history_size >= pane.history_limit * 0.85
+
+        new_lines: List[str] = []
+        if grown < 0 and not trimmed:
+            # History was cleared (clear-history): continue from the new end
+            anchor = []
+        elif near_limit and active:
+            if not anchor:
+                new_lines = self._capture_history(pane, min(max(grown, 1), self.max_lines))
+            # Look for the anchor in a small window first, widen only if it scrolled further
+            for count in ((200, self.max_lines) if anchor else ()):
+                window = self._capture_history(pane, min(pane.history_size, count))
+                new_lines = self._after_anchor(window, anchor)
+                if len(new_lines) < len(window) or count >= pane.history_size:
+                    break
+        elif grown > 0:
+            new_lines = self._capture_history(pane, min(grown, self.max_lines))
+
+        if new_lines:
+            anchor = (anchor + new_lines)[-self.anchor_lines:]
+        self._state[pane.pane_id] = (pane.history_size, pane.last_activity, now, anchor)
+        return new_lines
+
+    def read_screen(self, pane: TmuxPane) -> List[str]:
+        """Visible screen lines (may be redrawn, so not part of the incremental stream)"""
+        content = self.orchestrator.capture_pane_range(pane.pane_id, 0, max(pane.height - 1, 0))
+        return [line.rstrip() for line in content.rstrip('\n').split('\n')]
+
+class AgentStateClassifier:
+    """Cheap local agent state from pane metadata, cursor position and prompt patterns.
+
+    Uses one list-panes call per query; a pane's lines around the cursor are
+    only captured when its activity, line count or cursor moved since the
+    previous query, so repeated queries over an idle fleet capture nothing.
+    """
+
+    def __init__(self, orchestrator: TmuxOrchestrator, busy_seconds: float = 15, tail_lines: int = 6):
+        self.orchestrator = orchestrator
+        self.busy_seconds = busy_seconds
+        self.tail_lines = tail_lines
+        # pane_id -> (last_activity, total_lines, cursor_y, lines up to the cursor, previous state)
+        self._cache: Dict[str, Tuple[float, int, int, List[str], Optional[AgentState]]] = {}
+        self.captures = 0
+
+    def forget(self, pane_id: str):
+        self._cache.pop(pane_id, None)
+
+    def retain(self, pane_ids: set, session_name: Optional[str] = None):
+        """Drop cached panes (of one session, or all) that no longer exist"""
+        for pane_id, cached in list(self._cache.items()):
+            in_scope = session_name is None or cached[4].target.rpartition(':')[0] == session_name
+            if in_scope and pane_id not in pane_ids:
+                self.forget(pane_id)
+
+    def _capture_tail(self, pane: TmuxPane) -> List[str]:
+        start = max(0, pane.cursor_y - self.tail_lines)
+        content = self.orchestrator.capture_pane_range(pane.pane_id, start, pane.cursor_y)
+        self.captures += 1
+        lines = content.split('\n')
+        if content.endswith('\n'):
+            lines = lines[:-1]
+        return [line.rstrip() for line in lines]
+
+    def _decide(self, pane: TmuxPane, tail: List[str], idle: float) -> Tuple[str, float, str]:
+        if pane.dead:
+            return "exited", 1.0, "pane is dead"
+        if pane.current_command in SHELL_COMMANDS:
+            return "exited", 0.9, f"back at the {pane.current_command} prompt"
+
+        text = '\n'.join(line for line in tail if line.strip())
+        cursor_line = tail[-1] if tail else ""
+        waiting = WAITING_PATTERN.search(text)
+        if waiting:
+            return "awaiting_input", 0.95 if idle >= 2 else 0.75, f"prompt: {waiting.group()}"
+        error = ERROR_PATTERN.search(text)
+        if idle < self.busy_seconds:
+            confidence = 0.6 + 0.35 * (1 - idle / self.busy_seconds)
+            return "busy", round(confidence, 2), f"output {idle:.0f}s ago"
+        if error:
+            return "errored", 0.8, f"error output: {error.group()}"
+        at_prompt = bool(PROMPT_PATTERN.search(cursor_line))
+        confidence = min(0.95, (0.75 if at_prompt else 0.5) + idle / (self.busy_seconds * 40))
+        reason = f"no output for {idle:.0f}s" + (", cursor at prompt" if at_prompt else "")
+        return "idle", round(confidence, 2), reason
+
+    def classify(self, pane: TmuxPane, now: Optional[float] = None) -> AgentState:
+        now = now or time.time()
+        cached = self._cache.get(pane.pane_id)
+        if cached and cached[:3] == (pane.last_activity, pane.total_lines, pane.cursor_y):
+            tail, previous = cached[3], cached[4]
+        else:
+            tail = [] if pane.dead else self._capture_tail(pane)
+            previous = cached[4] if cached else None
+
+        idle = max(0.0, now - pane.last_activity)
+        state, confidence, reason = self._decide(pane, tail, idle)
+        last_line = next((line for line in reversed(tail) if any(c.isalnum() for c in line)
+                          and not PROMPT_PATTERN.search(line)), "")
+        since = previous.since if previous and previous.state == state else now
+        at_prompt = bool(tail) and bool(PROMPT_PATTERN.search(tail[-1]))
+        result = AgentState(pane.target, pane.pane_id, state, confidence, reason,
+                            pane.current_command, idle, last_line.strip(), since, at_prompt)
+        self._cache[pane.pane_id] = (pane.last_activity, pane.total_lines, pane.cursor_y, tail, result)
+        return result
+
+    def classify_all(self, session_name: Optional[str] = None) -> List[AgentState]:
+        """States of the agent pane of every window"""
+        self.captures = 0
+        now = time.time()
+        panes = [p for p in self.orchestrator.list_panes(session_name) if p.agent_pane]
+        self.retain({p.pane_id for p in panes}, session_name)
+        return [self.classify(pane, now) for pane in panes]
+
+def clean_lines(text: str) -> List[str]:
+    """Terminal output reduced to lines worth reading: no escapes, borders, spinners, bars or repeats"""
+    lines = []
+    for raw in text.split('\n'):
+        line = ANSI_PATTERN.sub('', raw).rstrip().rstrip(BOX_CHARS).rstrip()
+        if line.lstrip()[:1] in BOX_CHARS:
+            line = line.lstrip().lstrip(BOX_CHARS).lstrip()
+        if not any(c.isalnum() for c in line) or SPINNER_PATTERN.search(line.lstrip()) or PROGRESS_PATTERN.search(line):
+            continue
+        indent = len(line) - len(line.lstrip())
+        lines.append(' ' * min(indent, 4) + re.sub(r"\s{2,}", ' ', line.strip()))
+    # Keep only the most recent occurrence of repeated lines
+    seen = set()
+    unique = []
+    for line in reversed(lines):
+        if line not in seen:
+            seen.add(line)
+            unique.append(line)
+    return unique[::-1]
+
+class SnapshotBuilder:
+    """Builds monitoring snapshots that fit a global budget.
+
+    Windows are cleaned with clean_lines() and the budget is shared out by
+    priority: errored and waiting agents first, then windows whose output
+    changed since the previous snapshot. Idle or exited windows with nothing
+    new only get their header line.
+    """
+
+    def __init__(self, orchestrator: TmuxOrchestrator, capture_lines: int = 60, max_line: int = 240):
+        self.orchestrator = orchestrator
+        self.capture_lines = capture_lines
+        self.max_line = max_line
+        self._lines: Dict[str, Tuple[float, int, List[str]]] = {}  # pane_id -> (activity, total lines, lines)
+        self._sent: Dict[str, int] = {}  # target -> hash of the content last included
+
+    def _window_lines(self, pane: TmuxPane) -> List[str]:
+        cached = self._lines.get(pane.pane_id)
+        if cached and cached[:2] == (pane.last_activity, pane.total_lines):
+            return cached[2]
+        start = pane.cursor_y - self.capture_lines + 1
+        lines = [line if len(line) <= self.max_line else line[:self.max_line] + "…"
+                 for line in clean_lines(self.orchestrator.capture_pane_range(pane.pane_id, start, pane.cursor_y))]
+        self._lines[pane.pane_id] = (pane.last_activity, pane.total_lines, lines)
+        return lines
+
+    @staticmethod
+    def _allocate(needs: List[int], weights: List[float], budget: int) -> List[int]:
+        """Split a budget proportionally to weights, giving what a window can't use to the others"""
+        shares = [0] * len(needs)
+        open_ = [i for i in range(len(needs)) if needs[i] > 0]
+        while open_ and budget > 0:
+            total = sum(weights[i] for i in open_)
+            saturated = [i for i in open_ if needs[i] - shares[i] <= budget * weights[i] / total]
+            if not saturated:
+                for i in open_:
+                    shares[i] += int(budget * weights[i] / total)
+                break
+            for i in saturated:
+                budget -= needs[i] - shares[i]
+                shares[i] = needs[i]
+                open_.remove(i)
+        return shares
+
+    def build(self, max_chars: int = 6000, session_name: Optional[str] = None) -> str:
+        now = time.time()
+        classifier = self.orchestrator.state_classifier
+        panes = [p for p in self.orchestrator.list_panes(session_name) if p.agent_pane]
+        classifier.retain({p.pane_id for p in panes}, session_name)
+        for pane_id in list(self._lines):
+            if pane_id not in {p.pane_id for p in panes}:
+                del self._lines[pane_id]
+
+        windows = []
+        for pane in panes:
+            state = classifier.classify(pane, now)
+            lines = self._window_lines(pane)
+            changed = hash(tuple(lines)) != self._sent.get(pane.target)
+            priority = STATE_PRIORITY.get(state.state, 10) + (40 if changed else 0)
+            if state.state == "busy":
+                priority += 20 * (1 - min(state.idle_seconds, 300) / 300)
+            if not changed and state.state in ("idle", "exited"):
+                lines = []
+            header = (f"  Window {pane.window_index}: {pane.window_name}{' (ACTIVE)' if pane.window_active else ''}"
+                      f" [{state.state} {state.confidence:.0%}: {state.reason}]\n")
+            windows.append({"pane": pane, "lines": lines, "changed": changed,
+                            "priority": priority, "header": header})
+
+        out = f"Tmux Monitoring Snapshot - {datetime.now().isoformat()}\n" + "=" * 50 + "\n\n"
+        sessions = []
+        for window in windows:
+            if window["pane"].session_name not in sessions:
+                sessions.append(window["pane"].session_name)
+        attached = {w["pane"].session_name: w["pane"].session_attached for w in windows}
+        session_headers = {name: f"Session: {name} ({'ATTACHED' if attached[name] else 'DETACHED'})\n" + "-" * 30 + "\n"
+                           for name in sessions}
+        fixed = len(out) + sum(len(h) + 1 for h in session_headers.values()) + sum(len(w["header"]) for w in windows) + 80
+
+        # Over budget on headers alone: drop the least important windows entirely
+        windows.sort(key=lambda w: -w["priority"])
+        omitted_windows = 0
+        while windows and fixed > max_chars:
+            dropped = windows.pop()
+            fixed -= len(dropped["header"])
+            omitted_windows += 1
+
+        needs = [sum(len(line) + 7 for line in w["lines"]) for w in windows]
+        shares = self._allocate(needs, [w["priority"] for w in windows], max(0, max_chars - fixed))
+        omitted_lines = 0
+        for window, share in zip(windows, shares):
+            kept, used = [], 0
+            for line in reversed(window["lines"]):
+                if used + len(line) + 7 > share:
+                    break
+                kept.append(line)
+                used += len(line) + 7
+            omitted_lines += len(window["lines"]) - len(kept)
+            window["kept"] = kept[::-1]
+            if window["kept"] and len(kept) == len(window["lines"]):
+                # Only once every line made it in: a window cut short still has unseen output
+                self._sent[window["pane"].target] = hash(tuple(window["lines"]))
+
+        windows.sort(key=lambda w: (sessions.index(w["pane"].session_name), w["pane"].window_index))
+        for name in sessions:
+            members = [w for w in windows if w["pane"].session_name == name]
+            if not members:
+                continue
+            out += session_headers[name]
+            for window in members:
+                out += window["header"]
+                if window["kept"]:
+                    out += "    Recent output:\n" + ''.join(f"    | {line}\n" for line in window["kept"])
+                elif not window["changed"]:
+                    out += "    (no new output since last snapshot)\n"
+            out += "\n"
+        out += f"[{len(out)}/{max_chars} chars, {omitted_lines} lines and {omitted_windows} windows omitted]\n"
+        return out
 
 if __name__ == "__main__":
     orchestrator = TmuxOrchestrator()
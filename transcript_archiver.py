@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Agent transcript archiver
+Continuously persists each agent pane's output into segmented, gzip-compressed
+log files under registry/logs/transcripts/<session>/<window>/ with size/age
+rotation and a retention policy. Every segment is listed in index.jsonl with
+its time range, so reads by timestamp only open the segments they need.
+A segment never mixes two windows: when a window index is reused by a new
+window the open segment is closed first, and each segment records the tmux
+window ID it came from.
+
+Segment lines are "<unix time>\t<line>".
+"""
+
+import os
+import gzip
+import uuid
+import json
+import time
+import argparse
+from bisect import bisect_left
+from typing import List, Dict, Optional, Iterator, Tuple, Callable
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+
+from note_store import atomic_write, append_line
+from tmux_utils import TmuxOrchestrator, TmuxPane, ScrollbackReader
+
+DEFAULT_ROOT = Path(__file__).parent / "registry" / "logs" / "transcripts"
+
+
+@dataclass
+class Segment:
+    file: str
+    start: float
+    end: float
+    lines: int
+    bytes: int
+    window_id: str = ""
+
+
+def parse_time(value: str) -> float:
+    """Accept a unix timestamp, ISO date/time, or a relative age like 30m / 2h / 7d"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].replace('.', '', 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class TranscriptArchive:
+    """Archive of one pane: an open segment plus compressed, indexed history"""
+
+    def __init__(self, directory: Path, max_segment_bytes: int, max_segment_age: float):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.current_path = directory / "current.log"
+        self.index_path = directory / "index.jsonl"
+        self.meta_path = directory / "meta.json"
+        self._meta: Optional[Dict[str, str]] = None
+        self._segments: Optional[List[Segment]] = None
+        self._current_start: Optional[float] = None
+        self._current_lines = 0
+
+    def segments(self) -> List[Segment]:
+        """Closed segments ordered by start time"""
+        if self._segments is None:
+            self._segments = []
+            try:
+                with open(self.index_path, 'r') as f:
+                    for line in f:
+                        if line.strip():
+                            self._segments.append(Segment(**json.loads(line)))
+            except (OSError, ValueError, TypeError):
+                pass
+            self._segments.sort(key=lambda s: s.start)
+        return self._segments
+
+    def meta(self) -> Dict[str, str]:
+        if self._meta is None:
+            try:
+                with open(self.meta_path, 'r') as f:
+                    self._meta = json.load(f)
+            except (OSError, ValueError):
+                self._meta = {}
+        return self._meta
+
+    def name(self) -> str:
+        """Window name the pane had when it was last archived"""
+        return self.meta().get("name", "")
+
+    def window_id(self) -> str:
+        """tmux window ID (@N) the open segment belongs to"""
+        return self.meta().get("window_id", "")
+
+    def set_window(self, name: str, window_id: str = ""):
+        """Record the window being archived; a different window at this index starts a new segment"""
+        if window_id and self.window_id() and window_id != self.window_id():
+            self.rotate()
+        meta = {"name": name, "window_id": window_id or self.window_id()}
+        if meta != self.meta():
+            atomic_write(self.meta_path, json.dumps(meta))
+            self._meta = meta
+
+    def _load_current(self):
+        if self._current_start is not None or not self.current_path.exists():
+            return
+        with open(self.current_path, 'r', errors='replace') as f:
+            first = f.readline()
+            self._current_lines = 1 + sum(1 for _ in f) if first else 0
+        self._current_start = float(first.split('\t', 1)[0]) if first else None
+
+    def append(self, lines: List[str], timestamp: Optional[float] = None):
+        if not lines:
+            return
+        timestamp = timestamp or time.time()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_current()
+        with open(self.current_path, 'a') as f:
+            f.write(''.join(f"{timestamp:.3f}\t{line}\n" for line in lines))
+        if self._current_start is None:
+            self._current_start = float(f"{timestamp:.3f}")  # as written, so readers can match it
+        self._current_lines += len(lines)
+        self.maybe_rotate(timestamp)
+
+    def maybe_rotate(self, now: Optional[float] = None):
+        now = now or time.time()
+        self._load_current()
+        if self._current_start is None:
+            return
+        too_big = self.current_path.stat().st_size >= self.max_segment_bytes
+        too_old = now - self._current_start >= self.max_segment_age
+        if too_big or too_old:
+            self.rotate(now)
+
+    def rotate(self, now: Optional[float] = None):
+        """Compress the open segment and add it to the index"""
+        self._load_current()
+        if self._current_start is None:
+            return
+        with open(self.current_path, 'rb') as f:
+            data = f.read()
+        last = data.rstrip(b'\n').rsplit(b'\n', 1)[-1]
+        end = float(last.split(b'\t', 1)[0]) if last else (now or time.time())
+
+        name = f"{int(self._current_start)}-{int(end)}-{uuid.uuid4().hex[:6]}.log.gz"
+        tmp_path = self.directory / f".{name}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.directory / name)
+
+        segments = self.segments()  # load the index before adding to it
+        segment = Segment(file=name, start=self._current_start, end=end, lines=self._current_lines,
+                          bytes=(self.directory / name).stat().st_size, window_id=self.window_id())
+        append_line(self.index_path, asdict(segment))
+        self.current_path.unlink()
+        segments.append(segment)
+        self._current_start = None
+        self._current_lines = 0
+
+    def prune(self, older_than: Optional[float] = None, max_bytes: Optional[int] = None) -> int:
+        """Delete closed segments past the retention policy; returns how many were removed"""
+        keep = list(self.segments())
+        removed = []
+        if older_than is not None:
+            removed += [s for s in keep if s.end < older_than]
+            keep = [s for s in keep if s.end >= older_than]
+        if max_bytes is not None:
+            while keep and sum(s.bytes for s in keep) > max_bytes:
+                removed.append(keep.pop(0))
+        if not removed:
+            return 0
+        for segment in removed:
+            (self.directory / segment.file).unlink(missing_ok=True)
+        atomic_write(self.index_path, ''.join(json.dumps(asdict(s), separators=(',', ':')) + '\n' for s in keep))
+        self._segments = keep
+        return len(removed)
+
+    def read(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Tuple[float, str]]:
+        """Yield (timestamp, line) in order, opening only segments that overlap the range"""
+        segments = self.segments()
+        first = 0
+        if since is not None:
+            ends = [s.end for s in segments]
+            first = bisect_left(ends, since)
+        sources = [self.directory / s.file for s in segments[first:]
+                   if until is None or s.start <= until]
+        if self.current_path.exists():
+            sources.append(self.current_path)
+
+        for path in sources:
+            opener = gzip.open if path.suffix == '.gz' else open
+            try:
+                with opener(path, 'rt', errors='replace') as f:
+                    for raw in f:
+                        stamp, _, line = raw.rstrip('\n').partition('\t')
+                        ts = float(stamp)
+                        if since is not None and ts < since:
+                            continue
+                        if until is not None and ts > until:
+                            return
+                        yield ts, line
+            except (OSError, ValueError) as e:
+                print(f"Error reading {path}: {e}")
+
+
+class TranscriptArchiver:
+    """Polls all agent panes and appends their new scrollback lines to per-pane archives"""
+
+    def __init__(self, orchestrator: Optional[TmuxOrchestrator] = None, root: Optional[Path] = None,
+                 session_name: Optional[str] = None, max_segment_bytes: int = 4 * 1024 * 1024,
+                 max_segment_age: float = 3600, retention_days: float = 14,
+                 retention_bytes: Optional[int] = None, clear_history_at: Optional[int] = None):
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        self.root = Path(root) if root else DEFAULT_ROOT
+        self.session_name = session_name
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.retention_days = retention_days
+        self.retention_bytes = retention_bytes
+        self.reader = ScrollbackReader(self.orchestrator, backfill=True)
+        self.archives: Dict[str, TranscriptArchive] = {}
+        self._flushed_dead = set()
+        # pane_id -> (last_activity, capture time, target, screen lines) from the latest active poll
+        self._screens: Dict[str, Tuple[float, float, str, List[str]]] = {}
+        # Governance: clear a pane's tmux history once it holds this many archived lines
+        self.clear_history_at = clear_history_at
+        self._complete = set()  # panes whose whole scrollback is in the archive
+        self.history_cleared = 0
+        self._seen = set()
+
+    def archive_for(self, target: str) -> TranscriptArchive:
+        """Archive for a session:window target"""
+        if target not in self.archives:
+            session_name, _, window_index = target.rpartition(':')
+            directory = self.root / session_name / window_index
+            self.archives[target] = TranscriptArchive(directory, self.max_segment_bytes, self.max_segment_age)
+        return self.archives[target]
+
+    def poll(self) -> int:
+        """Archive new output from every agent pane; returns the number of lines written"""
+        written = 0
+        now = time.time()
+        live_before = self._seen
+        panes = [pane for pane in self.orchestrator.list_panes(self.session_name) if pane.agent_pane]
+        live = {pane.pane_id for pane in panes}
+        # Before a new window can take over a closed one's index (and archive)
+        for pane_id in live_before - live:
+            written += self._flush_closed(pane_id, now)
+
+        for pane in panes:
+            archive = self.archive_for(pane.target)
+            archive.set_window(pane.window_name, pane.window_id)
+            first_read = pane.pane_id not in live_before
+            lines = self.reader.read_new_lines(pane)
+            if pane.dead and pane.pane_id not in self._flushed_dead:
+                # The process is gone: what is still on screen will never scroll
+                lines += [line for line in self.reader.read_screen(pane) if line]
+                self._flushed_dead.add(pane.pane_id)
+                self._screens.pop(pane.pane_id, None)
+            elif not pane.dead:
+                self._keep_screen(pane, now)
+            archive.append(lines, now)
+            archive.maybe_rotate(now)
+            written += len(lines)
+            if self.clear_history_at:
+                self._govern(pane, first_read)
+
+        self._flushed_dead &= live
+        self._complete &= live
+        self._seen = live
+        return written
+
+    def _keep_screen(self, pane: TmuxPane, now: float):
+        """Re-capture the visible screen of a pane that was active since its last capture.
+
+        A closed pane (exited, or its window killed) can no longer be captured:
+        tmux runs pane-exited / window-unlinked hooks after the pane is destroyed.
+        Its last screen is written to the archive from this copy instead.
+        """
+        cached = self._screens.get(pane.pane_id)
+        if cached and cached[0] == pane.last_activity and pane.last_activity < cached[1] - 1:
+            if cached[2] != pane.target:
+                self._screens[pane.pane_id] = (cached[0], cached[1], pane.target, cached[3])
+            return
+        lines = self.reader.read_screen(pane)
+        self._screens[pane.pane_id] = (pane.last_activity, now, pane.target, lines)
+
+    def _flush_closed(self, pane_id: str, now: float) -> int:
+        """A pane disappeared: archive its last screen and drop its read state"""
+        self.reader.forget(pane_id)
+        cached = self._screens.pop(pane_id, None)
+        if not cached or pane_id in self._flushed_dead:
+            return 0
+        lines = [line for line in cached[3] if line]
+        self.archive_for(cached[2]).append(lines, now)
+        return len(lines)
+
+    def _govern(self, pane: TmuxPane, first_read: bool):
+        """Clear a pane's tmux history once everything in it has been archived"""
+        if first_read:
+            # Backfill only covers max_lines: older scrollback exists only in tmux
+            if pane.history_size <= self.reader.max_lines:
+                self._complete.add(pane.pane_id)
+            return
+        if pane.dead or pane.pane_id not in self._complete or pane.history_size < self.clear_history_at:
+            return
+        # Only if nothing scrolled in after list-panes, i.e. after the lines just archived
+        if self.orchestrator.clear_history(pane.pane_id, pane.history_size):
+            self.reader.cleared(pane.pane_id)
+            self.history_cleared += 1
+
+    def prune(self) -> int:
+        """Apply the retention policy to every archive on disk"""
+        removed = 0
+        older_than = time.time() - self.retention_days * 86400 if self.retention_days else None
+        for index_path in self.root.glob("*/*/index.jsonl"):
+            directory = index_path.parent
+            target = f"{directory.parent.name}:{directory.name}"
+            removed += self.archive_for(target).prune(older_than, self.retention_bytes)
+        return removed
+
+    def close(self):
+        """Rotate every open segment so nothing is left uncompressed"""
+        for archive in self.archives.values():
+            archive.rotate()
+
+    def run(self, interval: float = 5.0, prune_every: float = 3600,
+            after_poll: Optional[Callable[[], object]] = None):
+        last_prune = 0.0
+        try:
+            while True:
+                cleared = self.history_cleared
+                self.poll()
+                if self.history_cleared > cleared:
+                    memory = self.orchestrator.server_memory()
+                    if memory:
+                        print(f"{datetime.now().strftime('%H:%M:%S')} Cleared archived history of "
+                              f"{self.history_cleared - cleared} panes; tmux server {memory.rss_mb:.0f} MB RSS "
+                              f"for {memory.history_lines} history lines")
+                if after_poll:
+                    after_poll()
+                if time.time() - last_prune >= prune_every:
+                    self.prune()
+                    last_prune = time.time()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continuous per-agent transcript archiver")
+    parser.add_argument("--root", type=Path, help=f"Archive directory (default: {DEFAULT_ROOT})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Archive agent output continuously")
+    run_parser.add_argument("--session", help="Only archive one session")
+    run_parser.add_argument("--interval", type=float, default=5.0)
+    run_parser.add_argument("--segment-mb", type=float, default=4, help="Rotate segments at this size")
+    run_parser.add_argument("--segment-minutes", type=float, default=60, help="Rotate segments at this age")
+    run_parser.add_argument("--retention-days", type=float, default=14)
+    run_parser.add_argument("--retention-mb", type=float, help="Per-agent cap on compressed segments")
+    run_parser.add_argument("--search-index", action="store_true",
+                            help="Also keep the output_search.py index in sync after every poll")
+    run_parser.add_argument("--clear-history-at", type=int, metavar="LINES",
+                            help="Clear a pane's tmux history once it holds this many archived lines")
+
+    read_parser = sub.add_parser("read", help="Print archived output of one window")
+    read_parser.add_argument("target", help="session:window")
+    read_parser.add_argument("--since", help="Unix time, ISO time or age (30m, 2h, 7d)")
+    read_parser.add_argument("--until", help="Unix time, ISO time or age")
+
+    prune_parser = sub.add_parser("prune", help="Apply the retention policy now")
+    prune_parser.add_argument("--retention-days", type=float, default=14)
+    prune_parser.add_argument("--retention-mb", type=float)
+
+    sub.add_parser("list", help="List archived agents and their sizes")
+
+    memory_parser = sub.add_parser("memory", help="tmux server memory against the scrollback it holds")
+    memory_parser.add_argument("--top", type=int, default=10, help="Show the panes with the most history")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        archiver = TranscriptArchiver(
+            root=args.root, session_name=args.session,
+            max_segment_bytes=int(args.segment_mb * 1024 * 1024),
+            max_segment_age=args.segment_minutes * 60,
+            retention_days=args.retention_days,
+            retention_bytes=int(args.retention_mb * 1024 * 1024) if args.retention_mb else None,
+            clear_history_at=args.clear_history_at)
+        after_poll = None
+        if args.search_index:
+            from output_search import SearchIndex
+            after_poll = SearchIndex(archive_root=archiver.root).sync
+        print(f"Archiving agent transcripts to {archiver.root} every {args.interval:g}s (Ctrl+C to stop)")
+        archiver.run(args.interval, after_poll=after_poll)
+    elif args.command == "read":
+        archive = TranscriptArchiver(root=args.root).archive_for(args.target)
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+        try:
+            for ts, line in archive.read(since, until):
+                print(f"{datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')}  {line}")
+        except BrokenPipeError:
+            pass
+    elif args.command == "prune":
+        archiver = TranscriptArchiver(
+            root=args.root, retention_days=args.retention_days,
+            retention_bytes=int(args.retention_mb * 1024 * 1024) if args.retention_mb else None)
+        print(f"Removed {archiver.prune()} expired segments")
+    elif args.command == "list":
+        root = args.root or DEFAULT_ROOT
+        for directory in sorted(p for p in root.glob("*/*") if p.is_dir()):
+            archive = TranscriptArchive(directory, 0, 0)
+            segments = archive.segments()
+            size = sum(s.bytes for s in segments)
+            current = archive.current_path.stat().st_size if archive.current_path.exists() else 0
+            print(f"{directory.parent.name}:{directory.name:<6} {len(segments):>4} segments "
+                  f"{size / 1024:>9.1f} KB compressed  {current / 1024:>8.1f} KB open")
+    elif args.command == "memory":
+        orchestrator = TmuxOrchestrator()
+        memory = orchestrator.server_memory()
+        if memory is None:
+            return
+        print(f"tmux server {memory.pid}: {memory.rss_mb:.1f} MB RSS, {memory.history_lines} history lines "
+              f"in {memory.panes} panes (limits allow {memory.history_limit_lines})")
+        panes = sorted(orchestrator.list_panes(), key=lambda p: p.history_size, reverse=True)
+        for pane in panes[:args.top]:
+            print(f"  {pane.target:<18} {pane.window_name[:16]:<16} {pane.history_size:>8} / {pane.history_limit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Claude TUI turn parser
+Turns agent pane output into structured records: user prompts, assistant
+replies, tool calls, tool results and status changes (working, idle, awaiting
+permission). Each record is appended as one compact NDJSON line to
+registry/logs/turns/<session>/<window>.ndjson, so consumers read turns instead
+of re-scanning screens full of boxes, spinners and footers.
+
+Parsing is incremental. Lines that scrolled into history are final and are
+read once (ScrollbackReader). The visible screen is split into the transcript
+area and the live region below it (spinner, input box, permission dialog,
+footer). Only transcript lines that weren't consumed in an earlier poll are
+parsed. While the agent works, its last record can still be redrawn, so it
+is held back until the next record starts or the agent goes idle. If a
+redraw can't be matched to what was already read, the screen is parsed
+again and records identical to recent ones are dropped.
+
+  {"seq": 12, "ts": 1760000000.1, "agent": "api_builder:3", "role": "fastapi",
+   "type": "tool_call", "tool": "Bash", "text": "pytest -q"}
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from typing import List, Dict, Optional, Tuple, Iterable
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+
+from note_store import append_line
+from tmux_utils import (TmuxOrchestrator, TmuxPane, ScrollbackReader, ANSI_PATTERN, BOX_CHARS,
+                        SPINNER_PATTERN, SHELL_COMMANDS)
+
+DEFAULT_ROOT = Path(__file__).parent / "registry" / "logs" / "turns"
+RECORD_TYPES = ("user", "assistant", "tool_call", "tool_result", "status")
+
+USER_PATTERN = re.compile(r"^[>❯] (.*)$")
+MARKER_PATTERN = re.compile(r"^[⏺●] ?(.*)$")
+# Bash(npm test), Update(src/app.py), context7:get-docs (MCP)(topic: "routing"); may continue on the next lines
+TOOL_PATTERN = re.compile(r"^([A-Za-z][\w.:-]*(?: \(MCP\))?)\((.*)$")
+TOOLS_WITHOUT_ARGS = {"Update Todos", "Read Todos"}
+RESULT_PATTERN = re.compile(r"^ {0,4}⎿ {0,2}(.*)$")
+HIDDEN_PATTERN = re.compile(r"^…\s*\+(\d+) lines?\b")
+SPINNER_TEXT = re.compile(r"^\S\s+(.*?…)")
+FOOTER_PATTERN = re.compile(r"\? for shortcuts|⏵⏵|shift\+tab to cycle|Context left until auto-compact|"
+                            r"auto-accept edits|bypass permissions|plan mode on", re.IGNORECASE)
+PERMISSION_PATTERN = re.compile(r"Do you want to .*\?|Would you like to .*\?")
+# How far above the input box to look for the spinner (a todo list may sit between them)
+LIVE_REGION_LINES = 15
+RECENT_RECORDS = 500
+
+
+@dataclass
+class TurnRecord:
+    seq: int
+    ts: float
+    agent: str
+    type: str  # one of RECORD_TYPES
+    text: str
+    role: str = ""  # window name
+    tool: str = ""  # tool_call and tool_result
+    hidden: int = 0  # result lines the TUI folded away ("… +12 lines")
+
+    def compact(self) -> Dict:
+        """Record without empty fields"""
+        return {k: v for k, v in asdict(self).items() if v not in ("", 0, None)}
+
+
+@dataclass
+class LiveRegion:
+    transcript: List[str]  # screen lines above the live region, trailing blanks removed
+    status: str = ""  # spinner text, permission question, or "idle"
+    busy: bool = False
+    input_box: bool = False
+
+
+def split_screen(lines: List[str]) -> LiveRegion:
+    """Separate the transcript area from the spinner, input box / dialog and footer below it"""
+    bottom = len(lines) - 1
+    while bottom >= 0 and not lines[bottom].strip():
+        bottom -= 1
+    box_end = next((i for i in range(bottom, max(bottom - 6, -1), -1) if lines[i].lstrip().startswith("╰")), None)
+    if box_end is None:
+        return LiveRegion(_trim(lines))
+    box_start = box_end
+    while box_start > 0 and not lines[box_start].lstrip().startswith("╭"):
+        box_start -= 1
+    box = '\n'.join(lines[box_start:box_end + 1])
+    live_start = box_start
+    spinner = ""
+    for i in range(box_start - 1, max(box_start - LIVE_REGION_LINES, -1), -1):
+        line = lines[i]
+        if line[:1] not in ("", " ") and SPINNER_PATTERN.search(line):
+            spinner = line
+            live_start = i
+            break
+        if line[:1] not in ("", " "):
+            break
+    permission = PERMISSION_PATTERN.search(box)
+    if permission:
+        status = f"awaiting permission: {permission.group()}"
+    elif spinner:
+        match = SPINNER_TEXT.match(spinner)
+        status = match.group(1) if match else "working"
+    else:
+        status = "idle"
+    return LiveRegion(_trim(lines[:live_start]), status, bool(spinner), True)
+
+
+def _trim(lines: List[str]) -> List[str]:
+    end = len(lines)
+    while end and not lines[end - 1].strip():
+        end -= 1
+    return lines[:end]
+
+
+def is_record_start(line: str) -> bool:
+    return bool(line) and line[0] != ' ' and bool(USER_PATTERN.match(line) or MARKER_PATTERN.match(line))
+
+
+class TurnParser:
+    """Line-level state machine for one agent: transcript lines in, completed records out.
+
+    A record stays open while its continuation lines (indented under the
+    marker) arrive, and is emitted when the next record starts or on flush().
+    """
+
+    def __init__(self, agent: str, role: str = ""):
+        self.agent = agent
+        self.role = role
+        self.seq = 0
+        self._type = ""  # type of the open record ("" when none is open)
+        self._tool = ""
+        self._lines: List[str] = []
+        self._indent = 0
+        self._hidden = 0
+        self._last: Tuple[str, str] = ("", "")  # (type, tool) of the last record, for orphaned continuations
+        self._last_tool = ""
+        self._status = ""
+        self._recent: deque = deque(maxlen=RECENT_RECORDS)
+        self._recent_keys: Dict[Tuple[str, str, str], int] = {}
+
+    def _remember(self, key: Tuple[str, str, str]):
+        if len(self._recent) == self._recent.maxlen:
+            old = self._recent[0]
+            self._recent_keys[old] -= 1
+            if not self._recent_keys[old]:
+                del self._recent_keys[old]
+        self._recent.append(key)
+        self._recent_keys[key] = self._recent_keys.get(key, 0) + 1
+
+    def _emit(self, type_: str, text: str, ts: float, tool: str = "", hidden: int = 0,
+              replay: bool = False) -> Optional[TurnRecord]:
+        key = (type_, tool, text)
+        if replay and key in self._recent_keys:
+            return None
+        self._remember(key)
+        self.seq += 1
+        return TurnRecord(self.seq, round(ts, 3), self.agent, type_, text, self.role, tool, hidden)
+
+    def _open(self, type_: str, text: str, indent: int, tool: str = ""):
+        self._type, self._tool, self._indent, self._hidden = type_, tool, indent, 0
+        self._lines = []
+        self._add(text)
+
+    def _add(self, text: str):
+        hidden = HIDDEN_PATTERN.match(text.strip()) if self._type == "tool_result" else None
+        if hidden:
+            self._hidden += int(hidden.group(1))
+        else:
+            self._lines.append(text)
+
+    def _close(self, ts: float, replay: bool) -> List[TurnRecord]:
+        if not self._type:
+            return []
+        text = '\n'.join(self._lines).strip('\n')
+        if self._type == "tool_call" and text.endswith(')'):
+            text = text[:-1]
+        record = self._emit(self._type, text, ts, self._tool, self._hidden, replay)
+        self._last = (self._type, self._tool)
+        self._type = ""
+        return [record] if record else []
+
+    def feed(self, lines: Iterable[str], ts: Optional[float] = None, replay: bool = False) -> List[TurnRecord]:
+        """Parse transcript lines; replay drops records identical to recent ones (a redraw read twice)"""
+        ts = ts or time.time()
+        records: List[TurnRecord] = []
+        for raw in lines:
+            line = ANSI_PATTERN.sub('', raw).rstrip()
+            stripped = line.lstrip()
+            if not stripped:
+                if self._type:
+                    self._lines.append("")
+                continue
+            if stripped[0] in BOX_CHARS or FOOTER_PATTERN.search(stripped) or \
+                    (line[0] != ' ' and SPINNER_PATTERN.search(line)):
+                continue  # TUI chrome left behind in the scrollback by a redraw
+
+            if line[0] != ' ':
+                user = USER_PATTERN.match(line)
+                marker = MARKER_PATTERN.match(line)
+                if user:
+                    records += self._close(ts, replay)
+                    self._open("user", user.group(1), 2)
+                elif marker:
+                    records += self._close(ts, replay)
+                    rest = marker.group(1)
+                    tool = TOOL_PATTERN.match(rest)
+                    if tool:
+                        self._last_tool = tool.group(1)
+                        # Arguments that wrap continue under the opening parenthesis
+                        self._open("tool_call", tool.group(2), len(tool.group(1)) + 3, tool.group(1))
+                    elif rest in TOOLS_WITHOUT_ARGS:
+                        self._last_tool = rest
+                        self._open("tool_call", "", 2, rest)
+                    else:
+                        self._open("assistant", rest, 2)
+                elif self._type:
+                    self._add(line)
+                continue
+
+            result = RESULT_PATTERN.match(line)
+            if result:
+                records += self._close(ts, replay)
+                self._open("tool_result", result.group(1), 5, self._last_tool if self._last[0] == "tool_call" else "")
+            elif self._type:
+                indent = len(line) - len(stripped)
+                self._add(line[min(indent, self._indent):])
+            elif self._last[0]:
+                # Continuation of a record that was already flushed (the agent only looked idle)
+                self._open(self._last[0], stripped, 5 if self._last[0] == "tool_result" else 2, self._last[1])
+        return records
+
+    def flush(self, ts: Optional[float] = None, replay: bool = False) -> List[TurnRecord]:
+        """Emit the open record (the agent finished its turn)"""
+        return self._close(ts or time.time(), replay)
+
+    def status(self, text: str, ts: Optional[float] = None) -> List[TurnRecord]:
+        """A status record when the agent's status changed"""
+        if not text or text == self._status:
+            return []
+        self._status = text
+        self.seq += 1
+        return [TurnRecord(self.seq, round(ts or time.time(), 3), self.agent, "status", text, self.role)]
+
+
+@dataclass
+class PaneTurns:
+    parser: TurnParser
+    screen: List[str] = field(default_factory=list)  # transcript lines consumed from the screen, top first
+    activity: float = 0.0
+    read_at: float = 0.0
+
+
+def overlap(previous: List[str], current: List[str]) -> int:
+    """Length of the longest tail of previous that current starts with (at least one non-blank line)"""
+    for k in range(min(len(previous), len(current)), 0, -1):
+        if previous[-k:] == current[:k] and any(line.strip() for line in current[:k]):
+            return k
+    return 0
+
+
+class TurnStream:
+    """Polls agent panes and turns their new output into records, one NDJSON file per agent"""
+
+    def __init__(self, orchestrator: Optional[TmuxOrchestrator] = None, session_name: Optional[str] = None,
+                 root: Optional[Path] = None, backfill: bool = False):
+        self.orchestrator = orchestrator or TmuxOrchestrator()
+        self.session_name = session_name
+        self.root = Path(root) if root else DEFAULT_ROOT
+        self.reader = ScrollbackReader(self.orchestrator, backfill=backfill)
+        self._panes: Dict[str, PaneTurns] = {}
+        self.lines_parsed = 0
+
+    def path_for(self, target: str) -> Path:
+        session_name, _, window_index = target.rpartition(':')
+        return self.root / session_name / f"{window_index}.ndjson"
+
+    def _poll_pane(self, pane: TmuxPane, now: float) -> List[TurnRecord]:
+        state = self._panes.get(pane.pane_id)
+        if state is None:
+            state = self._panes[pane.pane_id] = PaneTurns(TurnParser(pane.target, pane.window_name))
+        parser = state.parser
+        parser.agent, parser.role = pane.target, pane.window_name
+
+        # Scrolled-off lines that were read from the screen already are skipped, the rest are new
+        history, replay = [], False
+        for line in self.reader.read_new_lines(pane):
+            if state.screen and state.screen[0] == line:
+                state.screen.pop(0)
+                continue
+            if state.screen:
+                replay = True  # the screen was redrawn since it was read
+                state.screen = []
+            history.append(line)
+        records = parser.feed(history, now, replay)
+        self.lines_parsed += len(history)
+
+        # window_activity has one-second resolution: re-read anything active since the last read
+        if state.read_at and not history and pane.last_activity == state.activity and \
+                pane.last_activity < state.read_at - 1:
+            return records
+        state.activity, state.read_at = pane.last_activity, now
+
+        live = split_screen(self.reader.read_screen(pane))
+        transcript = live.transcript
+        idle = pane.dead or pane.current_command in SHELL_COMMANDS or (live.input_box and not live.busy)
+        prompted = False
+        if not idle:
+            # The last tool call or reply may still be redrawn in place; read it once it is followed by more.
+            # A submitted prompt is final as soon as the agent works on it
+            last = next((i for i in range(len(transcript) - 1, -1, -1) if is_record_start(transcript[i])), None)
+            prompted = last is not None and bool(USER_PATTERN.match(transcript[last]))
+            if last is not None and not prompted:
+                transcript = _trim(transcript[:last])
+
+        screen_replay = False
+        if transcript[:len(state.screen)] == state.screen:
+            new = transcript[len(state.screen):]
+        else:
+            k = overlap(state.screen, transcript)
+            new = transcript[k:]
+            screen_replay = k == 0
+        state.screen = transcript
+        self.lines_parsed += len(new)
+        records += parser.feed(new, now, replay or screen_replay)
+        if idle or prompted:
+            records += parser.flush(now, replay or screen_replay)
+        if pane.dead or pane.current_command in SHELL_COMMANDS:
+            records += parser.status("exited", now)
+        else:
+            records += parser.status(live.status, now)
+        return records
+
+    def poll(self) -> List[TurnRecord]:
+        now = time.time()
+        records = []
+        live = set()
+        for pane in self.orchestrator.list_panes(self.session_name):
+            if not pane.agent_pane:
+                continue
+            live.add(pane.pane_id)
+            records += self._poll_pane(pane, now)
+        for pane_id in list(self._panes):
+            if pane_id not in live:
+                del self._panes[pane_id]
+                self.reader.forget(pane_id)
+        for record in records:
+            append_line(self.path_for(record.agent), record.compact())
+        return records
+
+
+def read_records(path: Path, types: Optional[List[str]] = None) -> List[Dict]:
+    records = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not types or record.get("type") in types:
+                    records.append(record)
+    except OSError:
+        pass
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse Claude TUI output into user, assistant, tool and status records")
+    parser.add_argument("--root", type=Path, help=f"Record directory (default: {DEFAULT_ROOT})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    watch_parser = sub.add_parser("watch", help="Poll agent panes, append records per agent and print them as NDJSON")
+    watch_parser.add_argument("--session", help="Only watch one session")
+    watch_parser.add_argument("--interval", type=float, default=2.0)
+    watch_parser.add_argument("--backfill", action="store_true", help="Parse existing scrollback on the first poll")
+    watch_parser.add_argument("--quiet", action="store_true", help="Only write the per-agent files")
+
+    parse_parser = sub.add_parser("parse", help="Parse captured output (a file, stdin or an archived transcript)")
+    parse_parser.add_argument("file", nargs="?", default="-")
+    parse_parser.add_argument("--archive", metavar="TARGET", help="Archived transcript of session:window instead of a file")
+    parse_parser.add_argument("--since", help="With --archive: unix time, ISO time or age (30m, 2h, 7d)")
+
+    tail_parser = sub.add_parser("tail", help="Last records of one agent")
+    tail_parser.add_argument("target", help="session:window")
+    tail_parser.add_argument("-n", type=int, default=20)
+    tail_parser.add_argument("--type", nargs="*", choices=RECORD_TYPES, help="Only these record types")
+
+    args = parser.parse_args()
+
+    if args.command == "watch":
+        stream = TurnStream(session_name=args.session, root=args.root, backfill=args.backfill)
+        try:
+            while True:
+                for record in stream.poll():
+                    if not args.quiet:
+                        print(json.dumps(record.compact(), ensure_ascii=False), flush=True)
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "parse":
+        if args.archive:
+            from transcript_archiver import TranscriptArchiver, parse_time
+            archive = TranscriptArchiver().archive_for(args.archive)
+            lines: Iterable[Tuple[float, str]] = archive.read(parse_time(args.since) if args.since else None)
+            turns = TurnParser(args.archive)
+        else:
+            source = sys.stdin if args.file == "-" else open(args.file, 'r', errors='replace')
+            lines = ((time.time(), line.rstrip('\n')) for line in source)
+            turns = TurnParser(args.file)
+        started = time.perf_counter()
+        count = 0
+        ts = 0.0
+        try:
+            for ts, line in lines:
+                count += 1
+                for record in turns.feed([line], ts):
+                    print(json.dumps(record.compact(), ensure_ascii=False))
+            for record in turns.flush(ts or None):
+                print(json.dumps(record.compact(), ensure_ascii=False))
+        except BrokenPipeError:
+            return
+        print(f"Parsed {count} lines into {turns.seq} records in {(time.perf_counter() - started) * 1000:.0f} ms",
+              file=sys.stderr)
+    elif args.command == "tail":
+        root = args.root or DEFAULT_ROOT
+        session_name, _, window_index = args.target.rpartition(':')
+        records = read_records(root / session_name / f"{window_index}.ndjson", args.type)
+        if not records:
+            print(f"No records for {args.target}")
+            return
+        for record in records[-args.n:]:
+            tool = f" {record['tool']}" if record.get("tool") else ""
+            text = record.get("text", "").replace('\n', ' ⏎ ')
+            print(f"{time.strftime('%H:%M:%S', time.localtime(record['ts']))} {record['type']:<11}{tool:<10} {text[:150]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Incremental workspace backups
+Snapshots of the workspace, agent worktrees, prompts and top-level docs in a
+content-addressed store under backups/store/: files are split into 1 MiB
+chunks, each chunk is compressed and stored once under its SHA-256, and a
+snapshot is a manifest of paths to chunk lists. A file whose size and mtime
+match the previous snapshot is not read at all, so a backup costs a directory
+scan plus whatever changed, and near-identical snapshots share all their
+chunks instead of filling the disk with tarballs.
+
+  workspace_backup.py backup
+  workspace_backup.py list
+  workspace_backup.py restore --at 2h api_builder/workspace/api    # one directory as it was 2 hours ago
+  workspace_backup.py prune --keep 48
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import uuid
+import zlib
+import fcntl
+import fnmatch
+import hashlib
+import argparse
+from typing import List, Dict, Optional, Iterator, Tuple
+from dataclasses import dataclass, asdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from note_store import append_line
+from transcript_archiver import parse_time
+
+BASE_DIR = Path(__file__).parent
+DEFAULT_STORE = BASE_DIR / "backups" / "store"
+DEFAULT_ROOTS = ["api_builder/workspace", "api_builder/worktrees", "api_builder/prompts", "*.md"]
+EXCLUDE = {".git", ".venv", "venv", "__pycache__", "node_modules", ".pytest_cache", ".mypy_cache"}
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class FileEntry:
+    size: int
+    mtime_ns: int
+    mode: int
+    chunks: List[str]
+    link: str = ""  # symlink target (no chunks)
+
+
+@dataclass
+class SnapshotInfo:
+    id: str
+    created: float
+    files: int
+    bytes: int  # size of all files in the snapshot
+    changed: int  # files read because they were new or modified
+    removed: int  # files gone since the previous snapshot
+    stored_bytes: int  # compressed bytes of chunks the store didn't have yet
+    seconds: float
+
+
+class BackupStore:
+    """Chunk store plus snapshot manifests; backups and pruning hold an flock on the store"""
+
+    def __init__(self, root: Optional[Path] = None, base: Optional[Path] = None):
+        self.root = Path(root) if root else DEFAULT_STORE
+        self.base = Path(base) if base else BASE_DIR
+        self.objects_dir = self.root / "objects"
+        self.snapshots_dir = self.root / "snapshots"
+        self.index_path = self.root / "snapshots.jsonl"
+
+    @contextmanager
+    def _locked(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.root / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def chunk_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def put_chunk(self, data: bytes) -> Tuple[str, int]:
+        """Store a chunk unless it is already there; returns its digest and the bytes written"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(digest)
+        if path.exists():
+            return digest, 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        compressed = zlib.compress(data, 1)
+        tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        return digest, len(compressed)
+
+    def get_chunk(self, digest: str) -> bytes:
+        with open(self.chunk_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def snapshots(self) -> List[SnapshotInfo]:
+        """Snapshots oldest first (pruned ones are skipped)"""
+        snapshots: Dict[str, SnapshotInfo] = {}
+        try:
+            with open(self.index_path, 'r') as f:
+                for line in f:
+                    try:
+                        info = SnapshotInfo(**json.loads(line))
+                    except (ValueError, TypeError):
+                        continue
+                    snapshots[info.id] = info
+        except OSError:
+            return []
+        return sorted((info for info in snapshots.values() if self.manifest_path(info.id).exists()),
+                      key=lambda info: info.created)
+
+    def manifest_path(self, snapshot_id: str) -> Path:
+        return self.snapshots_dir / f"{snapshot_id}.json.gz"
+
+    def load(self, snapshot_id: str) -> Dict[str, FileEntry]:
+        with gzip.open(self.manifest_path(snapshot_id), 'rt') as f:
+            manifest = json.load(f)
+        return {path: FileEntry(*entry) for path, entry in manifest["files"].items()}
+
+    def _save_manifest(self, snapshot_id: str, created: float, roots: List[str], files: Dict[str, FileEntry]):
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        path = self.manifest_path(snapshot_id)
+        tmp_path = path.parent / f".{path.name}.tmp"
+        with gzip.open(tmp_path, 'wt', compresslevel=6) as f:
+            json.dump({"id": snapshot_id, "created": created, "roots": roots,
+                       "files": {p: [e.size, e.mtime_ns, e.mode, e.chunks, e.link] for p, e in files.items()}},
+                      f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def resolve(self, snapshot: str = "latest", at: Optional[float] = None) -> Optional[str]:
+        """Snapshot ID by ID prefix, "latest", or the last one taken at or before a time"""
+        snapshots = self.snapshots()
+        if at is not None:
+            snapshots = [info for info in snapshots if info.created <= at]
+        elif snapshot != "latest":
+            snapshots = [info for info in snapshots if info.id.startswith(snapshot)]
+        return snapshots[-1].id if snapshots else None
+
+    def scan(self, roots: List[str]) -> Iterator[Tuple[str, os.stat_result]]:
+        """(relative path, lstat) of every file and symlink under the roots, skipping EXCLUDE"""
+        for pattern in roots:
+            for root in sorted(self.base.glob(pattern)):
+                if root.is_symlink() or root.is_file():
+                    yield str(root.relative_to(self.base)), os.lstat(root)
+                    continue
+                for directory, dirnames, filenames in os.walk(root):
+                    dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDE)
+                    # Directory symlinks are listed in dirnames but not followed; keep them as links
+                    names = filenames + [d for d in dirnames if os.path.islink(os.path.join(directory, d))]
+                    for name in sorted(names):
+                        if name in EXCLUDE:
+                            continue
+                        path = os.path.join(directory, name)
+                        try:
+                            yield os.path.relpath(path, self.base), os.lstat(path)
+                        except OSError:
+                            continue  # removed while scanning
+
+    def _read_chunks(self, path: Path) -> Tuple[List[str], int]:
+        chunks = []
+        stored = 0
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data and chunks:
+                    break
+                digest, written = self.put_chunk(data)
+                chunks.append(digest)
+                stored += written
+                if len(data) < CHUNK_SIZE:
+                    break
+        return chunks, stored
+
+    def backup(self, roots: Optional[List[str]] = None) -> SnapshotInfo:
+        """Snapshot the roots, reading only files that are new or changed since the previous snapshot"""
+        roots = roots or DEFAULT_ROOTS
+        started = time.perf_counter()
+        with self._locked():
+            latest = self.resolve()
+            previous = self.load(latest) if latest else {}
+            files: Dict[str, FileEntry] = {}
+            changed = stored_bytes = total = 0
+            for relpath, st in self.scan(roots):
+                old = previous.get(relpath)
+                if os.path.islink(self.base / relpath):
+                    entry = FileEntry(0, st.st_mtime_ns, st.st_mode, [], os.readlink(self.base / relpath))
+                elif old and not old.link and old.size == st.st_size and old.mtime_ns == st.st_mtime_ns:
+                    entry = FileEntry(old.size, old.mtime_ns, st.st_mode, old.chunks)
+                else:
+                    try:
+                        chunks, stored = self._read_chunks(self.base / relpath)
+                    except OSError:
+                        continue  # unreadable or removed while scanning
+                    # A file still being written keeps its pre-read mtime, so it is read again next time
+                    entry = FileEntry(st.st_size, st.st_mtime_ns, st.st_mode, chunks)
+                    changed += 1
+                    stored_bytes += stored
+                files[relpath] = entry
+                total += entry.size
+            created = time.time()
+            snapshot_id = f"{datetime.fromtimestamp(created).strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:4]}"
+            self._save_manifest(snapshot_id, created, roots, files)
+            info = SnapshotInfo(snapshot_id, created, len(files), total, changed,
+                                len(set(previous) - set(files)), stored_bytes,
+                                round(time.perf_counter() - started, 3))
+            append_line(self.index_path, asdict(info))
+        return info
+
+    def restore(self, snapshot_id: str, paths: Optional[List[str]] = None, target: Optional[Path] = None,
+                dry_run: bool = False) -> List[str]:
+        """Write files of a snapshot back (all, or under the given paths / globs); files that already match are skipped"""
+        target = Path(target) if target else self.base
+        selected = [p.rstrip('/') for p in paths or []]
+        restored = []
+        for relpath, entry in sorted(self.load(snapshot_id).items()):
+            if selected and not any(relpath == p or relpath.startswith(p + '/') or fnmatch.fnmatch(relpath, p)
+                                    for p in selected):
+                continue
+            dest = target / relpath
+            try:
+                st = os.lstat(dest)
+                if entry.link:
+                    if os.path.islink(dest) and os.readlink(dest) == entry.link:
+                        continue
+                elif st.st_size == entry.size and st.st_mtime_ns == entry.mtime_ns and not os.path.islink(dest):
+                    continue
+            except OSError:
+                pass
+            restored.append(relpath)
+            if dry_run:
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = dest.parent / f".{dest.name}.{uuid.uuid4().hex[:8]}.restore"
+            if entry.link:
+                os.symlink(entry.link, tmp_path)
+            else:
+                with open(tmp_path, 'wb') as f:
+                    for digest in entry.chunks:
+                        f.write(self.get_chunk(digest))
+                os.chmod(tmp_path, entry.mode & 0o7777)
+                os.utime(tmp_path, ns=(entry.mtime_ns, entry.mtime_ns))
+            os.replace(tmp_path, dest)
+        return restored
+
+    def prune(self, keep: int) -> Tuple[int, int, int]:
+        """Keep the newest snapshots and drop chunks no remaining snapshot uses; returns (snapshots, chunks, bytes)"""
+        with self._locked():
+            snapshots = self.snapshots()
+            doomed = snapshots[:-keep] if keep > 0 else snapshots
+            for info in doomed:
+                self.manifest_path(info.id).unlink()
+            live = set()
+            for info in snapshots[len(doomed):]:
+                for entry in self.load(info.id).values():
+                    live.update(entry.chunks)
+            chunks = freed = 0
+            for directory in self.objects_dir.glob("??"):
+                for path in directory.iterdir():
+                    if directory.name + path.name not in live:
+                        freed += path.stat().st_size
+                        path.unlink()
+                        chunks += 1
+        return len(doomed), chunks, freed
+
+    def usage(self) -> Tuple[int, int]:
+        """Chunks in the store and their size on disk"""
+        count = size = 0
+        for directory in self.objects_dir.glob("??"):
+            for path in directory.iterdir():
+                count += 1
+                size += path.stat().st_size
+        return count, size
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024 or unit == "G":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental, deduplicated workspace snapshots")
+    parser.add_argument("--store", type=Path, help=f"Store directory (default: {DEFAULT_STORE.relative_to(BASE_DIR)})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    backup_parser = sub.add_parser("backup", help="Take a snapshot")
+    backup_parser.add_argument("roots", nargs="*", help=f"Paths or globs relative to the repository "
+                                                        f"(default: {' '.join(DEFAULT_ROOTS)})")
+    sub.add_parser("list", help="Snapshots with their size and what each one added")
+    files_parser = sub.add_parser("files", help="Files in a snapshot")
+    files_parser.add_argument("snapshot", nargs="?", default="latest")
+    restore_parser = sub.add_parser("restore", help="Restore files from a snapshot")
+    restore_parser.add_argument("paths", nargs="*", help="Only these files, directories or globs (default: everything)")
+    restore_parser.add_argument("--snapshot", default="latest", help="Snapshot ID (or a prefix of it)")
+    restore_parser.add_argument("--at", help="The last snapshot taken at or before this time (ISO time or age: 30m, 2h, 1d)")
+    restore_parser.add_argument("--target", type=Path, help="Restore under this directory instead of in place")
+    restore_parser.add_argument("--dry-run", action="store_true", help="Only list the files that would be written")
+    prune_parser = sub.add_parser("prune", help="Delete old snapshots and the chunks only they used")
+    prune_parser.add_argument("--keep", type=int, default=48, help="Snapshots to keep")
+
+    args = parser.parse_args()
+    store = BackupStore(args.store)
+
+    if args.command == "backup":
+        info = store.backup(args.roots or None)
+        print(f"Snapshot {info.id}: {info.files} files ({format_bytes(info.bytes)}), {info.changed} changed, "
+              f"{info.removed} removed, {format_bytes(info.stored_bytes)} added to the store in {info.seconds:.2f}s")
+    elif args.command == "list":
+        snapshots = store.snapshots()
+        if not snapshots:
+            print("No snapshots")
+            return
+        print(f"{'SNAPSHOT':<22} {'TAKEN':<19} {'FILES':>7} {'SIZE':>8} {'CHANGED':>7} {'ADDED':>8} {'TIME':>6}")
+        for info in snapshots:
+            taken = datetime.fromtimestamp(info.created).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{info.id:<22} {taken:<19} {info.files:>7} {format_bytes(info.bytes):>8} {info.changed:>7} "
+                  f"{format_bytes(info.stored_bytes):>8} {info.seconds:>5.2f}s")
+        chunks, size = store.usage()
+        print(f"Store: {chunks} chunks, {format_bytes(size)}")
+    elif args.command == "files":
+        snapshot_id = store.resolve(args.snapshot)
+        if not snapshot_id:
+            print(f"No snapshot {args.snapshot}")
+            sys.exit(1)
+        for relpath, entry in sorted(store.load(snapshot_id).items()):
+            stamp = datetime.fromtimestamp(entry.mtime_ns / 1e9).strftime('%Y-%m-%d %H:%M')
+            print(f"{stamp}  {format_bytes(entry.size):>8}  {relpath}" + (f" -> {entry.link}" if entry.link else ""))
+    elif args.command == "restore":
+        snapshot_id = store.resolve(args.snapshot, parse_time(args.at) if args.at else None)
+        if not snapshot_id:
+            print("No matching snapshot")
+            sys.exit(1)
+        restored = store.restore(snapshot_id, args.paths, args.target, args.dry_run)
+        for relpath in restored:
+            print(f"  {relpath}")
+        print(f"{'Would restore' if args.dry_run else 'Restored'} {len(restored)} file(s) from {snapshot_id}")
+    elif args.command == "prune":
+        snapshots, chunks, freed = store.prune(args.keep)
+        print(f"Removed {snapshots} snapshot(s) and {chunks} chunk(s), freed {format_bytes(freed)}")
+
+
+if __name__ == "__main__":
+    main()